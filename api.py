@@ -1,11 +1,185 @@
 # Author: Aditi Jha, November 4, 2024
 
-from flask import Flask, jsonify, request
+import functools
+import hashlib
+import os
+from flask import Flask, Response, jsonify, request
+import bulk_import
+import catalog
+import db_pool
+import json_codec
+import media_repository
+import metrics
+import pagination
+import profiling
+import response_cache
+import review_batch
+import review_queue
+import search
 import movies
 import books  
 import tv_shows
 app = Flask(__name__)
 
+# Every data module borrows connections from db_pool; size it once at startup
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", db_pool.POOL_SIZE))
+db_pool.configure(size=app.config["DB_POOL_SIZE"])
+
+# Serializer behind jsonify and request.get_json: stdlib or orjson (see json_codec)
+app.config["JSON_BACKEND"] = json_codec.BACKEND
+app.json = json_codec.JSONProvider(app)
+
+# Per-route request counts, status codes and latency, and the SQL each request ran,
+# exposed with the other subsystems' counters on GET /metrics (see metrics.py)
+if metrics.ENABLED:
+    @app.before_request
+    def start_request_metrics():
+        metrics.start_request()
+
+    @app.after_request
+    def record_request_metrics(response):
+        rule = request.url_rule
+        metrics.finish_request(request.method, rule.rule if rule else "<unmatched>", response.status_code)
+        return response
+
+# Opt-in call profiles of single requests, by X-Profile header or sampling, written as
+# flamegraph folded stacks (see profiling.py)
+@app.before_request
+def start_profile():
+    if profiling.requested(request.headers):
+        profiling.start()
+
+@app.after_request
+def finish_profile(response):
+    profile = profiling.stop()
+    if profile is not None:
+        rule = request.url_rule
+        path = profiling.dump(profile, request.method, rule.rule if rule else "<unmatched>")
+        response.headers["X-Profile-File"] = os.path.basename(path)
+    return response
+
+metrics.collectors.extend([
+    lambda: metrics.gauges("response_cache", [((), response_cache.backend.stats())]),
+    lambda: metrics.gauges("review_queue", [((), review_queue.stats())]),
+    lambda: metrics.gauges("db_pool", [((("database", s["database"]),), s) for s in db_pool.pool_stats().values()]),
+])
+
+# Shared by the list endpoints: ?after_id=&limit= keyset paging, ?reviews=full|count|none
+# and ?fields=a,b projection. The next page's cursor is sent in X-Next-After-Id.
+# ?stream=ndjson|array (or Accept: application/x-ndjson) streams the listing from a
+# server-side cursor instead of building it in memory; without a limit that is the
+# whole catalog in constant memory. Streamed responses bypass the response cache.
+# Titles arrive already encoded by SQLite when it can (see json_codec.SQLITE_JSON).
+def paged_list(view, allowed_fields, media):
+    try:
+        page = pagination.parse_page_args(request.args, allowed_fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    repository = media_repository.get(media)
+    mode = stream_mode()
+    titles = encoded_titles(view, repository, page, streamed=mode is not None)
+    if mode:
+        response = Response(pagination.stream_items((data for _, data in titles), mode),
+                            mimetype=pagination.STREAM_MIMETYPES[mode])
+        cursor = repository.page_end(page["after_id"], page["limit"]) if page["limit"] else None
+    else:
+        titles = list(titles)
+        response = Response(pagination.json_array([data for _, data in titles]), mimetype=app.json.mimetype)
+        cursor = titles[-1][0] if page["limit"] is not None and len(titles) == page["limit"] else None
+    if cursor is not None:
+        response.headers["X-Next-After-Id"] = str(cursor)
+    return response
+
+def encoded_titles(view, repository, page, streamed):
+    """(id, JSON bytes) for every title on the page, encoded in SQL or by app.json."""
+    args = {"after_id": page["after_id"], "limit": page["limit"], "reviews": page["reviews"]}
+    if json_codec.SQLITE_JSON:
+        for title_id, text in repository.iter_titles_json(fields=page["fields"], **args):
+            yield title_id, text.encode("utf-8")
+        return
+    items = repository.iter_titles(**args) if streamed else view(**args)
+    for item in items:
+        yield item["id"], app.json.encode(pagination.project(item, page["fields"]))
+
+def stream_mode():
+    """The requested ?stream= mode, or ndjson when that is what the client accepts best."""
+    mode = request.args.get("stream")
+    if mode is None and request.accept_mimetypes.best == pagination.STREAM_MIMETYPES["ndjson"]:
+        return "ndjson"
+    return mode
+
+# Shared by the top-rated endpoints: ?limit= (default 10) and optional ?genre=
+def top_rated(view):
+    limit = request.args.get("limit", "10")
+    if not limit.isdigit() or not 1 <= int(limit) <= pagination.MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be an integer between 1 and {pagination.MAX_PAGE_SIZE}"}), 400
+    return jsonify(view(int(limit), request.args.get("genre")))
+
+def cache_tags(media, kind, kwargs, response):
+    """Tags for a cached response; see response_cache for what each one means."""
+    tags = ["media"]
+    data = response.get_json()
+    items = data if isinstance(data, list) else [data]
+    if kind == "top":
+        tags.append("top")
+    elif all(isinstance(item, dict) and "id" in item for item in items):
+        tags.extend(f"title:{item['id']}" for item in items)
+    else:
+        tags.append("any")
+    if kind == "title":
+        tags.extend(f"title:{value}" for value in kwargs.values())
+    elif kind == "list" and "X-Next-After-Id" not in response.headers:
+        tags.append("tail")
+    elif kind == "genre" and media == "books":
+        tags.append("tail")  # /books/genre matches genres containing the argument, so any new book may join
+    elif kind == "genre":
+        tags.append(f"genre:{request.args.get('genre')}")
+    return [(media, tag) for tag in tags]
+
+# Read endpoints are served from response_cache, keyed by database, path and query string.
+# Every 200 carries an ETag, so clients revalidating with If-None-Match get an empty 304.
+def cached(media, kind):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if stream_mode():
+                return view(**kwargs)
+            cache = response_cache.backend
+            key = (media_repository.get(media).database(), request.path, tuple(sorted(request.args.items(multi=True))))
+            entry = cache.get(key)
+            state = "HIT"
+            if entry is None:
+                state = "MISS"
+                generation = cache.generation
+                response = app.make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                headers = [(k, v) for k, v in response.headers if k in ("Content-Type", "X-Next-After-Id")]
+                entry = (body, headers, hashlib.blake2b(body, digest_size=8).hexdigest())
+                cache.set(key, entry, cache_tags(media, kind, kwargs, response), response_cache.TTL, generation)
+            body, headers, etag = entry
+            if request.if_none_match.contains(etag):
+                cache.note("not_modified")
+                response = Response(status=304)
+            else:
+                response = Response(body, headers=headers)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            response.headers["X-Cache"] = state
+            return response
+        return wrapper
+    return decorator
+
+# Review submissions go through review_queue; when it is overloaded the client is told to back off
+@app.errorhandler(review_queue.QueueFull)
+def review_queue_full(e):
+    return jsonify({"error": str(e)}), 429, {"Retry-After": str(review_queue.RETRY_AFTER)}
+
+@app.errorhandler(review_queue.WriterUnavailable)
+def review_writer_unavailable(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": str(review_queue.RETRY_AFTER)}
+
 # Implementing REST API for my movie tab for our review app, author: Aditi, updated december 2, 2024
 
 @app.route('/movies', methods=['POST'])
@@ -23,7 +197,10 @@ def add_review(movie_id):
     rating = data.get("rating")
     note = data.get("note")
     if rating and note:
-        return jsonify(movies.add_review(movie_id, rating, note)), 201
+        result = movies.add_review(movie_id, rating, note)
+        if result is None:
+            return jsonify({"error": "Movie not found"}), 404
+        return jsonify(result), 201
     return jsonify({"error": "Rating and note are required"}), 400
 
 @app.route('/movies/<int:movie_id>/reviews/<int:review_id>', methods=['PUT'])
@@ -42,15 +219,28 @@ def delete_movie(movie_id):
     return jsonify(movies.delete_movie(movie_id))
 
 @app.route('/movies', methods=['GET'])
+@cached("movies", "list")
 def view_reviews():
-    return jsonify(movies.view_reviews())
+    return paged_list(movies.view_reviews, movies.LIST_FIELDS, "movies")
+
+@app.route('/movies/top', methods=['GET'])
+@cached("movies", "top")
+def view_top_movies():
+    return top_rated(movies.view_top_movies)
+
+@app.route('/movies/genres', methods=['GET'])
+@cached("movies", "list")
+def view_movie_genres():
+    return jsonify(movies.view_movie_genre())
 
 @app.route('/movies/<int:movie_id>/reviews', methods=['GET'])
+@cached("movies", "title")
 def search_reviews(movie_id):
     return jsonify(movies.search_reviews(movie_id))
 
 
 @app.route('/movies/genre', methods=['GET'])
+@cached("movies", "genre")
 def search_by_genre():
     genre = request.args.get("genre")
     if not genre:
@@ -58,8 +248,8 @@ def search_by_genre():
     try:
         result = movies.search_by_genre(genre)
         return jsonify(result)
-    except Exception as e:
-        print(f"Error: {e}")
+    except Exception:
+        app.logger.exception("Genre search failed")
         return jsonify({"error": "An error occurred while searching by genre."}), 500
     
 
@@ -69,11 +259,22 @@ def search_by_genre():
 
 # Books Endpoints
 @app.route('/books', methods=['GET'])
+@cached("books", "list")
 def get_books():
-    data = books.get_all_books()
-    return jsonify(books), 200
+    return paged_list(books.view_books, books.LIST_FIELDS, "books")
+
+@app.route('/books/top', methods=['GET'])
+@cached("books", "top")
+def get_top_books():
+    return top_rated(books.view_top_books)
+
+@app.route('/books/genres', methods=['GET'])
+@cached("books", "list")
+def get_book_genres():
+    return jsonify(books.view_book_genre())
 
 @app.route('/books/<int:book_id>', methods=['GET'])
+@cached("books", "title")
 def get_single_book(book_id):
     book = books.get_book(book_id)
     if book:
@@ -109,9 +310,10 @@ def delete_single_book(book_id):
     return jsonify({"error": "Book not found"}), 404
 
 @app.route('/books/genre', methods=['GET'])
+@cached("books", "genre")
 def get_books_by_genre():
     genre = request.args.get('genre', '')
-    filtered_books = filter_books_by_genre(genre)
+    filtered_books = books.search_books_by_genre(genre)
     if not filtered_books:
         return jsonify({"message": f"No books found in the '{genre}' genre."}), 404
     return jsonify(filtered_books), 200
@@ -149,7 +351,10 @@ def add_tv_review(tv_show_id):
     rating = data.get("rating")
     note = data.get("note")
     if rating and note:
-        return jsonify(tv_shows.add_review(tv_show_id, rating, note)), 201
+        result = tv_shows.add_review(tv_show_id, rating, note)
+        if result is None:
+            return jsonify({"error": "TV Show not found"}), 404
+        return jsonify(result), 201
     return jsonify({"error": "Rating and note are required"}), 400
 
 @app.route('/tv_shows/<int:tv_show_id>/reviews/<int:review_id>', methods=['PUT'])
@@ -168,14 +373,27 @@ def delete_tv_show(tv_show_id):
     return jsonify(tv_shows.delete_show(tv_show_id))
 
 @app.route('/tv_shows', methods=['GET'])
+@cached("tv_shows", "list")
 def view_tv_reviews():
-    return jsonify(tv_shows.view_reviews())
+    return paged_list(tv_shows.view_reviews, tv_shows.LIST_FIELDS, "tv_shows")
+
+@app.route('/tv_shows/top', methods=['GET'])
+@cached("tv_shows", "top")
+def view_top_tv_shows():
+    return top_rated(tv_shows.view_top_shows)
+
+@app.route('/tv_shows/genres', methods=['GET'])
+@cached("tv_shows", "list")
+def view_tv_genres():
+    return jsonify(tv_shows.view_show_genre())
 
 @app.route('/tv_shows/<int:tv_show_id>/reviews', methods=['GET'])
+@cached("tv_shows", "title")
 def search_tv_reviews(tv_show_id):
     return jsonify(tv_shows.search_reviews(tv_show_id))
 
 @app.route('/tv_shows/genre', methods=['GET'])
+@cached("tv_shows", "genre")
 def search_tv_by_genre():
     genre = request.args.get("genre")
     if not genre:
@@ -183,10 +401,87 @@ def search_tv_by_genre():
     try:
         result = tv_shows.search_by_genre(genre)
         return jsonify(result)
-    except Exception as e:
-        print(f"Error: {e}")
+    except Exception:
+        app.logger.exception("Genre search failed")
         return jsonify({"error": "An error occurred while searching by genre."}), 500
 
 
+# Full-text search over titles and review notes of every media type.
+# ?q= words (the last one matches as a prefix), optional ?type=movies,books, ?scope=titles|reviews,
+# ?limit= and ?offset=. Results are ranked best first and carry a highlighted snippet.
+# With SEARCH_RANK_WINDOW set, X-Search-Truncated lists the indexes whose older matches
+# were not ranked.
+@app.route('/search', methods=['GET'])
+def search_all():
+    try:
+        params = search.parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        hits, truncated = search.search_results(**params)
+    except Exception:
+        app.logger.exception("Search failed")
+        return jsonify({"error": "An error occurred while searching."}), 500
+    response = jsonify(hits)
+    if truncated:
+        response.headers["X-Search-Truncated"] = ",".join(truncated)
+    return response
+
+# Best-rated titles across movies, TV shows and books, with optional ?limit= and ?genre=.
+# Under DB_LAYOUT=consolidated this is one indexed query over the shared catalog.
+@app.route('/top', methods=['GET'])
+def view_top_anything():
+    return top_rated(catalog.top_rated)
+
+# Batch review submission: the body is a JSON list of reviews (or {"reviews": [...]}), each
+# with type, title_id, rating and note; the per-media routes imply the type. Everything is
+# validated first and committed in one transaction per database file. ?atomic=true writes
+# nothing if any item fails. 201 when all were created, 207 when some were, else 400.
+@app.route('/reviews/batch', methods=['POST'], defaults={"media": None})
+@app.route('/<any(movies, tv_shows, books):media>/reviews/batch', methods=['POST'])
+def submit_reviews(media):
+    data = request.get_json(silent=True)
+    items = data.get("reviews") if isinstance(data, dict) else data
+    atomic = request.args.get("atomic", "false").lower() in ("1", "true", "yes")
+    try:
+        report = review_batch.submit(items, media=media, atomic=atomic)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not report["errors"]:
+        return jsonify(report), 201
+    return jsonify(report), 207 if report["created"] else 400
+
+# Bulk import: the request body is streamed as NDJSON (default) or CSV (?format=csv or
+# Content-Type: text/csv). Bad rows are listed in the report instead of failing the batch.
+@app.route('/import/<kind>', methods=['POST'])
+def import_rows(kind):
+    if kind not in bulk_import.KINDS:
+        return jsonify({"error": f"kind must be one of: {', '.join(bulk_import.KINDS)}"}), 404
+    fmt = request.args.get("format") or ("csv" if request.mimetype == "text/csv" else "ndjson")
+    if fmt not in bulk_import.FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(bulk_import.FORMATS)}"}), 400
+    return jsonify(bulk_import.import_lines(kind, request.stream, fmt)), 200
+
+# Prometheus text exposition of the request, SQL and subsystem metrics
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Response cache counters (hits, misses, 304s, invalidations) and size
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.backend.stats())
+
+# Review write queue depth, group commit batch sizes and commit / wait latency
+@app.route('/stats/review_queue', methods=['GET'])
+def review_queue_stats():
+    return jsonify(review_queue.stats())
+
+# Connection pool counters (hits, misses, wait time) per database file
+@app.route('/stats/db_pool', methods=['GET'])
+def db_pool_stats():
+    return jsonify(db_pool.pool_stats())
+
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
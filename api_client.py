@@ -0,0 +1,467 @@
+# HTTP client for the Gradio frontend (app.py) talking to the Flask API.
+#
+# The frontend used to call requests.get/post directly: a new TCP connection per click
+# and no timeout. This module keeps a pool of keep-alive connections per client, applies
+# connect/read timeouts, retries idempotent requests (GET, PUT, DELETE) on connection
+# errors and 502/503/504 with exponential backoff, honouring Retry-After, and records a
+# latency histogram per (method, route). POSTs are never retried because they are not
+# idempotent.
+#
+#   ApiClient       blocking, built on a requests.Session with a pooled HTTPAdapter
+#   AsyncApiClient  asyncio, standard library only, for async Gradio event handlers
+#
+# When the frontend and the API run in one process, FRONTEND_TRANSPORT=inprocess skips
+# HTTP altogether: InProcessClient / AsyncInProcessClient hand a WSGI environ straight to
+# the Flask app in api.py, so requests go through the same routes, validation and error
+# responses, minus the socket and the HTTP parsing on both ends.
+#
+# All clients return Response objects and raise ApiError subclasses, so callers handle
+# one shape regardless of the transport. Settings come from the environment:
+#   FRONTEND_TRANSPORT, API_BASE_URL, API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_RETRIES,
+#   API_BACKOFF, API_POOL_SIZE
+
+import asyncio
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:  # only ApiClient needs requests
+    requests = None
+
+TRANSPORTS = ("http", "inprocess")
+TRANSPORT = os.environ.get("FRONTEND_TRANSPORT", "http")
+
+BASE_URL = os.environ.get("API_BASE_URL", "http://127.0.0.1:5000")
+
+# Seconds to establish a connection / to wait for the response once sent
+CONNECT_TIMEOUT = float(os.environ.get("API_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("API_READ_TIMEOUT", 30))
+
+# Extra attempts for idempotent requests, and the base of the backoff between them (seconds)
+RETRIES = int(os.environ.get("API_RETRIES", 2))
+BACKOFF = float(os.environ.get("API_BACKOFF", 0.2))
+MAX_BACKOFF = 5.0
+
+# Keep-alive connections held per client
+POOL_SIZE = int(os.environ.get("API_POOL_SIZE", 10))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+RETRY_STATUSES = (502, 503, 504)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ApiError(Exception):
+    """The API could not be reached or did not answer in time."""
+
+
+class ApiConnectionError(ApiError):
+    pass
+
+
+class ApiTimeout(ApiError):
+    pass
+
+
+class Headers(dict):
+    """Response headers, looked up case-insensitively."""
+
+    def __init__(self, items=()):
+        super().__init__((name.lower(), value) for name, value in items)
+
+    def __getitem__(self, name):
+        return super().__getitem__(name.lower())
+
+    def __contains__(self, name):
+        return super().__contains__(name.lower())
+
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+
+class Response:
+    """Status, headers and body of one API response."""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = Headers(headers.items())
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def route_of(path):
+    """Histogram key for a path: numeric segments become <id> so routes don't explode."""
+    return re.sub(r"/\d+(?=/|$)", "/<id>", path.split("?", 1)[0])
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histograms keyed by (method, route)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, path, seconds, error=False):
+        key = (method, route_of(path))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "errors": 0}
+            series["counts"][bisect.bisect_left(self.buckets, seconds)] += 1
+            series["sum"] += seconds
+            series["errors"] += error
+
+    def stats(self):
+        """{"GET /movies/<id>/reviews": {"count", "sum", "errors", "buckets": {le: cumulative}}}"""
+        with self._lock:
+            report = {}
+            for (method, route), series in sorted(self._series.items()):
+                cumulative, buckets = 0, {}
+                for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                    cumulative += count
+                    buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+                report[f"{method} {route}"] = {
+                    "count": cumulative, "sum": round(series["sum"], 6), "errors": series["errors"], "buckets": buckets,
+                }
+            return report
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after is not None and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF)
+    return min(BACKOFF * (2 ** attempt), MAX_BACKOFF)
+
+
+class ApiClient:
+    """Blocking client over one pooled requests.Session; safe to share between threads."""
+
+    def __init__(self, base_url=BASE_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, pool_size=POOL_SIZE):
+        if requests is None:
+            raise RuntimeError("ApiClient needs the requests package; use AsyncApiClient without it")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.latency = LatencyHistogram()
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=BACKOFF,
+                      status_forcelist=RETRY_STATUSES, allowed_methods=IDEMPOTENT_METHODS,
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, path, params=None, json=None):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, params=params, json=json,
+                                            timeout=self.timeout)
+        except requests.exceptions.Timeout as e:
+            self.latency.observe(method, path, time.perf_counter() - start, error=True)
+            raise ApiTimeout(str(e)) from e
+        except requests.exceptions.RequestException as e:
+            self.latency.observe(method, path, time.perf_counter() - start, error=True)
+            raise ApiConnectionError(str(e)) from e
+        self.latency.observe(method, path, time.perf_counter() - start, error=response.status_code >= 500)
+        return Response(response.status_code, response.headers, response.content)
+
+    def get(self, path, params=None):
+        return self.request("GET", path, params=params)
+
+    def post(self, path, json=None):
+        return self.request("POST", path, json=json)
+
+    def put(self, path, json=None):
+        return self.request("PUT", path, json=json)
+
+    def delete(self, path):
+        return self.request("DELETE", path)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncApiClient:
+    """asyncio HTTP/1.1 client with a keep-alive connection pool.
+
+    The pool belongs to the event loop that first uses it (Gradio runs every async
+    handler on one loop); if a different loop shows up the idle connections are dropped.
+    """
+
+    def __init__(self, base_url=BASE_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, pool_size=POOL_SIZE):
+        url = urlsplit(base_url)
+        self.base_url = base_url.rstrip("/")
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.ssl = url.scheme == "https"
+        self.prefix = url.path.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.latency = LatencyHistogram()
+        self._loop = None
+        self._idle = []
+        self._slots = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            for _, writer in self._idle:
+                writer.close()
+            self._loop, self._idle = loop, []
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def _open(self):
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+                                          self.connect_timeout)
+        except asyncio.TimeoutError as e:
+            raise ApiTimeout(f"connecting to {self.host}:{self.port} timed out") from e
+        except OSError as e:
+            raise ApiConnectionError(f"cannot connect to {self.host}:{self.port}: {e}") from e
+
+    async def _exchange(self, connection, method, target, body):
+        """Send one request and read the response; returns (Response, reusable)."""
+        reader, writer = connection
+        head = [f"{method} {target} HTTP/1.1", f"Host: {self.host}:{self.port}", "Accept-Encoding: identity"]
+        if body is not None:
+            head += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin1") + (body or b""))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        status = int(status)
+
+        reusable = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            content = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            content, reusable = await reader.read(), False
+        return Response(status, headers, content), reusable
+
+    async def _attempt(self, method, target, body):
+        await self._slots.acquire()
+        connection = None
+        try:
+            reused = bool(self._idle)
+            connection = self._idle.pop() if reused else await self._open()
+            try:
+                response, reusable = await asyncio.wait_for(
+                    self._exchange(connection, method, target, body), self.read_timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                connection[1].close()
+                connection = None
+                if not reused or method not in IDEMPOTENT_METHODS:
+                    raise ApiConnectionError(str(e)) from e
+                # The server closed an idle keep-alive connection; try once on a fresh one. Only
+                # idempotent requests: the server may have applied a POST before dropping it
+                connection = await self._open()
+                response, reusable = await asyncio.wait_for(
+                    self._exchange(connection, method, target, body), self.read_timeout)
+            if reusable:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+            connection = None
+            return response
+        except asyncio.TimeoutError as e:
+            raise ApiTimeout(f"{method} {target} timed out after {self.read_timeout}s") from e
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            raise ApiConnectionError(f"{method} {target} failed: {e}") from e
+        finally:
+            if connection is not None:
+                connection[1].close()
+            self._slots.release()
+
+    async def request(self, method, path, params=None, json=None):
+        self._bind_loop()
+        params = {name: value for name, value in (params or {}).items() if value is not None}
+        target = self.prefix + path + ("?" + urlencode(params) if params else "")
+        body = None if json is None else _dumps(json)
+        attempts = 1 + (self.retries if method in IDEMPOTENT_METHODS else 0)
+        start = time.perf_counter()
+        for attempt in range(attempts):
+            try:
+                response = await self._attempt(method, target, body)
+            except ApiError:
+                if attempt + 1 == attempts:
+                    self.latency.observe(method, path, time.perf_counter() - start, error=True)
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                await asyncio.sleep(_backoff(attempt, response.headers.get("retry-after")))
+                continue
+            self.latency.observe(method, path, time.perf_counter() - start, error=response.status_code >= 500)
+            return response
+
+    async def get(self, path, params=None):
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path, json=None):
+        return await self.request("POST", path, json=json)
+
+    async def put(self, path, json=None):
+        return await self.request("PUT", path, json=json)
+
+    async def delete(self, path):
+        return await self.request("DELETE", path)
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+class InProcessClient:
+    """Blocking client that calls the Flask app's WSGI callable directly.
+
+    Responses, status codes and error bodies are exactly what the HTTP API would send;
+    only transport failures (and so retries) cannot happen.
+    """
+
+    def __init__(self, flask_app=None):
+        from werkzeug.test import EnvironBuilder
+        if flask_app is None:
+            from api import app as flask_app
+        self.app = flask_app
+        self._environ_builder = EnvironBuilder
+        self.latency = LatencyHistogram()
+
+    def request(self, method, path, params=None, json=None):
+        start = time.perf_counter()
+        params = {name: value for name, value in (params or {}).items() if value is not None}
+        builder = self._environ_builder(path=path, method=method, query_string=params, json=json)
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [int(status.split(" ", 1)[0]), headers]
+
+        body = self.app(environ, start_response)
+        try:
+            content = b"".join(body)
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        status, headers = started
+        self.latency.observe(method, path, time.perf_counter() - start, error=status >= 500)
+        return Response(status, dict(headers), content)
+
+    def get(self, path, params=None):
+        return self.request("GET", path, params=params)
+
+    def post(self, path, json=None):
+        return self.request("POST", path, json=json)
+
+    def put(self, path, json=None):
+        return self.request("PUT", path, json=json)
+
+    def delete(self, path):
+        return self.request("DELETE", path)
+
+    def close(self):
+        pass
+
+
+class AsyncInProcessClient:
+    """InProcessClient for async handlers: each call runs on a bounded thread pool so the
+    event loop never waits on SQLite."""
+
+    def __init__(self, flask_app=None, read_timeout=READ_TIMEOUT, pool_size=POOL_SIZE):
+        self.client = InProcessClient(flask_app)
+        self.latency = self.client.latency
+        self.read_timeout = read_timeout
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="inprocess-api")
+
+    async def request(self, method, path, params=None, json=None):
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(self.executor, lambda: self.client.request(method, path, params, json))
+        try:
+            return await asyncio.wait_for(call, self.read_timeout)
+        except asyncio.TimeoutError as e:
+            self.latency.observe(method, path, self.read_timeout, error=True)
+            raise ApiTimeout(f"{method} {path} timed out after {self.read_timeout}s") from e
+
+    async def get(self, path, params=None):
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path, json=None):
+        return await self.request("POST", path, json=json)
+
+    async def put(self, path, json=None):
+        return await self.request("PUT", path, json=json)
+
+    async def delete(self, path):
+        return await self.request("DELETE", path)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def client(transport=None, base_url=BASE_URL):
+    """A blocking client for `transport` ("http" or "inprocess", default FRONTEND_TRANSPORT)."""
+    transport = transport or TRANSPORT
+    if transport not in TRANSPORTS:
+        raise ValueError(f"transport must be one of: {', '.join(TRANSPORTS)}")
+    return InProcessClient() if transport == "inprocess" else ApiClient(base_url)
+
+
+def async_client(transport=None, base_url=BASE_URL):
+    """An asyncio client for `transport` ("http" or "inprocess", default FRONTEND_TRANSPORT)."""
+    transport = transport or TRANSPORT
+    if transport not in TRANSPORTS:
+        raise ValueError(f"transport must be one of: {', '.join(TRANSPORTS)}")
+    return AsyncInProcessClient() if transport == "inprocess" else AsyncApiClient(base_url)
+
+
+def _dumps(value):
+    return json.dumps(value).encode("utf-8")
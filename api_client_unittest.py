@@ -0,0 +1,206 @@
+# Unit tests for the frontend's API client
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+import api_client
+import fixtures
+import movies
+from api import app
+
+def serve(wsgi_app):
+    """Running a WSGI app on a free local port in a background thread."""
+    server = make_server("127.0.0.1", 0, wsgi_app, threaded=True)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class TestAsyncApiClient(fixtures.FixtureTestCase):
+
+    fixtures = {movies: fixtures.MOVIES}
+
+    def setUp(self):
+        super().setUp()
+        self.server = serve(app)
+        self.client = api_client.AsyncApiClient(f"http://127.0.0.1:{self.server.server_port}", retries=2)
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_round_trips(self):
+        """Testing JSON requests, header lookup and latency histograms against the real API."""
+        async def scenario():
+            created = await self.client.post("/movies", json={"name": "Inception", "genre": "Science Fiction"})
+            listed = await self.client.get("/movies", params={"limit": 1, "after_id": None})
+            reviews = await self.client.get("/movies/1/reviews")
+            return created, listed, reviews
+
+        created, listed, reviews = asyncio.run(scenario())
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(listed.json()[0]["name"], "Inception")
+        self.assertEqual(listed.headers.get("X-Next-After-Id"), "1")
+        self.assertEqual(reviews.json()["reviews"], [])
+        stats = self.client.latency.stats()
+        self.assertEqual(stats["GET /movies/<id>/reviews"]["count"], 1)
+        self.assertEqual(stats["POST /movies"]["buckets"]["+Inf"], 1)
+
+    def test_in_process_matches_http(self):
+        """Testing that the in-process transport returns the same statuses and bodies as HTTP."""
+        in_process = api_client.AsyncInProcessClient(app)
+        calls = [
+            ("POST", "/movies", None, {"name": "Inception", "genre": "Science Fiction"}),
+            ("POST", "/movies", None, {"name": "No genre"}),
+            ("POST", "/movies/1/reviews", None, {"rating": 5, "note": "Amazing"}),
+            ("GET", "/movies", {"limit": 1}, None),
+            ("GET", "/movies", {"limit": "lots"}, None),
+            ("GET", "/movies/genre", None, None),
+            ("GET", "/nowhere", None, None),
+            ("POST", "/movies/reviews/batch", None, [{"title_id": 9, "rating": 1, "note": "x"}]),
+        ]
+
+        async def scenario(client):
+            responses = []
+            for method, path, params, body in calls:
+                response = await client.request(method, path, params=params, json=body)
+                responses.append((response.status_code, response.content, response.headers.get("x-next-after-id")))
+            return responses
+
+        over_http = asyncio.run(scenario(self.client))
+        self.reset()
+        self.assertEqual(asyncio.run(scenario(in_process)), over_http)
+        self.assertEqual([status for status, _, _ in over_http], [201, 400, 201, 200, 400, 400, 404, 400])
+        self.assertEqual(in_process.latency.stats()["GET /movies"]["count"], 2)
+        self.assertEqual(api_client.client("inprocess").get("/movies").status_code, 200)
+        with self.assertRaises(ValueError):
+            api_client.async_client("carrier-pigeon")
+
+class TestKeepAlive(unittest.TestCase):
+
+    def test_requests_share_one_connection(self):
+        """Testing that sequential requests reuse a pooled HTTP/1.1 connection."""
+        connections = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                connections.append(self.client_address)
+                super().setup()
+
+            def do_GET(self):
+                body = json.dumps({"path": self.path}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = api_client.AsyncApiClient(f"http://127.0.0.1:{server.server_port}")
+
+        async def scenario():
+            paths = [(await client.get(f"/movies/{i}")).json()["path"] for i in range(5)]
+            await client.close()
+            return paths
+
+        try:
+            self.assertEqual(asyncio.run(scenario()), [f"/movies/{i}" for i in range(5)])
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(len(connections), 1)
+        self.assertEqual(client.latency.stats()["GET /movies/<id>"]["count"], 5)
+
+    def test_dropped_post_is_not_resent(self):
+        """Testing that a POST the server applied before dropping a reused connection is sent once."""
+        posts = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def do_POST(self):
+                posts.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.close_connection = True  # applied, then gone without an answer
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = api_client.AsyncApiClient(f"http://127.0.0.1:{server.server_port}", retries=2)
+
+        async def scenario():
+            await client.get("/movies")
+            try:
+                await client.post("/movies/1/reviews", json={"rating": 5})
+            finally:
+                await client.close()
+
+        try:
+            with self.assertRaises(api_client.ApiConnectionError):
+                asyncio.run(scenario())
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(posts, [{"rating": 5}])
+
+class TestRetriesAndTimeouts(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        flaky = Flask(__name__)
+
+        @flaky.route('/flaky', methods=['GET', 'POST'])
+        def flaky_route():
+            self.calls.append(request.method)
+            if len(self.calls) % 2:
+                return jsonify({"error": "busy"}), 503, {"Retry-After": "0"}
+            return jsonify({"ok": True})
+
+        @flaky.route('/slow')
+        def slow_route():
+            time.sleep(0.5)
+            return jsonify({})
+
+        self.server = serve(flaky)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_only_idempotent_requests_are_retried(self):
+        """Testing that a 503 GET is retried after Retry-After while a POST gets the 503 back."""
+        client = api_client.AsyncApiClient(self.base_url, retries=2)
+        self.assertEqual(asyncio.run(client.get("/flaky")).json(), {"ok": True})
+        self.assertEqual(asyncio.run(client.post("/flaky", json={})).status_code, 503)
+        self.assertEqual(self.calls, ["GET", "GET", "POST"])
+
+    def test_errors_are_api_errors(self):
+        """Testing that timeouts and refused connections raise ApiError subclasses."""
+        client = api_client.AsyncApiClient(self.base_url, read_timeout=0.1, retries=0)
+        with self.assertRaises(api_client.ApiTimeout):
+            asyncio.run(client.get("/slow"))
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertRaises(api_client.ApiConnectionError):
+            asyncio.run(api_client.AsyncApiClient(self.base_url, retries=1).get("/flaky"))
+
+if __name__ == '__main__':
+    unittest.main()
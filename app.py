@@ -1,11 +1,18 @@
 import gradio as gr
-import requests
-import movies
-import tv_shows
-import books
+import api_client
+import home_page
 
-# Base URL of the Flask API
-BASE_URL = "http://127.0.0.1:5000"
+# Base URL of the Flask API (API_BASE_URL in the environment)
+BASE_URL = api_client.BASE_URL
+
+# One client for every handler; the handlers are async so a slow API call never ties up a
+# Gradio worker thread. FRONTEND_TRANSPORT=http (default) uses a pooled keep-alive
+# connection to BASE_URL; =inprocess runs api.py's routes in this process with no HTTP.
+# api.latency.stats() has per-route timings.
+api = api_client.async_client(api_client.TRANSPORT, BASE_URL)
+
+# Titles fetched per click on the "View All" tabs; "Next Page" fetches the following page
+PAGE_SIZE = 20
  
 # Functions to interact with the API
 
@@ -13,22 +20,22 @@ BASE_URL = "http://127.0.0.1:5000"
 # First: Movie Tab functions, Aditi, Dec 2
 
 # Adding a movie
-def add_movie_frontend(movie_name, genre):
+async def add_movie_frontend(movie_name, genre):
     # Aditi, dec 2, 2024
     if not movie_name.strip():
         return "❌ Error: Movie name cannot be empty!"
     if not genre.strip():
         return "❌ Error: Genre cannot be empty!"
     try:
-        response = requests.post(f"{BASE_URL}/movies", json={"name": movie_name, "genre": genre})
+        response = await api.post("/movies", json={"name": movie_name, "genre": genre})
         if response.status_code == 201:
             return response.json().get("message", "✅ Movie added successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Adding a review to a movie
-def add_review_frontend(movie_id, rating, note):
+async def add_review_frontend(movie_id, rating, note):
     # Aditi, Dec 2, 2024
     if not movie_id.isdigit():
         return "❌ Error: Movie ID must be an integer!"
@@ -37,60 +44,60 @@ def add_review_frontend(movie_id, rating, note):
     if not note.strip():
         return "❌ Error: Review note cannot be empty!"
     try:
-        response = requests.post(
-            f"{BASE_URL}/movies/{movie_id}/reviews",
+        response = await api.post(
+            f"/movies/{movie_id}/reviews",
             json={"rating": float(rating), "note": note},
         )
         if response.status_code == 201:
             return response.json().get("message", "✅ Review added successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Editing a review
-def edit_review_frontend(movie_id, review_id, rating, note):
+async def edit_review_frontend(movie_id, review_id, rating, note):
     # Aditi, Dec 2, 2024
     if not movie_id.isdigit() or not review_id.isdigit():
         return "❌ Error: Both Movie ID and Review ID must be integers!"
     try:
-        response = requests.put(
-            f"{BASE_URL}/movies/{movie_id}/reviews/{review_id}",
+        response = await api.put(
+            f"/movies/{movie_id}/reviews/{review_id}",
             json={"rating": float(rating), "note": note},
         )
         return response.json().get("message", "✅ Review updated successfully!")
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Deleting a review
-def delete_review_frontend(movie_id, review_id):
+async def delete_review_frontend(movie_id, review_id):
     # Aditi, Dec 2, 2024
     if not movie_id.isdigit() or not review_id.isdigit():
         return "❌ Error: Both Movie ID and Review ID must be integers!"
     try:
-        response = requests.delete(f"{BASE_URL}/movies/{movie_id}/reviews/{review_id}")
+        response = await api.delete(f"/movies/{movie_id}/reviews/{review_id}")
         return response.json().get("message", "✅ Review deleted successfully!")
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Deleting a movie
-def delete_movie_frontend(movie_id):
+async def delete_movie_frontend(movie_id):
     # Aditi, Dec 2, 2024
     if not movie_id.isdigit():
         return "❌ Error: Movie ID must be an integer!"
     try:
-        response = requests.delete(f"{BASE_URL}/movies/{movie_id}")
+        response = await api.delete(f"/movies/{movie_id}")
         return response.json().get("message", "✅ Movie deleted successfully!")
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 
 # Searching by genre
-def search_by_genre_frontend(genre):
+async def search_by_genre_frontend(genre):
     # Aditi, Dec 2, 2024
     if not genre.strip():
         return "❌ Error: Genre cannot be empty!"
     try:
-        response = requests.get(f"{BASE_URL}/movies/genre", params={"genre": genre})
+        response = await api.get("/movies/genre", params={"genre": genre})
         if response.status_code == 200:
             movies = response.json()
             if not movies:
@@ -100,19 +107,25 @@ def search_by_genre_frontend(genre):
                 output.append(f"Movie #{movie['id']}: {movie['name']}")
             return "\n".join(output)
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 
-# Viewing all movies
-def view_movies_frontend():
+# Viewing all movies, one page at a time. Returns the text and the cursor for the next page.
+async def view_movies_frontend(after_id=None):
     # Aditi, Dec 2, 2024
     try:
-        response = requests.get(f"{BASE_URL}/movies")
+        params = {"limit": PAGE_SIZE}
+        if after_id:
+            params["after_id"] = after_id
+        response = await api.get("/movies", params=params)
         if response.status_code == 200:
             movies = response.json()
+            next_after_id = response.headers.get("X-Next-After-Id")
             if not movies:
-                return "🎥 No movies found. Add some to get started!"
+                if after_id:
+                    return "🎥 No more movies.", None
+                return "🎥 No movies found. Add some to get started!", None
             output = ["🎥 Movie List:"]
             for movie in movies:
                 output.append(f"Movie #{movie['id']}: {movie['name']} (Genre: {movie['genre']})")
@@ -123,18 +136,26 @@ def view_movies_frontend():
                         output.append(
                             f"   Review #{review['review_id']} | Rating: {review['rating']}/5 | {review['note']}"
                         )
-            return "\n".join(output)
-        return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
-        return f"❌ Error: Failed to connect to the API - {str(e)}"
+            if next_after_id:
+                output.append("\n➡️ More movies available, click Next Page.")
+            return "\n".join(output), next_after_id
+        return f"❌ Error: {response.json().get('error', 'Unexpected error')}", None
+    except api_client.ApiError as e:
+        return f"❌ Error: Failed to connect to the API - {str(e)}", None
+
+# "Next Page" for movies; the cursor is None before the first View All and after the last page
+async def next_movies_frontend(after_id):
+    if after_id is None:
+        return "🎥 No more results. Click View All Movies to start from the beginning.", None
+    return await view_movies_frontend(after_id)
 
 # Searching reviews by movie ID
-def search_reviews_frontend(movie_id):
+async def search_reviews_frontend(movie_id):
     # Aditi, Dec 2, 2024
     if not movie_id.isdigit():
         return "❌ Error: Movie ID must be an integer!"
     try:
-        response = requests.get(f"{BASE_URL}/movies/{movie_id}/reviews")
+        response = await api.get(f"/movies/{movie_id}/reviews")
         if response.status_code == 200:
             movie = response.json()
             output = [f"🎥 Movie: {movie['name']} (Genre: {movie['genre']})"]
@@ -147,7 +168,7 @@ def search_reviews_frontend(movie_id):
                     )
             return "\n".join(output)
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
     
 
@@ -156,21 +177,21 @@ def search_reviews_frontend(movie_id):
 
 # tv_show 
 
-def add_tv_show_frontend(title, genre):
+async def add_tv_show_frontend(title, genre):
     if not title.strip():
         return "❌ Error: TV Show title cannot be empty!"
     if not genre.strip():
         return "❌ Error: Genre cannot be empty!"
     try:
-        response = requests.post(f"{BASE_URL}/tv_shows", json={"title": title, "genre": genre})
+        response = await api.post("/tv_shows", json={"title": title, "genre": genre})
         if response.status_code == 201:
             return response.json().get("message", "✅ TV Show added successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Adding a review to a TV show
-def add_tv_review_frontend(tv_show_id, rating, note):
+async def add_tv_review_frontend(tv_show_id, rating, note):
     if not tv_show_id.isdigit():
         return "❌ Error: TV Show ID must be an integer!"
     if not (0 <= float(rating) <= 5):
@@ -178,55 +199,55 @@ def add_tv_review_frontend(tv_show_id, rating, note):
     if not note.strip():
         return "❌ Error: Review note cannot be empty!"
     try:
-        response = requests.post(
-            f"{BASE_URL}/tv_shows/{tv_show_id}/reviews",
+        response = await api.post(
+            f"/tv_shows/{tv_show_id}/reviews",
             json={"rating": float(rating), "note": note},
         )
         if response.status_code == 201:
             return response.json().get("message", "✅ Review added successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Editing a review
-def edit_tv_review_frontend(tv_show_id, review_id, rating, note):
+async def edit_tv_review_frontend(tv_show_id, review_id, rating, note):
     if not tv_show_id.isdigit() or not review_id.isdigit():
         return "❌ Error: Both TV Show ID and Review ID must be integers!"
     try:
-        response = requests.put(
-            f"{BASE_URL}/tv_shows/{tv_show_id}/reviews/{review_id}",
+        response = await api.put(
+            f"/tv_shows/{tv_show_id}/reviews/{review_id}",
             json={"rating": float(rating), "note": note},
         )
         return response.json().get("message", "✅ Review updated successfully!")
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Deleting a review
-def delete_tv_review_frontend(tv_show_id, review_id):
+async def delete_tv_review_frontend(tv_show_id, review_id):
     if not tv_show_id.isdigit() or not review_id.isdigit():
         return "❌ Error: Both TV Show ID and Review ID must be integers!"
     try:
-        response = requests.delete(f"{BASE_URL}/tv_shows/{tv_show_id}/reviews/{review_id}")
+        response = await api.delete(f"/tv_shows/{tv_show_id}/reviews/{review_id}")
         return response.json().get("message", "✅ Review deleted successfully!")
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Deleting a TV show
-def delete_tv_show_frontend(tv_show_id):
+async def delete_tv_show_frontend(tv_show_id):
     if not tv_show_id.isdigit():
         return "❌ Error: TV Show ID must be an integer!"
     try:
-        response = requests.delete(f"{BASE_URL}/tv_shows/{tv_show_id}")
+        response = await api.delete(f"/tv_shows/{tv_show_id}")
         return response.json().get("message", "✅ TV Show deleted successfully!")
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Searching by genre
-def search_tv_by_genre_frontend(genre):
+async def search_tv_by_genre_frontend(genre):
     if not genre.strip():
         return "❌ Error: Genre cannot be empty!"
     try:
-        response = requests.get(f"{BASE_URL}/tv_shows/genre", params={"genre": genre})
+        response = await api.get("/tv_shows/genre", params={"genre": genre})
         if response.status_code == 200:
             tv_shows = response.json()
             if not tv_shows:
@@ -236,17 +257,23 @@ def search_tv_by_genre_frontend(genre):
                 output.append(f"TV Show #{tv_show['id']}: {tv_show['title']}")
             return "\n".join(output)
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
-# Viewing all TV shows
-def view_tv_shows_frontend():
+# Viewing all TV shows, one page at a time. Returns the text and the cursor for the next page.
+async def view_tv_shows_frontend(after_id=None):
     try:
-        response = requests.get(f"{BASE_URL}/tv_shows")
+        params = {"limit": PAGE_SIZE}
+        if after_id:
+            params["after_id"] = after_id
+        response = await api.get("/tv_shows", params=params)
         if response.status_code == 200:
             tv_shows = response.json()
+            next_after_id = response.headers.get("X-Next-After-Id")
             if not tv_shows:
-                return "📺 No TV Shows found. Add some to get started!"
+                if after_id:
+                    return "📺 No more TV Shows.", None
+                return "📺 No TV Shows found. Add some to get started!", None
             output = ["📺 TV Show List:"]
             for tv_show in tv_shows:
                 output.append(f"TV Show #{tv_show['id']}: {tv_show['title']} (Genre: {tv_show['genre']})")
@@ -257,17 +284,25 @@ def view_tv_shows_frontend():
                         output.append(
                             f"   Review #{review['review_id']} | Rating: {review['rating']}/5 | {review['note']}"
                         )
-            return "\n".join(output)
-        return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
-        return f"❌ Error: Failed to connect to the API - {str(e)}"
+            if next_after_id:
+                output.append("\n➡️ More TV Shows available, click Next Page.")
+            return "\n".join(output), next_after_id
+        return f"❌ Error: {response.json().get('error', 'Unexpected error')}", None
+    except api_client.ApiError as e:
+        return f"❌ Error: Failed to connect to the API - {str(e)}", None
+
+# "Next Page" for TV shows; the cursor is None before the first View All and after the last page
+async def next_tv_shows_frontend(after_id):
+    if after_id is None:
+        return "📺 No more results. Click View All TV Shows to start from the beginning.", None
+    return await view_tv_shows_frontend(after_id)
 
 # Searching reviews by TV show ID
-def search_tv_reviews_frontend(tv_show_id):
+async def search_tv_reviews_frontend(tv_show_id):
     if not tv_show_id.isdigit():
         return "❌ Error: TV Show ID must be an integer!"
     try:
-        response = requests.get(f"{BASE_URL}/tv_shows/{tv_show_id}/reviews")
+        response = await api.get(f"/tv_shows/{tv_show_id}/reviews")
         if response.status_code == 200:
             tv_show = response.json()
             output = [f"📺 TV Show: {tv_show['title']} (Genre: {tv_show['genre']})"]
@@ -280,25 +315,25 @@ def search_tv_reviews_frontend(tv_show_id):
                     )
             return "\n".join(output)
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Adding a new book
-def add_book(book_title, genre):
+async def add_book(book_title, genre):
     if not book_title.strip():
         return "❌ Error: Book title cannot be empty!"
     if not genre.strip():
         return "❌ Error: Genre cannot be empty!"
     try:
-        response = requests.post(f"{BASE_URL}/books", json={"title": book_title, "genre": genre})
+        response = await api.post("/books", json={"title": book_title, "genre": genre})
         if response.status_code == 201:
             return response.json().get("message", "✅ Book added successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Adding a review to a book
-def add_review(book_id, rating, note):
+async def add_review(book_id, rating, note):
     if not book_id.isdigit():
         return "❌ Error: Book ID must be an integer!"
     if not (0 <= float(rating) <= 5):
@@ -306,18 +341,18 @@ def add_review(book_id, rating, note):
     if not note.strip():
         return "❌ Error: Review note cannot be empty!"
     try:
-        response = requests.post(
-            f"{BASE_URL}/books/{book_id}/reviews",
+        response = await api.post(
+            f"/books/{book_id}/reviews",
             json={"rating": float(rating), "note": note},
         )
         if response.status_code == 201:
             return response.json().get("message", "✅ Review added successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Editing a review
-def edit_review(book_id, review_id, rating=None, note=None):
+async def edit_review(book_id, review_id, rating=None, note=None):
     if not book_id.isdigit() or not review_id.isdigit():
         return "❌ Error: Both Book ID and Review ID must be integers!"
     payload = {}
@@ -330,43 +365,43 @@ def edit_review(book_id, review_id, rating=None, note=None):
     if not payload:
         return "❌ Error: No data provided for update!"
     try:
-        response = requests.put(f"{BASE_URL}/books/{book_id}/reviews/{review_id}", json=payload)
+        response = await api.put(f"/books/{book_id}/reviews/{review_id}", json=payload)
         if response.status_code == 200:
             return response.json().get("message", "✅ Review updated successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Deleting a book
-def delete_book(book_id):
+async def delete_book(book_id):
     if not book_id.isdigit():
         return "❌ Error: Book ID must be an integer!"
     try:
-        response = requests.delete(f"{BASE_URL}/books/{book_id}")
+        response = await api.delete(f"/books/{book_id}")
         if response.status_code == 200:
             return response.json().get("message", "✅ Book deleted successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Deleting a review
-def delete_review(book_id, review_id):
+async def delete_review(book_id, review_id):
     if not book_id.isdigit() or not review_id.isdigit():
         return "❌ Error: Both Book ID and Review ID must be integers!"
     try:
-        response = requests.delete(f"{BASE_URL}/books/{book_id}/reviews/{review_id}")
+        response = await api.delete(f"/books/{book_id}/reviews/{review_id}")
         if response.status_code == 200:
             return response.json().get("message", "✅ Review deleted successfully!")
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 # Searching books by genre
-def search_books_by_genre(genre):
+async def search_books_by_genre(genre):
     if not genre.strip():
         return "❌ Error: Genre cannot be empty!"
     try:
-        response = requests.get(f"{BASE_URL}/books/genre", params={"genre": genre})
+        response = await api.get("/books/genre", params={"genre": genre})
         if response.status_code == 200:
             books = response.json()
             if not books:
@@ -376,17 +411,23 @@ def search_books_by_genre(genre):
                 output.append(f"Book #{book['id']}: {book['title']}")
             return "\n".join(output)
         return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
-# Viewing all books
-def view_books():
+# Viewing all books, one page at a time. Returns the text and the cursor for the next page.
+async def view_books(after_id=None):
     try:
-        response = requests.get(f"{BASE_URL}/books")
+        params = {"limit": PAGE_SIZE}
+        if after_id:
+            params["after_id"] = after_id
+        response = await api.get("/books", params=params)
         if response.status_code == 200:
             books = response.json()
+            next_after_id = response.headers.get("X-Next-After-Id")
             if not books:
-                return "📚 No books found. Add some to get started!"
+                if after_id:
+                    return "📚 No more books.", None
+                return "📚 No books found. Add some to get started!", None
             output = ["📚 Book List:"]
             for book in books:
                 output.append(f"Book #{book['id']}: {book['title']} (Genre: {book['genre']})")
@@ -397,9 +438,54 @@ def view_books():
                         output.append(
                             f"   Review #{review['review_id']} | Rating: {review['rating']}/5 | {review['note']}"
                         )
-            return "\n".join(output)
-        return f"❌ Error: {response.json().get('error', 'Unexpected error')}"
-    except requests.exceptions.RequestException as e:
+            if next_after_id:
+                output.append("\n➡️ More books available, click Next Page.")
+            return "\n".join(output), next_after_id
+        return f"❌ Error: {response.json().get('error', 'Unexpected error')}", None
+    except api_client.ApiError as e:
+        return f"❌ Error: Failed to connect to the API - {str(e)}", None
+
+# "Next Page" for books; the cursor is None before the first View All and after the last page
+async def next_books(after_id):
+    if after_id is None:
+        return "📚 No more results. Click View All Books to start from the beginning.", None
+    return await view_books(after_id)
+
+
+# Home page: sections come from home_page's shared cache and are shown as they arrive
+home = home_page.HomePageCache(api)
+
+async def home_page_frontend():
+    async for texts in home.render():
+        yield tuple(texts)
+
+
+# Multi-row review entry shared by the movie, TV show and book tabs: every filled row of
+# the table (ID, rating, note) goes to the API in one batch and one transaction.
+REVIEW_ROWS_HEADERS = ["ID", "Rating", "Note"]
+
+async def add_reviews_batch_frontend(media, rows):
+    reviews = []
+    for row in rows or []:
+        if not any(str(cell).strip() for cell in row):
+            continue
+        title_id, rating, note = (list(row) + ["", "", ""])[:3]
+        reviews.append({"title_id": str(title_id).strip(), "rating": rating, "note": note})
+    if not reviews:
+        return "❌ Error: Fill in at least one row!"
+    try:
+        response = await api.post(f"/{media}/reviews/batch", json=reviews)
+        report = response.json()
+        if "results" not in report:
+            return f"❌ Error: {report.get('error', 'Unexpected error')}"
+        output = [f"✅ {report['created']} review(s) added, {report['errors']} rejected"]
+        for result in report["results"]:
+            if result["status"] == "created":
+                output.append(f"Row {result['index'] + 1}: review #{result['review_id']} added")
+            elif result["status"] == "error":
+                output.append(f"Row {result['index'] + 1}: ❌ {result['error']}")
+        return "\n".join(output)
+    except api_client.ApiError as e:
         return f"❌ Error: Failed to connect to the API - {str(e)}"
 
 
@@ -415,14 +501,13 @@ with gr.Blocks() as demo:
         with gr.Row():
             gr.Markdown("# Welcome to our Media Recommendation App!!")
             #Display Genres
-            genres = movies.view_movie_genre()
-            value = ", ".join(genres) if genres else "No genres available"
-            movie_genres = gr.Textbox(value = value , label = "Movies genres")
+            movie_genres = gr.Textbox(value=home_page.LOADING, label="Movies genres")
         # Display Top Movies
         with gr.Row():
-            movie = movies.view_top_movies()
-            value = ", ".join(movie) if movie else "No movies available"
-            top_movies = gr.Textbox(value= value, label = "Top rated movies")
+            top_movies = gr.Textbox(value=home_page.LOADING, label="Top rated movies")
+        # Filled after the page loads, then refreshed from the shared cache on a timer
+        demo.load(home_page_frontend, inputs=None, outputs=[movie_genres, top_movies])
+        gr.Timer(home_page.REFRESH_SECONDS).tick(home_page_frontend, inputs=None, outputs=[movie_genres, top_movies])
 
 
     with gr.Tab("Add a Movie"):
@@ -444,6 +529,19 @@ with gr.Blocks() as demo:
             outputs=review_output,
         )
 
+    with gr.Tab("Add Several Reviews"):
+        movie_batch_rows_input = gr.Dataframe(
+            headers=REVIEW_ROWS_HEADERS, datatype=["str", "number", "str"], row_count=(5, "dynamic"),
+            col_count=(3, "fixed"), type="array", label="Movie ID, rating (0-5) and note, one review per row",
+        )
+        movie_batch_rows_btn = gr.Button("Submit All Reviews")
+        movie_batch_rows_output = gr.Textbox(label="Status")
+        movie_batch_rows_btn.click(
+            add_reviews_batch_frontend,
+            inputs=[gr.State("movies"), movie_batch_rows_input],
+            outputs=movie_batch_rows_output,
+        )
+
     with gr.Tab("Edit a Review"):
         edit_movie_id_input = gr.Textbox(label="Movie ID", placeholder="Enter movie ID...")
         edit_review_id_input = gr.Textbox(label="Review ID", placeholder="Enter review ID...")
@@ -488,8 +586,11 @@ with gr.Blocks() as demo:
 
     with gr.Tab("View Movies"):
         view_movies_btn = gr.Button("View All Movies")
+        next_movies_btn = gr.Button("Next Page")
         movies_display = gr.Textbox(label="Movie List", interactive=False)
-        view_movies_btn.click(view_movies_frontend, inputs=[], outputs=movies_display)
+        movies_cursor = gr.State(None)
+        view_movies_btn.click(view_movies_frontend, inputs=[], outputs=[movies_display, movies_cursor])
+        next_movies_btn.click(next_movies_frontend, inputs=movies_cursor, outputs=[movies_display, movies_cursor])
 
 
 
@@ -521,6 +622,19 @@ with gr.Blocks() as demo:
                 outputs=tv_review_output,
             )
 
+        with gr.Tab("Add Several Reviews"):
+            tv_batch_rows_input = gr.Dataframe(
+                headers=REVIEW_ROWS_HEADERS, datatype=["str", "number", "str"], row_count=(5, "dynamic"),
+                col_count=(3, "fixed"), type="array", label="TV Show ID, rating (0-5) and note, one review per row",
+            )
+            tv_batch_rows_btn = gr.Button("Submit All Reviews")
+            tv_batch_rows_output = gr.Textbox(label="Status")
+            tv_batch_rows_btn.click(
+                add_reviews_batch_frontend,
+                inputs=[gr.State("tv_shows"), tv_batch_rows_input],
+                outputs=tv_batch_rows_output,
+            )
+
         with gr.Tab("Edit a Review"):
             edit_tv_show_id_input = gr.Textbox(label="TV Show ID", placeholder="Enter TV show ID...")
             edit_tv_review_id_input = gr.Textbox(label="Review ID", placeholder="Enter review ID...")
@@ -565,8 +679,11 @@ with gr.Blocks() as demo:
 
         with gr.Tab("View TV Shows"):
             view_tv_shows_btn = gr.Button("View All TV Shows")
+            next_tv_shows_btn = gr.Button("Next Page")
             tv_shows_display = gr.Textbox(label="TV Show List", interactive=False)
-            view_tv_shows_btn.click(view_tv_shows_frontend, inputs=[], outputs=tv_shows_display)
+            tv_shows_cursor = gr.State(None)
+            view_tv_shows_btn.click(view_tv_shows_frontend, inputs=[], outputs=[tv_shows_display, tv_shows_cursor])
+            next_tv_shows_btn.click(next_tv_shows_frontend, inputs=tv_shows_cursor, outputs=[tv_shows_display, tv_shows_cursor])
 
 
 # Books Tab
@@ -592,6 +709,19 @@ with gr.Blocks() as demo:
                 outputs=review_output,
             )
 
+        with gr.Tab("Add Several Reviews"):
+            book_batch_rows_input = gr.Dataframe(
+                headers=REVIEW_ROWS_HEADERS, datatype=["str", "number", "str"], row_count=(5, "dynamic"),
+                col_count=(3, "fixed"), type="array", label="Book ID, rating (0-5) and note, one review per row",
+            )
+            book_batch_rows_btn = gr.Button("Submit All Reviews")
+            book_batch_rows_output = gr.Textbox(label="Status")
+            book_batch_rows_btn.click(
+                add_reviews_batch_frontend,
+                inputs=[gr.State("books"), book_batch_rows_input],
+                outputs=book_batch_rows_output,
+            )
+
         with gr.Tab("Edit a Review"):
             edit_book_id_input = gr.Textbox(label="Book ID", placeholder="Enter book ID...")
             edit_review_id_input = gr.Textbox(label="Review ID", placeholder="Enter review ID...")
@@ -636,8 +766,11 @@ with gr.Blocks() as demo:
 
         with gr.Tab("View Books"):
             view_books_btn = gr.Button("View All Books")
+            next_books_btn = gr.Button("Next Page")
             books_display = gr.Textbox(label="Book List", interactive=False)
-            view_books_btn.click(view_books, inputs=[], outputs=books_display)
+            books_cursor = gr.State(None)
+            view_books_btn.click(view_books, inputs=[], outputs=[books_display, books_cursor])
+            next_books_btn.click(next_books, inputs=books_cursor, outputs=[books_display, books_cursor])
 
 
 
@@ -0,0 +1,164 @@
+# Asynchronous (ASGI) serving mode for the api.py routes.
+#
+# The event loop owns the sockets, so one process can hold thousands of open
+# connections; only the request handling itself runs on a bounded thread pool
+# sized to the database connection pool. Routes, status codes and JSON bodies are
+# exactly those of api.py because each request is dispatched to the same Flask app.
+# Request bodies are read on the event loop and buffered before dispatch; streamed
+# responses (?stream= on the list endpoints) are sent on as each chunk is produced.
+#
+#   uvicorn asgi:app --host 127.0.0.1 --port 5000
+#
+# Environment: ASGI_WORKERS (default DB_POOL_SIZE) handler threads, ASGI_MAX_PENDING
+# (default 1000) requests waiting for a thread before new ones get 503.
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import db_pool
+from api import app as flask_app
+
+WORKERS = int(os.environ.get("ASGI_WORKERS", flask_app.config["DB_POOL_SIZE"]))
+MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", 1000))
+
+executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="asgi-db")
+pending = 0
+
+
+def build_environ(scope, body):
+    """Translate an ASGI http scope and its buffered body into a WSGI environ.
+
+    The body is already complete, so CONTENT_LENGTH is its real size even for chunked uploads.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name not in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_flask(environ):
+    """Run one request through the Flask app on a worker thread; returns (status, headers, body).
+
+    body is bytes, except for streamed responses (no Content-Length) where it is the
+    still-open WSGI iterable for stream_response to drain.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers]
+
+    result = flask_app.wsgi_app(environ, start_response)
+    if not any(name == b"content-length" for name, _ in started["headers"]):
+        return started["status"], started["headers"], result
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return started["status"], started["headers"], body
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_response(send, status, headers, body):
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def stream_response(send, status, headers, body):
+    """Send a streamed WSGI body chunk by chunk, producing each chunk on the executor.
+
+    send() waits while the client is slow to read, so at most one chunk is in flight.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = iter(body)
+    try:
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(body, "close"):
+            await loop.run_in_executor(executor, body.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=True)
+            db_pool.close_all()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    global pending
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    body = await read_body(receive)
+    if body is None:
+        return
+    if pending >= MAX_PENDING:
+        await send_response(send, 503, [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+                            b'{"error": "Server is busy, try again shortly"}\n')
+        return
+
+    pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        status, headers, payload = await loop.run_in_executor(executor, call_flask, build_environ(scope, body))
+    finally:
+        pending -= 1
+    if isinstance(payload, bytes):
+        await send_response(send, status, headers, payload)
+    else:
+        await stream_response(send, status, headers, payload)
@@ -0,0 +1,74 @@
+# Unit tests for the ASGI serving mode
+
+import asyncio
+import json
+import unittest
+import asgi
+import fixtures
+import movies
+from api import app as flask_app
+
+def call(method, path, query=b"", body=b"", headers=()):
+    """Running one request through asgi.app; returns (status, headers dict, body)."""
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "http_version": "1.1", "headers": list(headers),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), b"".join(message["body"] for message in sent[1:])
+
+class TestAsgi(fixtures.FixtureTestCase):
+
+    fixtures = {movies: fixtures.MOVIES}
+
+    def setUp(self):
+        """Adding one reviewed movie to the fixture database."""
+        super().setUp()
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_review(1, 5, "Amazing movie!")
+
+    def test_same_responses_as_flask(self):
+        """Testing that GET routes return the same status, body and paging header as api.py."""
+        status, headers, body = call("GET", "/movies", b"limit=1")
+        expected = flask_app.test_client().get('/movies?limit=1')
+        self.assertEqual(status, expected.status_code)
+        self.assertEqual(json.loads(body), expected.get_json())
+        self.assertEqual(headers[b"x-next-after-id"], b"1")
+        self.assertEqual(call("GET", "/movies/genre")[0], 400)
+
+    def test_streamed_listing_is_sent_in_chunks(self):
+        """Testing that ?stream=ndjson responses go out as a chunked body with the same items."""
+        status, headers, body = call("GET", "/movies", b"stream=ndjson")
+        self.assertEqual(status, 200)
+        self.assertNotIn(b"content-length", headers)
+        self.assertEqual([json.loads(line) for line in body.splitlines()], flask_app.test_client().get('/movies').get_json())
+
+    def test_post_body_is_passed_through(self):
+        """Testing that JSON request bodies reach the Flask handlers."""
+        status, _, body = call("POST", "/movies/1/reviews", body=b'{"rating": 4, "note": "Clever"}',
+                               headers=[(b"content-type", b"application/json")])
+        self.assertEqual(status, 201)
+        self.assertEqual(len(movies.search_reviews(1)["reviews"]), 2)
+
+    def test_busy_server_returns_503(self):
+        """Testing that requests beyond ASGI_MAX_PENDING are turned away."""
+        original = asgi.MAX_PENDING
+        asgi.MAX_PENDING = 0
+        try:
+            status, headers, _ = call("GET", "/movies")
+        finally:
+            asgi.MAX_PENDING = original
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b"retry-after"], b"1")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,2 @@
+# Benchmarks for the review app backend. Run from the repo root, e.g.
+#   python -m benchmarks.view_reviews_bench
@@ -0,0 +1,199 @@
+# Synthetic catalogs for the benchmarks: movies, TV shows and books databases of a given
+# review count (1k to 10M), generated deterministically from a seed.
+#
+# The distributions follow what public review sites show rather than uniform noise:
+#   genres      Zipf-like, a few large genres (Drama, Comedy) and a long tail
+#   popularity  log-normal reviews per title, so most titles have a handful of reviews
+#               and a few blockbusters have thousands
+#   ratings     J-shaped overall (many 5s, fewer 4s, a bump at 1), drawn per title from an
+#               acclaimed, mixed or panned profile so titles have distinct averages
+#   notes       a few words from a small vocabulary, occasionally empty
+#
+# Files are named <media>-<reviews>-<titles>-<seed>.db in the output directory and reused when
+# they already exist. Rows go through MediaRepository.add_titles / add_reviews in
+# batches of BATCH_SIZE. The two per-review insert triggers (rating_stats and the review
+# full-text index) are dropped for the load and recreated afterwards, with both tables
+# rebuilt in one pass; row-by-row trigger work made loading about ten times slower.
+#
+#   python -m benchmarks.datagen --reviews 1000000 [--titles N] [--seed 0] [--output bench_data]
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import time
+
+import books
+import database_setup
+import db_pool
+import movies
+import tv_shows
+
+MEDIA = {
+    "movies": (movies, database_setup.initialize_db),
+    "tv_shows": (tv_shows, database_setup.initialize_tvshow_db),
+    "books": (books, database_setup.initialize_database),
+}
+
+GENRES = {
+    "movies": ["Drama", "Comedy", "Action", "Thriller", "Horror", "Romance", "Science Fiction",
+               "Animation", "Documentary", "Crime", "Fantasy", "Adventure", "Mystery", "Family",
+               "War", "Western", "Musical", "History"],
+    "tv_shows": ["Drama", "Comedy", "Reality", "Crime", "Documentary", "Animation", "Science Fiction",
+                 "Thriller", "Fantasy", "Talk Show", "Mystery", "Family", "Sport", "Game Show"],
+    "books": ["Fiction", "Mystery", "Romance", "Fantasy", "Science Fiction", "Biography", "History",
+              "Thriller", "Self-Help", "Poetry", "Horror", "Young Adult", "Travel", "Cooking"],
+}
+
+# Rating weights for 1..5 stars; the mix of profiles gives the usual J-shaped total
+RATING_PROFILES = [
+    (0.30, (0.04, 0.03, 0.08, 0.30, 0.55)),  # acclaimed
+    (0.50, (0.12, 0.08, 0.17, 0.28, 0.35)),  # mixed
+    (0.20, (0.35, 0.20, 0.20, 0.13, 0.12)),  # panned
+]
+
+WORDS = ("great", "boring", "loved", "it", "the", "ending", "acting", "plot", "slow", "brilliant",
+         "weak", "characters", "would", "watch", "again", "not", "for", "me", "classic", "overrated")
+
+# Average reviews per title when --titles is not given
+REVIEWS_PER_TITLE = 20
+
+# Rows per add_titles / add_reviews call
+BATCH_SIZE = 50000
+
+# Per-row triggers replaced by one rebuild after the reviews are loaded
+BULK_LOAD_TRIGGERS = ("rating_stats_review_insert", "review_fts_insert")
+
+
+def zipf_weights(count, exponent=1.0):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def default_titles(reviews):
+    return max(50, reviews // REVIEWS_PER_TITLE)
+
+
+def title_rows(media, titles, rng):
+    """(title, genre) rows with Zipf-distributed genres."""
+    genres = GENRES[media]
+    picks = rng.choices(genres, cum_weights=cumulative(zipf_weights(len(genres))), k=titles)
+    for i, genre in enumerate(picks, 1):
+        yield f"{media.title().replace('_', ' ')} {i}", genre
+
+
+def review_rows(titles, reviews, rng):
+    """(title_id, rating, note) rows: log-normal popularity, per-title rating profiles."""
+    popularity = cumulative(rng.lognormvariate(0, 1.2) for _ in range(titles))
+    profile_of = rng.choices([cumulative(weights) for _, weights in RATING_PROFILES],
+                             weights=[share for share, _ in RATING_PROFILES], k=titles)
+    total = popularity[-1]
+    stars = (1, 2, 3, 4, 5)
+    for _ in range(reviews):
+        title_index = min(bisect.bisect(popularity, rng.random() * total), titles - 1)
+        rating = rng.choices(stars, cum_weights=profile_of[title_index])[0]
+        note = " ".join(rng.choices(WORDS, k=rng.randint(0, 8)))
+        yield title_index + 1, rating, note
+
+
+def batches(rows, size=BATCH_SIZE):
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def generate(media, path, reviews, titles=None, seed=0):
+    """Write one media type's catalog to `path` (replacing it) and return its title count."""
+    module, initialize = MEDIA[media]
+    titles = titles or default_titles(reviews)
+    rng = random.Random(f"{media}-{seed}")
+    partial = path + ".partial"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(partial + suffix):
+            os.remove(partial + suffix)
+    initialize(partial)
+    original, module.DATABASE = module.DATABASE, partial
+    try:
+        for batch in batches(title_rows(media, titles, rng)):
+            module.repository.add_titles(batch)
+        with db_pool.connection(partial) as conn:
+            triggers = conn.execute(
+                f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN "
+                f"({', '.join('?' * len(BULK_LOAD_TRIGGERS))})", BULK_LOAD_TRIGGERS).fetchall()
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+            conn.commit()
+        for batch in batches(review_rows(titles, reviews, rng)):
+            module.repository.add_reviews(batch)
+        with db_pool.connection(partial) as conn:
+            for _, sql in triggers:
+                conn.execute(sql)
+            for statement in database_setup.rebuild_rating_stats_sql(module.repository.table,
+                                                                     module.repository.title_fk):
+                conn.execute(statement)
+            conn.execute("INSERT INTO review_fts(review_fts) VALUES ('rebuild')")
+            conn.commit()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("ANALYZE")
+            conn.commit()
+    finally:
+        module.DATABASE = original
+        db_pool.close_all()
+    os.replace(partial, path)
+    return titles
+
+
+def dataset(reviews, titles=None, seed=0, directory="bench_data", media=tuple(MEDIA)):
+    """Paths of the generated databases ({media: path}), generating the missing ones."""
+    os.makedirs(directory, exist_ok=True)
+    titles = titles or default_titles(reviews)
+    paths = {}
+    for name in media:
+        path = paths[name] = os.path.join(directory, f"{name}-{reviews}-{titles}-{seed}.db")
+        if not os.path.exists(path):
+            generate(name, path, reviews, titles, seed)
+    return paths
+
+
+def describe(path, media):
+    """Row counts and the rating histogram of a generated database."""
+    module, _ = MEDIA[media]
+    with db_pool.connection(path) as conn:
+        titles = conn.execute(f"SELECT COUNT(*) FROM {module.repository.table}").fetchone()[0]
+        ratings = dict(conn.execute("SELECT rating, COUNT(*) FROM reviews GROUP BY rating").fetchall())
+        busiest = conn.execute(f"SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM reviews "
+                               f"GROUP BY {module.repository.title_fk})").fetchone()[0]
+    return {"titles": titles, "reviews": sum(ratings.values()), "ratings": ratings, "max_reviews_per_title": busiest}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic movies / TV shows / books catalogs")
+    parser.add_argument("--reviews", type=int, nargs="+", default=[1000], help="reviews per media type")
+    parser.add_argument("--titles", type=int, help=f"titles per media type (default reviews / {REVIEWS_PER_TITLE})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--media", nargs="+", choices=sorted(MEDIA), default=sorted(MEDIA))
+    parser.add_argument("--output", default="bench_data")
+    args = parser.parse_args()
+
+    for reviews in args.reviews:
+        start = time.perf_counter()
+        paths = dataset(reviews, args.titles, args.seed, args.output, args.media)
+        print(f"{reviews} reviews per media type in {time.perf_counter() - start:.1f}s")
+        for name, path in paths.items():
+            stats = describe(path, name)
+            total = stats["reviews"] or 1
+            shares = " ".join(f"{star}*:{stats['ratings'].get(star, 0) / total:.0%}" for star in range(1, 6))
+            print(f"  {path:<44} {stats['titles']:>9} titles {stats['reviews']:>10} reviews  {shares}"
+                  f"  max/title {stats['max_reviews_per_title']}")
+        db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
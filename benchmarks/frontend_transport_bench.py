@@ -0,0 +1,99 @@
+# Benchmark: click-to-render latency of the Gradio handlers' API calls over HTTP (Flask
+# server in a subprocess, pooled keep-alive client) against FRONTEND_TRANSPORT=inprocess.
+# Each "click" is one API call plus building the text the tab shows, as app.py does;
+# gradio itself is not needed.
+#
+#   python -m benchmarks.frontend_transport_bench [--clicks 500] [--servers flask asgi]
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+import api_client
+import db_pool
+import movies
+from benchmarks.http_load_bench import ROOT, SERVERS, wait_for_port
+from benchmarks.mixed_load_bench import percentile, seed
+
+
+def render_movies(movies_page):
+    """The text view_movies_frontend builds for a page of movies."""
+    output = ["🎥 Movie List:"]
+    for movie in movies_page:
+        output.append(f"Movie #{movie['id']}: {movie['name']} (Genre: {movie['genre']})")
+        for review in movie["reviews"]:
+            output.append(f"   Review #{review['review_id']} | Rating: {review['rating']}/5 | {review['note']}")
+    return "\n".join(output)
+
+
+def render_reviews(result):
+    """The text search_reviews_frontend builds for one movie's reviews."""
+    return "\n".join(f"Review #{r['review_id']}: {r['rating']}/5 - {r['note']}" for r in result["reviews"])
+
+
+async def click(api, kind, rng, titles):
+    if kind == "view":
+        response = await api.get("/movies", params={"limit": 20, "after_id": rng.randint(0, titles - 20)})
+        return render_movies(response.json())
+    if kind == "reviews":
+        return render_reviews((await api.get(f"/movies/{rng.randint(1, titles)}/reviews")).json())
+    response = await api.post(f"/movies/{rng.randint(1, titles)}/reviews", json={"rating": 4.0, "note": "bench"})
+    return response.json().get("message", "")
+
+
+async def clicks(api, args):
+    rng = random.Random(0)
+    timings = {"view": [], "reviews": [], "add_review": []}
+    for i in range(args.clicks):
+        kind = ("view", "reviews", "add_review")[i % 3]
+        start = time.perf_counter()
+        await click(api, kind, rng, args.titles)
+        timings[kind].append(time.perf_counter() - start)
+    await api.close()
+    return timings
+
+
+def report(label, timings):
+    for kind, samples in timings.items():
+        print(f"{label:>16} {kind:>11} {percentile(samples, 50) * 1000:>9.3f} {percentile(samples, 99) * 1000:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frontend transport benchmark: HTTP vs in-process")
+    parser.add_argument("--clicks", type=int, default=600)
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=5, help="average reviews per title")
+    parser.add_argument("--servers", nargs="+", default=["flask"], choices=sorted(SERVERS))
+    parser.add_argument("--port", type=int, default=5177)
+    args = parser.parse_args()
+
+    print(f"{'transport':>16} {'click':>11} {'p50 ms':>9} {'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "movie_reviews.db")
+        seed(database, args.titles, args.reviews)
+        db_pool.close_all()
+
+        for offset, server in enumerate(args.servers):
+            port = args.port + offset
+            env = dict(os.environ, PYTHONPATH=ROOT)
+            process = subprocess.Popen(SERVERS[server](port), cwd=tmp, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                asyncio.run(wait_for_port(port))
+                api = api_client.AsyncApiClient(f"http://127.0.0.1:{port}")
+                report(f"http ({server})", asyncio.run(clicks(api, args)))
+            finally:
+                process.terminate()
+                process.wait()
+
+        movies.DATABASE = database
+        report("inprocess", asyncio.run(clicks(api_client.async_client("inprocess"), args)))
+        db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
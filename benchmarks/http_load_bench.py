@@ -0,0 +1,131 @@
+# Benchmark: requests per second and tail latency of the Flask dev server (the current
+# app.run path) against the ASGI mode in asgi.py, over real keep-alive HTTP connections.
+# Each server runs in a subprocess against a freshly seeded movies database; the client
+# is a small asyncio HTTP/1.1 loop so thousands of connections cost no threads here.
+#
+#   python -m benchmarks.http_load_bench [--servers flask asgi] [--connections 256] [--seconds 10]
+#
+# The asgi server needs uvicorn installed.
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import db_pool
+from benchmarks.mixed_load_bench import percentile, seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "flask": lambda port: [sys.executable, "-c", f"from api import app; app.run(port={port}, threaded=True)"],
+    "asgi": lambda port: [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port),
+                          "--log-level", "warning", "--no-access-log"],
+}
+
+
+async def wait_for_port(port, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def request(reader, writer, path):
+    """Send one GET over a keep-alive connection; returns (status, keep_alive)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    version, status = status_line.split()[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    keep_alive = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    return int(status), keep_alive
+
+
+async def client(port, titles, deadline, results, rng):
+    connection = None
+    while time.perf_counter() < deadline:
+        if rng.random() < 0.5:
+            path = f"/movies?after_id={rng.randint(0, titles)}&limit=50"
+        else:
+            path = f"/movies/{rng.randint(1, titles)}/reviews"
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection("127.0.0.1", port)
+            status, keep_alive = await request(*connection, path)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            status, keep_alive = 0, False
+        results.append((time.perf_counter() - start, 200 <= status < 400))
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, args):
+    await wait_for_port(port)
+    results = []
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(
+        client(port, args.titles, deadline, results, random.Random(i)) for i in range(args.connections)
+    ))
+    return results
+
+
+def run(server, args, port):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "movie_reviews.db")
+        seed(database, args.titles, args.reviews)
+        db_pool.close_all()
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        process = subprocess.Popen(SERVERS[server](port), cwd=tmp, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            results = asyncio.run(load(port, args))
+        finally:
+            process.terminate()
+            process.wait()
+
+    ok = [elapsed for elapsed, good in results if good]
+    failed = len(results) - len(ok)
+    print(f"{server:>6} {len(ok) / args.seconds:>9.0f} {percentile(ok, 50) * 1000:>9.2f} "
+          f"{percentile(ok, 99) * 1000:>9.2f} {percentile(ok, 99.9) * 1000:>10.2f} {failed:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test: Flask dev server vs ASGI mode")
+    parser.add_argument("--servers", nargs="+", default=["flask", "asgi"], choices=sorted(SERVERS))
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=5, help="average reviews per title")
+    parser.add_argument("--port", type=int, default=5077)
+    args = parser.parse_args()
+
+    print(f"{'server':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'p99.9 ms':>10} {'failed':>7}")
+    for offset, server in enumerate(args.servers):
+        run(server, args, args.port + offset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Benchmark: JSON encode throughput per endpoint shape and serializer backend, and the
+# list endpoints' rows -> dicts -> JSON path against titles encoded in SQL.
+#
+# "encode" times only the serializer on objects already built; "rows->json" times the
+# whole listing from the database (what GET /movies?limit=500 pays per response).
+#
+#   python -m benchmarks.json_encode_bench [--titles 5000] [--reviews 5] [--page 500]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database_setup
+import db_pool
+import json_codec
+import movies
+import pagination
+
+
+def seed(database, titles, reviews_per_title):
+    database_setup.initialize_db(database)
+    movies.DATABASE = database
+    rng = random.Random(titles)
+    movies.repository.add_titles((f"Title {i}", rng.choice(["Drama", "Comedy", "Horror"])) for i in range(titles))
+    movies.repository.add_reviews(
+        (rng.randint(1, titles), rng.choice([1, 2, 3, 3.5, 4, 4.5, 5]), f"Review note number {i}, \"quoted\"")
+        for i in range(titles * reviews_per_title))
+
+
+def best_of(fn, repeat):
+    """Return (best seconds per call, size of the result)."""
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        size = len(result)
+    return best, size
+
+
+def shapes(args):
+    """Endpoint name -> the object that endpoint hands to jsonify."""
+    repository = movies.repository
+    busiest = max(repository.list_titles(reviews="count"), key=lambda title: title["review_count"])
+    return {
+        f"GET /movies?limit={args.page}": repository.list_titles(None, args.page, "full"),
+        f"GET /movies?limit={args.page}&reviews=count": repository.list_titles(None, args.page, "count"),
+        f"GET /movies?limit={args.page}&reviews=none": repository.list_titles(None, args.page, "none"),
+        "GET /movies (whole catalog)": repository.list_titles(),
+        "GET /movies/<id>/reviews": repository.get_title(busiest["id"]),
+        "GET /movies/top?limit=10": repository.top_rated(10),
+        "POST /reviews/batch (1000)": {
+            "created": 1000, "errors": 0, "committed": True,
+            "results": [{"index": i, "status": "created", "type": "movies", "title_id": i + 1, "review_id": i + 1}
+                        for i in range(1000)],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON encode throughput per endpoint shape")
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--reviews", type=int, default=5, help="reviews per title")
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = {name: json_codec.make_backend(name) for name in json_codec.BACKENDS
+                if name != "orjson" or json_codec.orjson is not None}
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "movies.db"), args.titles, args.reviews)
+
+        print(f"{'encode':<44} {'backend':>8} {'KB':>8} {'us/op':>10} {'MB/s':>8}")
+        for shape, obj in shapes(args).items():
+            for name, backend in backends.items():
+                seconds, size = best_of(lambda: backend.encode(obj), args.repeat)
+                print(f"{shape:<44} {name:>8} {size / 1024:>8.1f} {seconds * 1e6:>10.1f} {size / seconds / 1e6:>8.1f}")
+
+        print()
+        print(f"{'rows->json':<44} {'path':>8} {'KB':>8} {'us/op':>10} {'MB/s':>8}")
+        repository = movies.repository
+        for reviews in pagination.REVIEW_MODES:
+            for limit in (args.page, None):
+                label = f"?reviews={reviews}" + (f"&limit={limit}" if limit else " (whole catalog)")
+                paths = {name: (lambda backend=backend: pagination.json_array(
+                    [backend.encode(title) for title in repository.list_titles(None, limit, reviews)]))
+                    for name, backend in backends.items()}
+                if json_codec.SQLITE_JSON:
+                    paths["sql"] = lambda: pagination.json_array(
+                        [text.encode("utf-8") for _, text in repository.iter_titles_json(None, limit, reviews)])
+                for name, fn in paths.items():
+                    seconds, size = best_of(fn, args.repeat)
+                    print(f"{label:<44} {name:>8} {size / 1024:>8.1f} {seconds * 1e6:>10.1f} {size / seconds / 1e6:>8.1f}")
+        db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Benchmark: cost of the request and SQL metrics (metrics.py). First the pieces in
+# isolation (a repository read on an instrumented connection, one request's
+# bookkeeping), then whole requests
+# through the test client on uncached read endpoints with METRICS=1 and METRICS=0. Each
+# setting runs in its own subprocess because METRICS is read at import time; the two
+# alternate --rounds times and the best run of each is kept.
+#
+#   python -m benchmarks.metrics_overhead_bench [--requests 3000] [--rounds 3]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import db_pool
+from benchmarks.http_load_bench import ROOT
+from benchmarks.mixed_load_bench import seed
+
+PATHS = ("/movies/1/reviews", "/movies?limit=20&reviews=count", "/movies/top?limit=5")
+
+
+def measure(database, requests):
+    """Run in the child: best-of-three microseconds per request for each path."""
+    import movies
+    from api import app
+
+    movies.DATABASE = database
+    client = app.test_client()
+    results = []
+    for path in PATHS:
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(requests):
+                client.get(path)
+            best = min(best, (time.perf_counter() - start) / requests * 1e6)
+        results.append(f"{best:.1f}")
+    print(" ".join(results))
+
+
+def per_call(fn, repeat=100000):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat * 1e6)
+    return best
+
+
+def components(database):
+    """Time MediaRepository.get_title (two statements with the pool's health check) on
+    plain and instrumented connections, and one request's bookkeeping on its own."""
+    import metrics
+    import movies
+
+    movies.DATABASE = database
+    lookup = lambda: movies.repository.get_title(1, with_reviews=False)
+    for enabled in (False, True):
+        metrics.ENABLED = enabled  # read by db_pool when it opens a connection
+        db_pool.close_all()
+        metrics.start_request()
+        label = "get_title, " + ("instrumented" if enabled else "plain connection")
+        print(f"{label:<34} {per_call(lookup, 20000):>8.2f}us")
+        metrics.finish_request("GET", "/bench", 200)
+    db_pool.close_all()
+
+    def request():
+        metrics.start_request()
+        metrics.finish_request("GET", "/bench", 200)
+
+    print(f"{'request bookkeeping':<34} {per_call(request):>8.2f}us")
+    print()
+
+
+def run_child(database, requests, enabled):
+    env = dict(os.environ, PYTHONPATH=ROOT, RESPONSE_CACHE="none", METRICS="1" if enabled else "0")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.metrics_overhead_bench", "--measure", database, str(requests)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return [float(value) for value in output]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request overhead of the metrics subsystem")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--measure", nargs=2, metavar=("DATABASE", "REQUESTS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure[0], int(args.measure[1]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "movies.db")
+        seed(database, 1000, 5)
+        db_pool.close_all()
+        components(database)
+        off = on = [float("inf")] * len(PATHS)
+        for _ in range(args.rounds):
+            off = list(map(min, off, run_child(database, args.requests, enabled=False)))
+            on = list(map(min, on, run_child(database, args.requests, enabled=True)))
+    print(f"{'path':<34} {'off us':>8} {'on us':>8} {'overhead':>9}")
+    for path, before, after in zip(PATHS, off, on):
+        print(f"{path:<34} {before:>8.1f} {after:>8.1f} {after - before:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
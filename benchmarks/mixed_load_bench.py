@@ -0,0 +1,102 @@
+# Benchmark: mixed read/write load against api.app under each storage profile.
+# Reader threads page through GET /movies and GET /movies/<id>/reviews while writer
+# threads POST reviews; reports throughput, p50/p99 latency and failed requests.
+#
+#   python -m benchmarks.mixed_load_bench [--profiles legacy wal] [--threads 8] [--seconds 5]
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import database_setup
+import db_pool
+import movies
+from api import app
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def seed(database, titles, reviews_per_title):
+    database_setup.initialize_db(database)
+    rng = random.Random(0)
+    with db_pool.connection(database) as conn:
+        conn.executemany(
+            'INSERT INTO movies (name, genre) VALUES (?, ?)',
+            ((f"Movie {i}", rng.choice(["Drama", "Comedy", "Horror"])) for i in range(titles)),
+        )
+        conn.executemany(
+            'INSERT INTO reviews (movie_id, rating, note) VALUES (?, ?, ?)',
+            ((rng.randint(1, titles), rng.randint(1, 5), "seed") for _ in range(titles * reviews_per_title)),
+        )
+        conn.commit()
+
+
+def worker(titles, write_ratio, deadline, results, seed_value):
+    client = app.test_client()
+    rng = random.Random(seed_value)
+    while time.perf_counter() < deadline:
+        movie_id = rng.randint(1, titles)
+        is_write = rng.random() < write_ratio
+        start = time.perf_counter()
+        if is_write:
+            response = client.post(f'/movies/{movie_id}/reviews', json={"rating": rng.randint(1, 5), "note": "bench"})
+        elif rng.random() < 0.5:
+            response = client.get('/movies', query_string={"after_id": rng.randint(0, titles), "limit": 50})
+        else:
+            response = client.get(f'/movies/{movie_id}/reviews')
+        elapsed = time.perf_counter() - start
+        results.append((is_write, elapsed, response.status_code < 400))
+
+
+def run(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_pool.configure(profile=profile, size=args.threads)
+        movies.DATABASE = os.path.join(tmp, "movies.db")
+        seed(movies.DATABASE, args.titles, args.reviews)
+        results = []
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=worker, args=(args.titles, args.write_ratio, deadline, results, i))
+            for i in range(args.threads)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        db_pool.close_all()
+
+    reads = [elapsed for is_write, elapsed, ok in results if not is_write and ok]
+    writes = [elapsed for is_write, elapsed, ok in results if is_write and ok]
+    failed = sum(1 for _, _, ok in results if not ok)
+    print(
+        f"{profile:>8} {len(results) / args.seconds:>9.0f} "
+        f"{percentile(reads, 50) * 1000:>9.2f} {percentile(reads, 99) * 1000:>9.2f} "
+        f"{percentile(writes, 50) * 1000:>9.2f} {percentile(writes, 99) * 1000:>9.2f} {failed:>7}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write load benchmark for api.app")
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "wal"], choices=sorted(db_pool.STORAGE_PROFILES))
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=5, help="average reviews per title")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{'profile':>8} {'req/s':>9} {'read p50':>9} {'read p99':>9} {'write p50':>9} {'write p99':>9} {'failed':>7}")
+    for profile in args.profiles:
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
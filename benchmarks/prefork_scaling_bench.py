@@ -0,0 +1,132 @@
+# Benchmark: read throughput of prefork.py as the number of reader processes grows.
+# Each run serves a generated catalog (benchmarks.datagen) for all three media types
+# and drives GET traffic, list pages and per-title reviews, from several client
+# processes over keep-alive connections. The response cache is off so every request
+# does its queries and JSON encoding. Reported per worker count: req/s, speedup and
+# parallel efficiency against one worker, and p50 / p99 latency.
+#
+#   python -m benchmarks.prefork_scaling_bench [--workers 1 2 4 8] [--reviews 100000] [--seconds 10]
+#
+# Scaling stops at the machine's core count, and the client processes need cores too:
+# run it where cores >= workers + clients, or expect efficiency to fall as they compete.
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import db_pool
+from benchmarks import datagen
+from benchmarks.http_load_bench import ROOT, request, wait_for_port
+from benchmarks.mixed_load_bench import percentile
+
+# Database file each media type's module uses by default
+FILES = {"movies": "movie_reviews.db", "tv_shows": "tv_shows_reviews.db", "books": "books.db"}
+
+
+def default_workers():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def pick_path(rng, titles):
+    media = rng.choice(sorted(FILES))
+    if rng.random() < 0.5:
+        return f"/{media}?after_id={rng.randint(0, titles)}&limit=50"
+    if media == "books":
+        return f"/books/{rng.randint(1, titles)}"
+    return f"/{media}/{rng.randint(1, titles)}/reviews"
+
+
+async def connection_loop(port, titles, deadline, results, rng):
+    connection = None
+    while time.perf_counter() < deadline:
+        path = pick_path(rng, titles)
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection("127.0.0.1", port)
+            status, keep_alive = await request(*connection, path)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            status, keep_alive = 0, False
+        results.append((time.perf_counter() - start, 200 <= status < 400))
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+def client_process(port, titles, seconds, connections, seed):
+    """One load-generating process; returns [(latency, ok)]."""
+    async def load():
+        results = []
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(connection_loop(port, titles, deadline, results, random.Random(seed * 1000 + i))
+                               for i in range(connections)))
+        return results
+    return asyncio.run(load())
+
+
+def run(workers, directory, titles, args, port):
+    env = dict(os.environ, PYTHONPATH=ROOT, RESPONSE_CACHE="none")
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "prefork.py"), "--workers", str(workers),
+                                "--port", str(port), "--server", args.server],
+                               cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_for_port(port))
+        time.sleep(args.settle)  # readers warm up before accepting
+        with multiprocessing.Pool(args.clients) as pool:
+            batches = pool.starmap(client_process, [(port, titles, args.seconds, args.connections, seed)
+                                                    for seed in range(args.clients)])
+    finally:
+        process.terminate()
+        process.wait()
+    results = [result for batch in batches for result in batch]
+    ok = [elapsed for elapsed, good in results if good]
+    return len(ok) / args.seconds, percentile(ok, 50), percentile(ok, 99), len(results) - len(ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read scaling of prefork.py with the number of workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--reviews", type=int, default=100000, help="reviews per media type")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=2, help="load-generating processes")
+    parser.add_argument("--connections", type=int, default=32, help="connections per client process")
+    parser.add_argument("--server", choices=("asgi", "wsgi"), default="asgi")
+    parser.add_argument("--settle", type=float, default=2, help="seconds allowed for warm-up")
+    parser.add_argument("--port", type=int, default=5177)
+    parser.add_argument("--data", default="bench_data")
+    args = parser.parse_args()
+
+    paths = datagen.dataset(args.reviews, directory=args.data)
+    titles = datagen.default_titles(args.reviews)
+    db_pool.close_all()
+    print(f"{os.cpu_count()} CPUs, {args.clients} client processes x {args.connections} connections, "
+          f"{args.reviews} reviews and {titles} titles per media type")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'efficiency':>11} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for media, path in paths.items():
+            shutil.copyfile(path, os.path.join(tmp, FILES[media]))
+        baseline = None
+        for offset, workers in enumerate(args.workers):
+            rate, p50, p99, failed = run(workers, tmp, titles, args, args.port + offset)
+            if baseline is None:
+                baseline = rate / workers
+            speedup = rate / baseline
+            print(f"{workers:>7} {rate:>9.0f} {speedup:>7.2f}x {speedup / workers:>10.0%} "
+                  f"{p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
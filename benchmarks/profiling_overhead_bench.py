@@ -0,0 +1,61 @@
+# Benchmark: cost of the request profiling hook (profiling.py). This covers what every
+# request pays while profiling is off (the trigger check and an empty stop), and how
+# much slower a profiled request is than the same request unprofiled, with the size of
+# the dump it writes.
+#
+#   python -m benchmarks.profiling_overhead_bench [--requests 2000]
+
+import argparse
+import os
+import tempfile
+import time
+
+import db_pool
+import movies
+import profiling
+import response_cache
+from api import app
+from benchmarks.mixed_load_bench import seed
+
+PATHS = ("/movies/1/reviews", "/movies?limit=20&reviews=count", "/movies/top?limit=5")
+
+
+def per_call(fn, repeat):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat * 1e6)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the request profiling hook")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    headers = {"Accept": "application/json", "User-Agent": "bench"}
+    off = lambda: (profiling.requested(headers), profiling.stop())
+    print(f"{'hook with profiling off':<34} {per_call(off, 200000):>9.2f}us per request\n")
+
+    response_cache.configure("none")
+    with tempfile.TemporaryDirectory() as tmp:
+        movies.DATABASE = os.path.join(tmp, "movies.db")
+        seed(movies.DATABASE, 1000, 5)
+        profiling.DIRECTORY = os.path.join(tmp, "profiles")
+        profiling.HEADER_ENABLED = True
+        client = app.test_client()
+        print(f"{'path':<34} {'plain us':>9} {'profiled us':>12} {'slowdown':>9} {'stacks':>7}")
+        for path in PATHS:
+            plain = per_call(lambda: client.get(path), args.requests)
+            profiled = per_call(lambda: client.get(path, headers={"X-Profile": "1"}), max(1, args.requests // 20))
+            name = client.get(path, headers={"X-Profile": "1"}).headers["X-Profile-File"]
+            with open(os.path.join(profiling.DIRECTORY, name)) as f:
+                stacks = sum(1 for _ in f)
+            print(f"{path:<34} {plain:>9.1f} {profiled:>12.1f} {profiled / plain:>8.1f}x {stacks:>7}")
+        db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Benchmark: the same MediaRepository operations timed for each media type, plus
+# single-row vs batched review inserts (one commit per review vs one per batch).
+#
+#   python -m benchmarks.repository_bench [--titles 2000] [--reviews 10000]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import books
+import database_setup
+import db_pool
+import movies
+import tv_shows
+
+MEDIA = {
+    movies: database_setup.initialize_db,
+    tv_shows: database_setup.initialize_tvshow_db,
+    books: database_setup.initialize_database,
+}
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(module, initialize, args, tmp):
+    module.DATABASE = os.path.join(tmp, f"{module.__name__}.db")
+    initialize(module.DATABASE)
+    repository = module.repository
+    rng = random.Random(0)
+    genres = ["Drama", "Comedy", "Horror", "Science Fiction"]
+    repository.add_titles((f"Title {i}", rng.choice(genres)) for i in range(args.titles))
+
+    rows = [(rng.randint(1, args.titles), rng.randint(1, 5), "bench") for _ in range(args.reviews)]
+    start = time.perf_counter()
+    repository.add_reviews(rows)
+    batched = (time.perf_counter() - start) / len(rows) * 1e6
+
+    ops = {
+        "add_review": lambda i: repository.add_review(rows[i][0], 4, "single"),
+        "batched add_reviews": None,
+        "get_title": lambda i: repository.get_title(rows[i][0]),
+        "list_titles(50)": lambda i: repository.list_titles(rows[i][0], 50),
+        "titles_by_genre": lambda i: repository.titles_by_genre(genres[i % len(genres)]),
+        "top_rated(10)": lambda i: repository.top_rated(10),
+    }
+    for name, fn in ops.items():
+        per_op = batched if fn is None else timed(fn, args.repeat)
+        print(f"{module.__name__:>9} {name:>20} {per_op:>10.1f}")
+    db_pool.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per media type repository benchmark")
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'media':>9} {'operation':>20} {'us/op':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for module, initialize in MEDIA.items():
+            run(module, initialize, args, tmp)
+
+
+if __name__ == "__main__":
+    main()
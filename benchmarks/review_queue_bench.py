@@ -0,0 +1,74 @@
+# Benchmark: concurrent review submissions written directly (one INSERT + COMMIT per
+# review on the caller's thread) vs through review_queue's group-committing writer.
+#
+#   python -m benchmarks.review_queue_bench [--threads 1 8 32] [--reviews 200] [--profile wal]
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import database_setup
+import db_pool
+import movies
+import review_queue
+
+
+def run(submit, threads, reviews):
+    """Return (reviews per second, p50 ms, p99 ms, errors) for `threads` submitters."""
+    latencies, errors = [], []
+    barrier = threading.Barrier(threads)
+
+    def submitter(n):
+        barrier.wait()
+        for i in range(reviews):
+            start = time.perf_counter()
+            try:
+                submit(1 + (n * reviews + i) % 100, 4, "benchmark review")
+            except Exception as e:
+                errors.append(e)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=submitter, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3 if latencies else 0
+    return len(latencies) / elapsed, pick(0.5), pick(0.99), len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Direct vs group-committed review inserts")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--reviews", type=int, default=200, help="reviews per thread")
+    parser.add_argument("--profile", default="wal", choices=sorted(db_pool.STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    db_pool.configure(size=max(args.threads) + 1, profile=args.profile)
+    print(f"{'threads':>8} {'path':>7} {'reviews/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'batches':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in args.threads:
+            for path in ("direct", "queue"):
+                movies.DATABASE = os.path.join(tmp, f"{path}_{threads}.db")
+                database_setup.initialize_db(movies.DATABASE)
+                movies.repository.add_titles((f"Title {i}", "Drama") for i in range(100))
+                writer = review_queue.ReviewQueue()
+                if path == "direct":
+                    submit = movies.repository.add_review
+                else:
+                    submit = lambda title_id, rating, note: writer.submit(movies.repository, title_id, rating, note)
+                rate, p50, p99, errors = run(submit, threads, args.reviews)
+                writer.stop()
+                batches = writer.stats()["batches"] if path == "queue" else threads * args.reviews
+                print(f"{threads:>8} {path:>7} {rate:>10.0f} {p50:>8.2f} {p99:>8.2f} {errors:>7} {batches:>8}")
+                db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
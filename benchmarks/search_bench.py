@@ -0,0 +1,101 @@
+# Benchmark: GET /search latency (search.search) over a large synthetic review corpus.
+# Review notes are drawn from a Zipf-distributed vocabulary so queries cover rare,
+# mid-frequency and common words; target is p99 under 10 ms. --window sets the rank
+# window (search.RANK_WINDOW); the default 0 ranks every match.
+#
+#   python -m benchmarks.search_bench [--reviews 1000000] [--queries 500] [--window 1000]
+
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+
+import database_setup
+import db_pool
+import movies
+import search
+
+TARGET_MS = 10.0
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def seed(database, titles, reviews, vocabulary, rng):
+    database_setup.initialize_db(database)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    with db_pool.connection(database) as conn:
+        conn.executemany(
+            'INSERT INTO movies (name, genre) VALUES (?, ?)',
+            ((" ".join(rng.choices(vocabulary, k=2)).title(), rng.choice(["Drama", "Comedy", "Horror"]))
+             for _ in range(titles)),
+        )
+        batch = 50000
+        for start in range(0, reviews, batch):
+            conn.executemany(
+                'INSERT INTO reviews (movie_id, rating, note) VALUES (?, ?, ?)',
+                ((rng.randint(1, titles), rng.randint(1, 5), " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=12)))
+                 for _ in range(min(batch, reviews - start))),
+            )
+            conn.commit()
+        conn.execute("INSERT INTO review_fts(review_fts) VALUES ('optimize')")
+        conn.commit()
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search latency benchmark")
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--titles", type=int, default=50000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--window", type=int, default=search.RANK_WINDOW, help="newest matches ranked per index (0: all)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    bands = {
+        "rare word": vocabulary[len(vocabulary) // 2:],
+        "mid word": vocabulary[100:1000],
+        "common word": vocabulary[:100],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        movies.DATABASE = os.path.join(tmp, "movies.db")
+        start = time.perf_counter()
+        seed(movies.DATABASE, args.titles, args.reviews, vocabulary, rng)
+        print(f"Seeded {args.reviews} reviews in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'query':>18} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for band, words in bands.items():
+            for shape in ("word", "prefix", "two words"):
+                samples = []
+                for _ in range(args.queries):
+                    if shape == "word":
+                        q = rng.choice(words)
+                    elif shape == "prefix":
+                        q = rng.choice(words)[:3]
+                    else:
+                        q = f"{rng.choice(words)} {rng.choice(vocabulary)}"
+                    t = time.perf_counter()
+                    search.search(q, media=["movies"], limit=20, window=args.window)
+                    samples.append((time.perf_counter() - t) * 1000)
+                p99 = percentile(samples, 99)
+                flag = "" if p99 < TARGET_MS else "  (over target)"
+                print(f"{band + ' ' + shape if shape != 'word' else band:>18} "
+                      f"{percentile(samples, 50):>8.2f} {p99:>8.2f} {max(samples):>8.2f}{flag}")
+        db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Benchmark: peak RSS of a full GET /movies listing, buffered (jsonify) vs streamed
+# (?stream=ndjson / ?stream=array), as the catalog grows from 10k to 10M reviews.
+# Each measurement runs in a fresh subprocess so ru_maxrss is that request's peak. Peak
+# RSS includes database pages read through mmap (the wal profile maps up to 256 MB),
+# which the kernel can drop at any time, so the anonymous (heap) part is sampled from
+# /proc/self/status on every chunk and reported separately.
+#
+#   python -m benchmarks.streaming_memory_bench [--sizes 10000 100000 1000000 10000000]
+#
+# Seeding 10M reviews takes a minute or two and about 400 MB of disk.
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import db_pool
+from benchmarks.http_load_bench import ROOT
+from benchmarks.mixed_load_bench import seed
+
+MODES = {"buffered": "/movies", "ndjson": "/movies?stream=ndjson", "array": "/movies?stream=array"}
+
+
+def anon_rss_kb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def measure(database, mode):
+    """Run in the child: fetch the whole listing, discard the body, report peak RSS."""
+    import movies
+    from api import app
+
+    movies.DATABASE = database
+    start = time.perf_counter()
+    response = app.test_client().get(MODES[mode], buffered=False)
+    size, peak_anon_kb = 0, anon_rss_kb()
+    for chunk in response.iter_encoded():
+        size += len(chunk)
+        peak_anon_kb = max(peak_anon_kb, anon_rss_kb())
+    response.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{peak_kb} {peak_anon_kb} {size} {time.perf_counter() - start:.3f}")
+
+
+def run_child(database, mode):
+    env = dict(os.environ, PYTHONPATH=ROOT, RESPONSE_CACHE="none")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.streaming_memory_bench", "--measure", database, mode],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return int(output[0]), int(output[1]), int(output[2]), float(output[3])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of buffered vs streamed list responses")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000, 10000000],
+                        help="total reviews; titles are a fifth of that")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--buffered-max", type=int, default=1000000,
+                        help="skip the buffered mode above this many reviews")
+    parser.add_argument("--measure", nargs=2, metavar=("DATABASE", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    print(f"{'reviews':>10} {'mode':>9} {'peak RSS MB':>12} {'peak anon MB':>13} {'body MB':>9} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for reviews in args.sizes:
+            database = os.path.join(tmp, f"movies-{reviews}.db")
+            seed(database, max(1, reviews // 5), 5)
+            db_pool.close_all()
+            for mode in args.modes:
+                if mode == "buffered" and reviews > args.buffered_max:
+                    print(f"{reviews:>10} {mode:>9} {'skipped':>12}")
+                    continue
+                peak_kb, peak_anon_kb, size, seconds = run_child(database, mode)
+                print(f"{reviews:>10} {mode:>9} {peak_kb / 1024:>12.1f} {peak_anon_kb / 1024:>13.1f} "
+                      f"{size / 1e6:>9.1f} {seconds:>8.2f}")
+            os.remove(database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# Reproducible benchmark suite for the data layer and the REST API, with JSON output
+# for comparing commits.
+#
+# For each dataset size (reviews per media type, generated by benchmarks.datagen and
+# cached in --data-dir) it runs:
+#   micro  every public function of movies.py, tv_shows.py and books.py, called
+#          directly on a copy of the generated databases (reads first, then the
+#          writes, which each touch a different title or review per call)
+#   api    throughput and latency of read and write endpoints through api.app's test
+#          client, with the response cache off so every request reaches SQLite
+#
+# Each benchmark is calibrated to --min-time per round and run for --rounds rounds; the
+# JSON records every round's microseconds per call plus the best and median, together
+# with the git commit, Python, SQLite and platform.
+#
+#   python -m benchmarks.suite [--reviews 1000 100000] [--output results.json] [--only movies.]
+#   python -m benchmarks.suite --compare baseline.json results.json [--threshold 0.10]
+#
+# --compare matches results by (kind, dataset, name) and exits with status 1 when any
+# median is slower than the baseline by more than the threshold.
+
+import argparse
+import datetime
+import inspect
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import books
+import db_pool
+import movies
+import response_cache
+import tv_shows
+from api import app
+from benchmarks import datagen
+from benchmarks.mixed_load_bench import percentile
+
+MODULES = {"movies": movies, "tv_shows": tv_shows, "books": books}
+
+
+def micro_benchmarks(media, context):
+    """[(function name, args description, call(i), max calls or None)] for one data module.
+
+    Writes come last so the reads see the generated data unchanged; destructive calls
+    are capped so each one gets its own review or title.
+    """
+    titles, genres, pairs = context["titles"], datagen.GENRES[media], context["review_pairs"]
+    title = lambda i: 1 + (i * 7919) % titles
+    genre = lambda i: genres[i % len(genres)]
+    edited, deleted = pairs[:len(pairs) // 2], pairs[len(pairs) // 2:]
+    deleted_titles = titles // 2
+    name_of = {"movies": ("add_movie", "delete_movie", "view_reviews", "search_by_genre", "view_movie_genre",
+                          "view_top_movies"),
+               "tv_shows": ("add_show", "delete_show", "view_reviews", "search_by_genre", "view_show_genre",
+                            "view_top_shows"),
+               "books": ("add_book", "delete_book", "view_books", "search_books_by_genre", "view_book_genre",
+                         "view_top_books")}
+    add_title, delete_title, view, by_genre, view_genres, top = name_of[media]
+    module = MODULES[media]
+    specs = [
+        (view, "limit=50", lambda i: getattr(module, view)(title(i) - 1, 50), None),
+        (view, "limit=50, reviews=count", lambda i: getattr(module, view)(title(i) - 1, 50, "count"), None),
+        ("search_reviews", "one title", lambda i: module.search_reviews(title(i)), None),
+        (by_genre, "one genre", lambda i: getattr(module, by_genre)(genre(i)), None),
+        (view_genres, "", lambda i: getattr(module, view_genres)(), None),
+        (top, "limit=10", lambda i: getattr(module, top)(10), None),
+        (top, "limit=10, genre", lambda i: getattr(module, top)(10, genre(i)), None),
+    ]
+    if media == "books":
+        specs += [
+            ("get_book", "one title", lambda i: books.get_book(title(i)), None),
+            ("search_book_by_id", "one title", lambda i: books.search_book_by_id(title(i)), None),
+        ]
+    specs += [
+        (add_title, "", lambda i: getattr(module, add_title)(f"Benchmark {i}", genre(i)), None),
+        ("add_review", "through review_queue", lambda i: module.add_review(title(i), 4, "benchmark"), None),
+        ("edit_review", "rating and note", lambda i: module.edit_review(*edited[i], 3, "edited"), len(edited)),
+        ("delete_review", "", lambda i: module.delete_review(*deleted[i]), len(deleted)),
+        (delete_title, "with its reviews", lambda i: getattr(module, delete_title)(titles - i), deleted_titles),
+    ]
+    return specs
+
+
+API_BENCHMARKS = [
+    ("GET", "/{media}?limit=50", None),
+    ("GET", "/{media}?limit=50&reviews=count", None),
+    ("GET", "/{media}/top?limit=10", None),
+    ("GET", "/{media}/genres", None),
+    ("GET", "/movies/{title}/reviews", None),
+    ("GET", "/tv_shows/{title}/reviews", None),
+    ("GET", "/books/{title}", None),
+    ("GET", "/movies/genre?genre={genre}", None),
+    ("GET", "/search?q=brilliant&limit=20", None),
+    ("GET", "/top?limit=10", None),
+    ("POST", "/{media}/{title}/reviews", {"rating": 4, "note": "benchmark"}),
+]
+
+
+def uncovered_functions():
+    """Public functions of the data modules that have no microbenchmark."""
+    covered = {(media, spec[0]) for media in MODULES
+               for spec in micro_benchmarks(media, {"titles": 1, "review_pairs": []})}
+    return [f"{media}.{name}" for media, module in MODULES.items()
+            for name, fn in inspect.getmembers(module, inspect.isfunction)
+            if fn.__module__ == media and not name.startswith("_") and (media, name) not in covered]
+
+
+def measure(call, min_time, rounds, limit=None):
+    """Microseconds per call for each round; call(i) gets a fresh i every time."""
+    counter = iter(range(limit if limit is not None else sys.maxsize))
+    call(next(counter))  # warm up statement caches and pooled connections
+    start = time.perf_counter()
+    call(next(counter))
+    once = max(time.perf_counter() - start, 1e-7)
+    number = max(1, int(min_time / once))
+    if limit is not None:
+        number = max(1, min(number, (limit - 2) // rounds))
+    results = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            call(next(counter))
+        results.append((time.perf_counter() - start) / number * 1e6)
+    return results, number
+
+
+def result(kind, dataset, name, args, samples, number, **extra):
+    return {"kind": kind, "dataset": dataset, "name": name, "args": args, "calls_per_round": number,
+            "us_per_call": [round(sample, 3) for sample in samples], "best_us": round(min(samples), 3),
+            "median_us": round(statistics.median(samples), 3), **extra}
+
+
+def review_pairs(media, database, count):
+    """(title_id, review_id) of the first `count` reviews of a database."""
+    repository = MODULES[media].repository
+    with db_pool.connection(database) as conn:
+        return conn.execute(f"SELECT {repository.title_fk}, id FROM reviews ORDER BY id LIMIT ?", (count,)).fetchall()
+
+
+def run_micro(label, paths, args, titles):
+    results = []
+    for media, module in MODULES.items():
+        module.DATABASE = paths[media]
+        context = {"titles": titles, "review_pairs": review_pairs(media, paths[media], 2 * args.max_writes)}
+        for name, description, call, limit in micro_benchmarks(media, context):
+            full_name = f"{media}.{name}" + (f"({description})" if description else "")
+            if args.only and not any(pattern in full_name for pattern in args.only):
+                continue
+            samples, number = measure(call, args.min_time, args.rounds, limit)
+            results.append(result("micro", label, full_name, description, samples, number))
+            print(f"{label:>8} micro {full_name:<58} {min(samples):>10.1f} {statistics.median(samples):>10.1f}")
+    return results
+
+
+def run_api(label, args, titles):
+    client = app.test_client()
+    genres = datagen.GENRES["movies"]
+    results = []
+    for method, template, body in API_BENCHMARKS:
+        for media in (MODULES if "{media}" in template else [None]):
+            name = f"{method} {template.replace('{media}', media or '')}"
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            latencies, failures = [], 0
+
+            def call(i):
+                nonlocal failures
+                path = template.format(media=media, title=1 + (i * 7919) % titles, genre=genres[i % len(genres)])
+                start = time.perf_counter()
+                response = client.open(path, method=method, json=body)
+                latencies.append(time.perf_counter() - start)
+                failures += response.status_code >= 400
+
+            samples, number = measure(call, args.min_time, args.rounds)
+            latencies = latencies[2:]
+            results.append(result("api", label, name, "", samples, number,
+                                  requests_per_second=round(1e6 / statistics.median(samples), 1),
+                                  p50_ms=round(percentile(latencies, 50) * 1e3, 3),
+                                  p99_ms=round(percentile(latencies, 99) * 1e3, 3), failures=failures))
+            print(f"{label:>8} api   {name:<58} {min(samples):>10.1f} {statistics.median(samples):>10.1f}"
+                  + (f"  {failures} failed" if failures else ""))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit or None, "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")}
+
+
+def compare(baseline_path, current_path, threshold):
+    """Print median changes between two result files; returns the number of regressions."""
+    with open(baseline_path) as f:
+        baseline = {(r["kind"], r["dataset"], r["name"]): r for r in json.load(f)["results"]}
+    with open(current_path) as f:
+        current = json.load(f)["results"]
+    regressions = 0
+    print(f"{'dataset':>8} {'kind':<5} {'benchmark':<58} {'base us':>10} {'now us':>10} {'change':>8}")
+    for entry in current:
+        before = baseline.get((entry["kind"], entry["dataset"], entry["name"]))
+        if before is None:
+            continue
+        change = entry["median_us"] / before["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{entry['dataset']:>8} {entry['kind']:<5} {entry['name']:<58} {before['median_us']:>10.1f} "
+              f"{entry['median_us']:>10.1f} {change:>+8.1%}{flag}")
+    print(f"\n{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def size_label(reviews):
+    for unit, scale in (("m", 1000000), ("k", 1000)):
+        if reviews >= scale and reviews % scale == 0:
+            return f"{reviews // scale}{unit}"
+    return str(reviews)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Data layer and REST API benchmark suite")
+    parser.add_argument("--reviews", type=int, nargs="+", default=[1000, 100000],
+                        help="dataset sizes, in reviews per media type")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default="bench_data", help="where generated databases are cached")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-writes", type=int, default=2000, help="reviews edited and deleted per module")
+    parser.add_argument("--skip", choices=("micro", "api"), help="leave out one kind of benchmark")
+    parser.add_argument("--only", nargs="+", help="run benchmarks whose name contains one of these")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    args = parser.parse_args()
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+
+    for name in uncovered_functions():
+        print(f"warning: no microbenchmark for {name}", file=sys.stderr)
+    response_cache.configure("none")
+    report = {"environment": environment(), "settings": {key: value for key, value in vars(args).items()
+                                                         if key not in ("compare", "output")},
+              "results": []}
+    print(f"{'dataset':>8} {'kind':<5} {'benchmark':<58} {'best us':>10} {'median us':>10}")
+    for reviews in args.reviews:
+        label = size_label(reviews)
+        titles = datagen.default_titles(reviews)
+        paths = datagen.dataset(reviews, titles, args.seed, args.data_dir)
+        with tempfile.TemporaryDirectory() as tmp:
+            for kind, run in (("micro", lambda copies: run_micro(label, copies, args, titles)),
+                              ("api", lambda copies: run_api(label, args, titles))):
+                if kind == args.skip:
+                    continue
+                # Every kind starts from a fresh copy, so writes never leak between runs
+                copies = {media: shutil.copy(path, os.path.join(tmp, f"{kind}-{media}.db"))
+                          for media, path in paths.items()}
+                for media, module in MODULES.items():
+                    module.DATABASE = copies[media]
+                report["results"].extend(run(copies))
+                db_pool.close_all()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n{len(report['results'])} results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
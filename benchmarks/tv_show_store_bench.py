@@ -0,0 +1,106 @@
+# Benchmark: per-operation cost of the TV show tab's storage as the library grows,
+# append-only ShowStore vs the old load-everything / rewrite-everything JSON file.
+#
+#   python -m benchmarks.tv_show_store_bench [--sizes 1000 10000 100000] [--ops 200]
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import tv_show_store
+
+
+def legacy_load(path):
+    """The old tv_showsTab.load_data/save_data pair, kept here as the baseline."""
+    with open(path) as file:
+        return json.load(file)
+
+
+def legacy_save(path, data):
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=4)
+
+
+def legacy_ops(path, rng, size):
+    def add_review(i):
+        data = legacy_load(path)
+        show = data["shows"][rng.randrange(len(data["shows"]))]
+        show["reviews"].append({"review_id": len(show["reviews"]) + 1, "rating": 4, "note": "bench"})
+        legacy_save(path, data)
+
+    def add_show(i):
+        data = legacy_load(path)
+        data["shows"].append({"id": len(data["shows"]) + 1, "title": f"New {i}", "reviews": []})
+        legacy_save(path, data)
+
+    def delete_show(i):
+        data = legacy_load(path)
+        data["shows"] = [show for show in data["shows"] if show["id"] != i + 1]
+        legacy_save(path, data)
+
+    return {"add_show": add_show, "add_review": add_review, "delete_show": delete_show}
+
+
+def store_ops(store, rng, size):
+    return {
+        "add_show": lambda i: store.add_show(f"New {i}"),
+        "add_review": lambda i: store.add_review(rng.randint(1, size), 4, "bench"),
+        "delete_show": lambda i: store.delete_show(i + 1),
+    }
+
+
+def seed(path, size, reviews_per_show):
+    data = {"shows": [
+        {"id": i, "title": f"Show {i}",
+         "reviews": [{"review_id": r, "rating": 4, "note": "seed"} for r in range(1, reviews_per_show + 1)]}
+        for i in range(1, size + 1)
+    ]}
+    legacy_save(path, data)
+
+
+def timed(fn, ops):
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TV show tab storage benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--reviews", type=int, default=3, help="reviews per seeded show")
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--legacy-max", type=int, default=10000, help="skip the JSON baseline above this size")
+    args = parser.parse_args()
+
+    print(f"{'shows':>8} {'engine':>8} {'operation':>12} {'us/op':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            legacy_json = os.path.join(tmp, f"legacy-{size}.json")
+            seed(legacy_json, size, args.reviews)
+
+            log = os.path.join(tmp, f"store-{size}.log")
+            start = time.perf_counter()
+            store = tv_show_store.ShowStore(log, legacy_json)
+            store.shows()  # first use migrates the JSON file and builds the index
+            print(f"{size:>8} {'log':>8} {'migrate':>12} {(time.perf_counter() - start) * 1e6:>12.1f}")
+            store.close()
+            start = time.perf_counter()
+            store = tv_show_store.ShowStore(log, legacy_json)
+            store.get_show(1)
+            print(f"{size:>8} {'log':>8} {'replay':>12} {(time.perf_counter() - start) * 1e6:>12.1f}")
+
+            for name, fn in store_ops(store, random.Random(size), size).items():
+                print(f"{size:>8} {'log':>8} {name:>12} {timed(fn, args.ops):>12.1f}")
+            store.close()
+
+            if size <= args.legacy_max:
+                for name, fn in legacy_ops(legacy_json, random.Random(size), size).items():
+                    print(f"{size:>8} {'json':>8} {name:>12} {timed(fn, args.ops):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
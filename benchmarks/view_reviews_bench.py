@@ -0,0 +1,99 @@
+# Benchmark: query count and latency of movies.view_reviews() / tv_shows.view_reviews()
+# as the catalog grows, compared with the old one-query-per-title loop.
+#
+#   python -m benchmarks.view_reviews_bench [--sizes 100 1000 10000] [--reviews 5]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database_setup
+import db_pool
+import movies
+import tv_shows
+
+
+def n_plus_one_view_reviews(database):
+    """The pre-JOIN implementation, kept here as the baseline."""
+    with db_pool.connection(database) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM movies')
+        result = []
+        for movie in cursor.fetchall():
+            cursor.execute('SELECT * FROM reviews WHERE movie_id = ?', (movie[0],))
+            reviews = cursor.fetchall()
+            result.append({
+                "id": movie[0],
+                "name": movie[1],
+                "genre": movie[2],
+                "reviews": [{"review_id": r[0], "rating": r[2], "note": r[3]} for r in reviews]
+            })
+    return result
+
+
+def seed(movie_db, tv_db, titles, reviews_per_title):
+    database_setup.initialize_db(movie_db)
+    database_setup.initialize_tvshow_db(tv_db)
+    rng = random.Random(titles)
+    for database, table, column, fk in (
+        (movie_db, "movies", "name", "movie_id"),
+        (tv_db, "tv_shows", "title", "tv_show_id"),
+    ):
+        with db_pool.connection(database) as conn:
+            conn.executemany(
+                f'INSERT INTO {table} ({column}, genre) VALUES (?, ?)',
+                ((f"Title {i}", rng.choice(["Drama", "Comedy", "Horror"])) for i in range(titles)),
+            )
+            conn.executemany(
+                f'INSERT INTO reviews ({fk}, rating, note) VALUES (?, ?, ?)',
+                ((rng.randint(1, titles), rng.randint(1, 5), "note") for _ in range(titles * reviews_per_title)),
+            )
+            conn.commit()
+
+
+def measure(database, fn, repeat):
+    """Return (queries per call, best wall time in ms) for fn()."""
+    statements = []
+    # With a one-connection pool, fn() borrows the same connection we trace here
+    with db_pool.connection(database) as conn:
+        conn.set_trace_callback(statements.append)
+    fn()
+    with db_pool.connection(database) as conn:
+        conn.set_trace_callback(None)
+    # Ignore the pool's "SELECT 1" health checks
+    queries = sum(1 for s in statements if s.lstrip().upper().startswith("SELECT") and s.strip() != "SELECT 1")
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return queries, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="view_reviews() scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--reviews", type=int, default=5, help="average reviews per title")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # A single pooled connection so the trace callback sees every statement
+    db_pool.configure(size=1)
+    print(f"{'titles':>8} {'module':>9} {'old queries':>12} {'old ms':>9} {'new queries':>12} {'new ms':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            movies.DATABASE = os.path.join(tmp, "movies.db")
+            tv_shows.DATABASE = os.path.join(tmp, "tv.db")
+            seed(movies.DATABASE, tv_shows.DATABASE, size, args.reviews)
+            old_q, old_ms = measure(movies.DATABASE, lambda: n_plus_one_view_reviews(movies.DATABASE), args.repeat)
+            new_q, new_ms = measure(movies.DATABASE, movies.view_reviews, args.repeat)
+            print(f"{size:>8} {'movies':>9} {old_q:>12} {old_ms:>9.1f} {new_q:>12} {new_ms:>9.1f}")
+            new_q, new_ms = measure(tv_shows.DATABASE, tv_shows.view_reviews, args.repeat)
+            print(f"{size:>8} {'tv_shows':>9} {'':>12} {'':>9} {new_q:>12} {new_ms:>9.1f}")
+            db_pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
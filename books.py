@@ -2,129 +2,78 @@
 # Author: Kai Francis
 # Date: Updated December 2, 2024
 
-import sqlite3
+import media_repository
+import review_queue
 
-DATABASE = 'books.db'
+# Keys a GET /books client may pick with ?fields=
+LIST_FIELDS = ("id", "title", "genre", "reviews", "review_count")
+
+DATABASE = media_repository.database_file('books.db')
+
+repository = media_repository.MediaRepository("books", "books", "title", "book_id", lambda: DATABASE,
+                                              review_counter="reviews_count")
 
 # Adding a new book with genre
-def add_book(book_title, genre):
-    connection = get_connection()
-    cursor = connection.cursor()
-    query = "INSERT INTO books (title, genre) VALUES (%s, %s)"
-    cursor.execute(query, (book_title, genre))
-    connection.commit()
-    book_id = cursor.lastrowid
-    connection.close()
+def add_book(book_title, genre=None):
+    book_id = repository.add_title(book_title, genre)
     return {"message": f"Book '{book_title}' added successfully.", "book": {"id": book_id, "title": book_title, "genre": genre}}
 
-# Adding a review to a book
+# Adding a review to a book through the review write queue (books.reviews_count is bumped too)
 def add_review(book_id, rating, note):
-    connection = get_connection()
-    cursor = connection.cursor()
-    query = "INSERT INTO reviews (book_id, rating, note) VALUES (%s, %s, %s)"
-    cursor.execute(query, (book_id, rating, note))
-    # Optionally update the reviews_count in books
-    update_query = "UPDATE books SET reviews_count = reviews_count + 1 WHERE id = %s"
-    cursor.execute(update_query, (book_id,))
-    connection.commit()
-    review_id = cursor.lastrowid
-    connection.close()
+    review_id = review_queue.add_review(repository, book_id, rating, note)
+    if review_id is None:  # the consolidated layout rejected the id as not a book
+        return None
     return {"message": f"Review added to book ID {book_id}.", "review": {"review_id": review_id, "rating": rating, "note": note}}
 
 # Editing a review
 def edit_review(book_id, review_id, rating=None, note=None):
-    connection = get_connection()
-    cursor = connection.cursor()
-    updates = []
-    values = []
-
-    if rating is not None:
-        updates.append("rating = %s")
-        values.append(rating)
-    if note is not None:
-        updates.append("note = %s")
-        values.append(note)
-    values.extend([book_id, review_id])
-
-    query = f"UPDATE reviews SET {', '.join(updates)} WHERE book_id = %s AND id = %s"
-    cursor.execute(query, tuple(values))
-    connection.commit()
-    connection.close()
+    repository.edit_review(book_id, review_id, rating, note)
     return {"message": f"Review ID {review_id} for book ID {book_id} updated."}
 
 # Deleting a review
 def delete_review(book_id, review_id):
-    connection = get_connection()
-    cursor = connection.cursor()
-    query = "DELETE FROM reviews WHERE book_id = %s AND id = %s"
-    cursor.execute(query, (book_id, review_id))
-    connection.commit()
-    connection.close()
+    repository.delete_review(book_id, review_id)
     return {"message": f"Review ID {review_id} deleted from book ID {book_id}."}
 
 # Deleting a book
 def delete_book(book_id):
-    connection = get_connection()
-    cursor = connection.cursor()
-    query = "DELETE FROM reviews WHERE book_id = %s"
-    cursor.execute(query, (book_id,))
-    delete_book_query = "DELETE FROM books WHERE id = %s"
-    cursor.execute(delete_book_query, (book_id,))
-    connection.commit()
-    connection.close()
+    repository.delete_title(book_id)
     return {"message": f"Book ID {book_id} and its reviews have been deleted."}
 
-# Viewing all books
-def view_books():
-    connection = get_connection()
-    cursor = connection.cursor(dictionary=True)
-    query = "SELECT * FROM books"
-    cursor.execute(query)
-    books = cursor.fetchall()
-    connection.close()
-    return books
+# Viewing all books, one keyset page at a time (same options as movies.view_reviews)
+def view_books(after_id=None, limit=None, reviews="full"):
+    return repository.list_titles(after_id, limit, reviews)
+
+# Getting one book with its reviews, or None
+def get_book(book_id):
+    return repository.get_title(book_id)
 
 #search reviews
 def search_reviews(book_id):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM books WHERE id = ?', (book_id,))
-    book = cursor.fetchone()
-    if not book:
+    book = repository.get_title(book_id)
+    if book is None:
         return {"error": "Book not found."}
-    cursor.execute('SELECT * FROM reviews WHERE book_id = ?', (book_id,))
-    reviews = cursor.fetchall()
-    conn.close()
-    return {
-        "id": book[0],
-        "name": book[1],
-        "genre": book[2],
-        "reviews": [{"review_id": r[0], "rating": r[2], "note": r[3]} for r in reviews]
-    }
-
-# Searching books by genre
+    book["name"] = book.pop("title")
+    return book
+
+# Searching books by genre (case-insensitive substring match)
 def search_books_by_genre(genre):
-    connection = get_connection()
-    cursor = connection.cursor(dictionary=True)
-    query = "SELECT * FROM books WHERE LOWER(genre) LIKE %s"
-    cursor.execute(query, (f"%{genre.lower()}%",))
-    books = cursor.fetchall()
-    connection.close()
-    return books
+    return repository.titles_by_genre(genre, partial=True)
 
 # Searching a book by ID
 def search_book_by_id(book_id):
-    connection = get_connection()
-    cursor = connection.cursor(dictionary=True)
-    query = "SELECT * FROM books WHERE id = %s"
-    cursor.execute(query, (book_id,))
-    book = cursor.fetchone()
-    connection.close()
+    book = repository.get_title(book_id, with_reviews=False)
     if book:
         return {"message": "Book found.", "book": book}
     return {"error": f"Book with ID {book_id} not found."}
 
 
-# Run initialization when the script is executed
-if __name__ == "__main__":
-    initialize_database()
+def view_book_genre():
+    return repository.genres()
+
+
+# Top rated books
+def view_top_books(limit=3, genre=None):
+    # Best-rated books by Bayesian score (see MediaRepository.top_rated)
+    return repository.top_rated(limit, genre)
+
@@ -0,0 +1,212 @@
+# Bulk import of movies, TV shows, books and their reviews from NDJSON or CSV.
+# Rows are streamed, validated, and written with executemany in one transaction per
+# batch; bad rows are reported by line number without aborting the rest of the import.
+#
+# Used by POST /import/<kind> in api.py and from the command line:
+#   python bulk_import.py movies catalog.ndjson
+#   python bulk_import.py movie_reviews reviews.csv --format csv
+
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import Counter
+
+import books
+import db_pool
+import movies
+import response_cache
+import tv_shows
+
+# Rows written per transaction
+BATCH_SIZE = 10000
+
+# At most this many row errors are listed in a report; error_count has the total
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("ndjson", "csv")
+
+
+def _text(value, field):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{field} is required")
+    return value.strip()
+
+
+def _optional_text(value, field):
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be text")
+    return value
+
+
+def _id(value, field):
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError(f"{field} must be a positive integer")
+    return value
+
+
+def _rating(value, field):
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    if not 0 <= rating <= 5:
+        raise ValueError(f"{field} must be between 0 and 5")
+    return int(rating) if rating.is_integer() else rating
+
+
+# kind -> (module whose repository it writes through, repository statement, [(field, validator)],
+# parent id field). Review kinds name their title id field, so rows for missing titles are rejected.
+KINDS = {
+    "movies": (movies, "insert_title", [("name", _text), ("genre", _text)], None),
+    "tv_shows": (tv_shows, "insert_title", [("title", _text), ("genre", _text)], None),
+    "books": (books, "insert_title", [("title", _text), ("genre", _optional_text)], None),
+    "movie_reviews": (movies, "insert_review",
+                      [("movie_id", _id), ("rating", _rating), ("note", _text)], "movie_id"),
+    "tv_show_reviews": (tv_shows, "insert_review",
+                        [("tv_show_id", _id), ("rating", _rating), ("note", _optional_text)], "tv_show_id"),
+    "book_reviews": (books, "insert_review",
+                     [("book_id", _id), ("rating", _rating), ("note", _optional_text)], "book_id"),
+}
+
+
+def read_ndjson(lines):
+    """Yield (line number, record or error message) for each non-blank line."""
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "each line must be a JSON object"
+            continue
+        yield line_no, record
+
+
+def read_csv(lines):
+    """Yield (line number, record) for each CSV row; the first row holds the field names."""
+    lines = (line.decode("utf-8") if isinstance(line, bytes) else line for line in lines)
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_records(lines, fmt):
+    if fmt == "ndjson":
+        return read_ndjson(lines)
+    if fmt == "csv":
+        return read_csv(lines)
+    raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+
+def _write_batch(kind, batch):
+    """Insert a batch of (line number, values) rows; return (inserted, errors)."""
+    module, statement, fields, field = KINDS[kind]
+    repository = module.repository
+    errors = []
+    with db_pool.connection(repository.database()) as conn:
+        if field is not None:
+            existing = repository.existing_ids(conn, (values[0] for _, values in batch))
+            kept = []
+            for line_no, values in batch:
+                if values[0] in existing:
+                    kept.append((line_no, values))
+                else:
+                    errors.append({"line": line_no, "error": f"{field} {values[0]} does not exist"})
+            batch = kept
+        conn.executemany(repository.sql[statement], (values for _, values in batch))
+        if field is not None and repository.review_counter:
+            # add_review keeps books.reviews_count in step; do the same per batch
+            counts = Counter(values[0] for _, values in batch)
+            conn.executemany(repository.sql["count_review"],
+                             ((count, title_id) for title_id, count in counts.items()))
+        conn.commit()
+    return len(batch), errors
+
+
+def import_records(kind, records, batch_size=BATCH_SIZE):
+    """Validate and insert records of one kind. Returns a report dict."""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(KINDS)}")
+    fields = KINDS[kind][2]
+    report = {"kind": kind, "inserted": 0, "error_count": 0, "errors": []}
+
+    def add_error(error):
+        report["error_count"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append(error)
+
+    def flush(batch):
+        inserted, errors = _write_batch(kind, batch)
+        if inserted:
+            response_cache.media_changed(KINDS[kind][0].repository.media)
+        report["inserted"] += inserted
+        for error in errors:
+            add_error(error)
+
+    start = time.perf_counter()
+    batch = []
+    for line_no, record in records:
+        if isinstance(record, str):
+            add_error({"line": line_no, "error": record})
+            continue
+        try:
+            values = tuple(validate(record.get(field), field) for field, validate in fields)
+        except ValueError as e:
+            add_error({"line": line_no, "error": str(e)})
+            continue
+        batch.append((line_no, values))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    elapsed = time.perf_counter() - start
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["inserted"] / elapsed) if elapsed > 0 else 0
+    return report
+
+
+def import_lines(kind, lines, fmt="ndjson", batch_size=BATCH_SIZE):
+    """Parse and import a stream of NDJSON or CSV lines."""
+    return import_records(kind, read_records(lines, fmt), batch_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import titles or reviews from NDJSON or CSV.")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path", help="input file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension, else ndjson")
+    parser.add_argument("--database", help="database file to import into (defaults to the module's DATABASE)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    if args.database:
+        KINDS[args.kind][0].DATABASE = args.database
+    if args.path == "-":
+        report = import_lines(args.kind, sys.stdin, fmt, args.batch_size)
+    else:
+        with open(args.path, newline="", encoding="utf-8") as f:
+            report = import_lines(args.kind, f, fmt, args.batch_size)
+
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"Imported {report['inserted']} {args.kind} in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s), {report['error_count']} rejected")
+    return 1 if report["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# Unit tests for bulk imports
+
+import io
+import unittest
+import bulk_import
+import fixtures
+import movies
+from api import app
+
+class TestBulkImport(fixtures.FixtureTestCase):
+
+    fixtures = {movies: fixtures.MOVIES}
+
+    def count(self, table):
+        return self.connection(movies).execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def test_ndjson_import_reports_bad_rows(self):
+        """Testing that invalid rows are rejected without aborting the batch."""
+        lines = [
+            '{"name": "Inception", "genre": "Science Fiction"}',
+            '{"name": "", "genre": "Drama"}',
+            'not json',
+            '',
+            '{"name": "Memento", "genre": "Thriller"}',
+        ]
+        report = bulk_import.import_lines("movies", lines, "ndjson", batch_size=1)
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual(report["error_count"], 2)
+        self.assertEqual([e["line"] for e in report["errors"]], [2, 3])
+        self.assertEqual(self.count('movies'), 2)
+
+    def test_rate_of_a_short_import(self):
+        """Testing that a batch finishing in under a millisecond still reports a real rate."""
+        report = bulk_import.import_lines("movies", ['{"name": "Inception", "genre": "Science Fiction"}'], "ndjson")
+        self.assertEqual(report["inserted"], 1)
+        self.assertGreater(report["rows_per_second"], 1)
+
+    def test_csv_review_import_checks_movie_exists(self):
+        """Testing that reviews for missing movies are reported by line."""
+        movies.add_movie("Inception", "Science Fiction")
+        lines = io.StringIO("movie_id,rating,note\n1,5,Amazing movie!\n2,4,Wrong movie\n1,9,Too high\n1,4.5,\"Good, long\"\n")
+        report = bulk_import.import_lines("movie_reviews", lines, "csv")
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual(report["errors"], [
+            {"line": 4, "error": "rating must be between 0 and 5"},
+            {"line": 3, "error": "movie_id 2 does not exist"},
+        ])
+        self.assertEqual(self.count('reviews'), 2)
+
+    def test_import_endpoint(self):
+        """Testing POST /import/<kind> with an NDJSON body."""
+        client = app.test_client()
+        body = '{"name": "Inception", "genre": "Science Fiction"}\n{"name": "Interstellar", "genre": "Science Fiction"}\n'
+        response = client.post('/import/movies', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["inserted"], 2)
+        self.assertEqual(client.post('/import/actors', data=body).status_code, 404)
+        self.assertEqual(client.post('/import/movies?format=xml', data=body).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# Cross-media queries and the move to the consolidated layout.
+#
+# With DB_LAYOUT=consolidated every title lives in one catalog table and every review in
+# one reviews table (see database_setup.CATALOG_MIGRATIONS), so "top rated anything" is a
+# single indexed statement. Under the default separate layout the same functions merge
+# the per-media results in Python.
+#
+# Moving existing data over streams each old file into the catalog inside SQLite:
+#   python catalog.py migrate [--target media_reviews.db] [--movies movie_reviews.db]
+#                             [--tv-shows tv_shows_reviews.db] [--books books.db]
+# then start the app with DB_LAYOUT=consolidated.
+
+import argparse
+import os
+import sqlite3
+
+import books
+import database_setup
+import db_pool
+import media_repository
+import movies
+import tv_shows
+
+# media type -> (initializer for its old file, title table, title column, reviews foreign key)
+SEPARATE_FILES = {
+    "movies": (database_setup.initialize_db, "movies", "name", "movie_id"),
+    "tv_shows": (database_setup.initialize_tvshow_db, "tv_shows", "title", "tv_show_id"),
+    "books": (database_setup.initialize_database, "books", "title", "book_id"),
+}
+
+TOP_RATED_SQL = '''
+    SELECT catalog.id, catalog.media, catalog.title, catalog.genre,
+           rating_stats.review_count, rating_stats.mean, rating_stats.score
+    FROM rating_stats JOIN catalog ON catalog.id = rating_stats.title_id
+    WHERE rating_stats.review_count > 0 {}
+    ORDER BY rating_stats.score DESC LIMIT ?
+'''
+
+
+def top_rated(limit=10, genre=None):
+    """Best-rated titles of any media type, each tagged with its media and title."""
+    if media_repository.LAYOUT == "consolidated":
+        with db_pool.connection(media_repository.CONSOLIDATED_DATABASE) as conn:
+            if genre:
+                rows = conn.execute(TOP_RATED_SQL.format('AND rating_stats.genre = ?'), (genre, limit)).fetchall()
+            else:
+                rows = conn.execute(TOP_RATED_SQL.format(''), (limit,)).fetchall()
+        return [
+            {"media": r[1], "id": r[0], "title": r[2], "genre": r[3], "review_count": r[4], "mean": r[5], "score": r[6]}
+            for r in rows
+        ]
+    hits = []
+    for module in (movies, tv_shows, books):
+        repository = module.repository
+        for title in repository.top_rated(limit, genre):
+            title["title"] = title.pop(repository.title_column)
+            hits.append(dict(title, media=repository.media))
+    hits.sort(key=lambda title: title["score"], reverse=True)
+    return hits[:limit]
+
+
+def migrate_separate_files(target, sources):
+    """Copy titles and reviews from the per-media files into the consolidated catalog.
+
+    sources maps media type -> old database path; missing files are skipped. Rows are
+    copied with INSERT ... SELECT over an attached database, so nothing is materialised
+    in Python. Ids are shifted past those already in the catalog (movies, copied first
+    into an empty catalog, keep theirs) and each shift is recorded in legacy_id_offsets.
+    Reviews whose title no longer exists are dropped. Returns {media: (titles, reviews)}.
+    """
+    database_setup.initialize_catalog(target)
+    conn = sqlite3.connect(target)
+    db_pool.apply_pragmas(conn)
+    conn.isolation_level = None
+    copied = {}
+    try:
+        for media, path in sources.items():
+            if not path or not os.path.exists(path):
+                continue
+            initialize, table, title_column, title_fk = SEPARATE_FILES[media]
+            initialize(path)  # bring the old file to its latest schema first
+            if conn.execute('SELECT 1 FROM legacy_id_offsets WHERE media = ?', (media,)).fetchone():
+                raise ValueError(f"{media} has already been migrated into {target}")
+            conn.execute('ATTACH DATABASE ? AS source', (path,))
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                title_offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM catalog').fetchone()[0]
+                review_offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM main.reviews').fetchone()[0]
+                reviews_count = "reviews_count" if media == "books" else "0"
+                titles = conn.execute(f'''
+                    INSERT INTO catalog (id, media, title, genre, reviews_count)
+                    SELECT id + ?, ?, {title_column}, genre, {reviews_count} FROM source.{table} ORDER BY id
+                ''', (title_offset, media)).rowcount
+                reviews = conn.execute(f'''
+                    INSERT INTO main.reviews (id, title_id, rating, note)
+                    SELECT r.id + ?, r.{title_fk} + ?, r.rating, r.note FROM source.reviews AS r
+                    WHERE EXISTS (SELECT 1 FROM source.{table} AS t WHERE t.id = r.{title_fk})
+                    ORDER BY r.id
+                ''', (review_offset, title_offset)).rowcount
+                conn.execute('INSERT INTO legacy_id_offsets (media, title_offset, review_offset) VALUES (?, ?, ?)',
+                             (media, title_offset, review_offset))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+            finally:
+                conn.execute('DETACH DATABASE source')
+            copied[media] = (titles, reviews)
+    finally:
+        conn.close()
+    return copied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the per-media databases into one consolidated catalog.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--target", default=media_repository.CONSOLIDATED_DATABASE)
+    parser.add_argument("--movies", default="movie_reviews.db")
+    parser.add_argument("--tv-shows", default="tv_shows_reviews.db")
+    parser.add_argument("--books", default="books.db")
+    args = parser.parse_args(argv)
+
+    copied = migrate_separate_files(args.target, {"movies": args.movies, "tv_shows": args.tv_shows, "books": args.books})
+    for media, (titles, reviews) in copied.items():
+        print(f"{media}: {titles} titles, {reviews} reviews")
+    print(f"Start the app with DB_LAYOUT=consolidated CONSOLIDATED_DATABASE={args.target}")
+
+
+if __name__ == "__main__":
+    main()
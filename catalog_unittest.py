@@ -0,0 +1,163 @@
+# Unit tests for the consolidated catalog layout
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import books
+import catalog
+import db_pool
+import fixtures
+import media_repository
+import movies
+import tv_shows
+from api import app
+
+SEPARATE = {movies: fixtures.MOVIES, tv_shows: fixtures.TV_SHOWS, books: fixtures.BOOKS}
+
+def consolidated(module):
+    """Building a consolidated-layout repository shaped like the module's own one."""
+    repository = module.repository
+    return media_repository.MediaRepository(
+        repository.media, repository.table, repository.title_column, repository.title_fk,
+        lambda: media_repository.CONSOLIDATED_DATABASE, review_counter=repository.review_counter,
+        layout="consolidated", register=False,
+    )
+
+class CatalogTestCase(fixtures.FixtureTestCase):
+
+    def use_catalog(self):
+        """Switching all three modules to the consolidated catalog for the rest of the test."""
+        self.enterContext(mock.patch.dict(media_repository.REPOSITORIES))
+        for module in SEPARATE:
+            repository = consolidated(module)
+            self.enterContext(mock.patch.object(module, "repository", repository))
+            media_repository.REPOSITORIES[repository.media] = repository
+
+class TestMigration(CatalogTestCase):
+
+    # The seeded databases are backed up into files to migrate, which SQLite can't do
+    # from a connection holding a test savepoint
+    fixtures = SEPARATE
+    mode = "snapshot"
+
+    def setUp(self):
+        """Seeding the separate-layout fixtures and a private directory for the migrated files."""
+        super().setUp()
+        self.directory = tempfile.mkdtemp(prefix="catalog-test-")
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.target = os.path.join(self.directory, "catalog.db")
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_movie("Memento", "Thriller")
+        movies.add_review(2, 5, "Clever")
+        tv_shows.add_show("Dark", "Science Fiction")
+        tv_shows.add_review(1, 5, "Dreamlike")
+        tv_shows.add_review(1, 5, "Haunting")
+        books.add_book("Dune", "Science Fiction")
+        books.add_review(1, 4, "Vast")
+
+    def separate_files(self):
+        """Writing each fixture database to a file, as catalog migrations read them."""
+        sources = {}
+        for module in SEPARATE:
+            sources[module.__name__] = os.path.join(self.directory, module.__name__ + ".db")
+            target = sqlite3.connect(sources[module.__name__])
+            self.connection(module).backup(target)
+            target.close()
+        return sources
+
+    def serve_catalog(self):
+        """Pointing the consolidated catalog's name at the migrated file for the rest of the test."""
+        db_pool.bind(media_repository.CONSOLIDATED_DATABASE, self.target)
+        self.addCleanup(db_pool.close_all)
+        self.addCleanup(db_pool.unbind, media_repository.CONSOLIDATED_DATABASE)
+        self.use_catalog()
+
+    def test_migration_keeps_data_and_records_offsets(self):
+        """Testing that the old files are merged with shifted ids and reviews follow their titles."""
+        sources = self.separate_files()
+        copied = catalog.migrate_separate_files(self.target, sources)
+        self.assertEqual(copied, {"movies": (2, 1), "tv_shows": (1, 2), "books": (1, 1)})
+        conn = sqlite3.connect(self.target)
+        self.assertEqual(conn.execute('SELECT * FROM legacy_id_offsets ORDER BY title_offset').fetchall(),
+                         [("movies", 0, 0), ("tv_shows", 2, 1), ("books", 3, 3)])
+        self.assertEqual(conn.execute('SELECT * FROM book_reviews').fetchall(), [(4, 4, 4.0, "Vast")])
+        conn.close()
+        with self.assertRaises(ValueError):
+            catalog.migrate_separate_files(self.target, {"movies": sources["movies"]})
+
+        self.serve_catalog()
+        self.assertEqual(movies.search_reviews(2)["reviews"], [{"review_id": 1, "rating": 5, "note": "Clever"}])
+        self.assertEqual([s["title"] for s in tv_shows.view_reviews()], ["Dark"])
+        self.assertEqual(books.view_books(reviews="count")[0]["review_count"], 1)
+
+    def test_top_rated_anything_is_one_indexed_query(self):
+        """Testing cross-media top-rated on both layouts and its query plan on the catalog."""
+        separate = catalog.top_rated(limit=2)
+        self.assertEqual([(t["media"], t["title"]) for t in separate], [("tv_shows", "Dark"), ("movies", "Memento")])
+
+        catalog.migrate_separate_files(self.target, self.separate_files())
+        self.serve_catalog()
+        with mock.patch.object(media_repository, "LAYOUT", "consolidated"):
+            merged = catalog.top_rated(limit=2)
+        self.assertEqual([(t["media"], t["title"]) for t in merged], [("tv_shows", "Dark"), ("movies", "Memento")])
+
+        conn = sqlite3.connect(self.target)
+        for genre_filter, params in (('', (3,)), ('AND rating_stats.genre = ?', ("Drama", 3))):
+            plan = " | ".join(row[-1] for row in conn.execute(
+                'EXPLAIN QUERY PLAN ' + catalog.TOP_RATED_SQL.format(genre_filter), params))
+            self.assertNotIn("TEMP B-TREE", plan)
+            self.assertIn("USING INDEX", plan)
+        conn.close()
+
+class TestConsolidatedLayout(CatalogTestCase):
+
+    fixtures = {media_repository.CONSOLIDATED_DATABASE: fixtures.CATALOG}
+
+    def setUp(self):
+        super().setUp()
+        self.use_catalog()
+
+    def test_module_functions_on_consolidated_layout(self):
+        """Testing that the data modules keep working, and stay inside their media type, on the catalog."""
+        movies.add_movie("Inception", "Science Fiction")
+        books.add_book("Dune", "Science Fiction")
+        movies.add_review(1, 5, "Amazing movie!")
+        self.assertIsNone(movies.repository.add_review(2, 5, "Not a movie"))
+        movies.delete_movie(2)
+        self.assertEqual([b["title"] for b in books.view_books()], ["Dune"])
+        self.assertEqual([m["name"] for m in movies.search_by_genre("Science Fiction")], ["Inception"])
+        self.assertEqual(movies.view_top_movies()[0]["name"], "Inception")
+        self.assertEqual(books.view_top_books(), [])
+        books.add_review(2, 4, "Vast")
+        self.assertEqual(books.search_book_by_id(2)["book"]["title"], "Dune")
+        movies.delete_movie(1)
+        self.assertEqual(movies.view_reviews(), [])
+        self.assertEqual(len(books.search_reviews(2)["reviews"]), 1)
+
+    def test_bulk_reviews_for_another_media_type_are_rejected(self):
+        """Testing that add_reviews on the catalog skips other media types' ids and leaves their counters alone."""
+        movies.add_movie("Inception", "Science Fiction")
+        books.add_book("Dune", "Science Fiction")
+        self.assertEqual(books.repository.add_reviews([(1, 5, "x"), (1, 4, "y")]), 0)
+        self.assertEqual(books.repository.add_reviews([(1, 5, "x"), (2, 4, "Vast")]), 1)
+        conn = self.connection(media_repository.CONSOLIDATED_DATABASE)
+        self.assertEqual(conn.execute("SELECT id, reviews_count FROM catalog ORDER BY id").fetchall(), [(1, 0), (2, 1)])
+        self.assertEqual(conn.execute("SELECT title_id FROM reviews").fetchall(), [(2,)])
+
+    def test_review_endpoints_reject_another_media_types_id(self):
+        """Testing that posting a review to an id of another media type is a 404 and writes nothing."""
+        movies.add_movie("Inception", "Science Fiction")
+        books.add_book("Dune", "Science Fiction")
+        tv_shows.add_show("Dark", "Science Fiction")
+        client = app.test_client()
+        for path in ('/movies/2/reviews', '/books/3/reviews', '/tv_shows/1/reviews'):
+            self.assertEqual(client.post(path, json={"rating": 5, "note": "Wrong type"}).status_code, 404, path)
+        self.assertEqual(client.post('/movies/1/reviews', json={"rating": 5, "note": "Right type"}).status_code, 201)
+        conn = self.connection(media_repository.CONSOLIDATED_DATABASE)
+        self.assertEqual(conn.execute("SELECT title_id, note FROM reviews").fetchall(), [(1, "Right type")])
+
+if __name__ == '__main__':
+    unittest.main()
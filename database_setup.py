@@ -2,12 +2,274 @@
 # Setting up sqlite3 database for the project
 
 import sqlite3
+import sys
 
+import db_pool
+import media_repository
+
+
+# Versioned schema migrations. Each database records how many of its migrations
+# have run in PRAGMA user_version, so re-running setup only applies the new ones
+# and upgrades existing files in place without touching their data.
+# Never edit a migration once released: append a new one instead.
+
+# Bayesian prior for rating_stats.score: every title starts as if it had
+# PRIOR_WEIGHT reviews of PRIOR_MEAN, so a single 5-star review does not top the charts.
+PRIOR_MEAN = 3.0
+PRIOR_WEIGHT = 5
+
+
+def rating_stats_statements(titles, title_fk, media_column=None):
+    """DDL for the per-title rating aggregate table plus the triggers that keep it current.
+
+    rating_stats holds one row per title (count, sum, mean and Bayesian score) so top-N
+    and best-in-genre lookups walk an index instead of sorting every review. Triggers on
+    the title and reviews tables update it incrementally for every write path,
+    including bulk imports; rebuild_rating_stats_sql() recomputes it from scratch.
+    With media_column (the consolidated catalog) rows also carry the media type and
+    get per-media score indexes next to the cross-media ones.
+    """
+    per_media = [
+        'CREATE INDEX IF NOT EXISTS idx_rating_stats_media_score ON rating_stats (media, score DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_rating_stats_media_genre_score ON rating_stats (media, genre, score DESC)',
+    ] if media_column else []
+    media_def = "media TEXT NOT NULL," if media_column else ""
+    media_col = "media, " if media_column else ""
+    media_new = f"NEW.{media_column}, " if media_column else ""
+    return [
+        f'''CREATE TABLE IF NOT EXISTS rating_stats (
+            title_id INTEGER PRIMARY KEY, {media_def}
+            genre TEXT,
+            review_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum REAL NOT NULL DEFAULT 0,
+            mean REAL GENERATED ALWAYS AS (CASE WHEN review_count > 0 THEN rating_sum / review_count END) VIRTUAL,
+            score REAL GENERATED ALWAYS AS ((rating_sum + {PRIOR_MEAN * PRIOR_WEIGHT}) / (review_count + {PRIOR_WEIGHT})) STORED
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_rating_stats_score ON rating_stats (score DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_rating_stats_genre_score ON rating_stats (genre, score DESC)',
+        *per_media,
+        *rebuild_rating_stats_sql(titles, title_fk, media_column),
+        f'''CREATE TRIGGER IF NOT EXISTS rating_stats_title_insert AFTER INSERT ON {titles} BEGIN
+            INSERT OR IGNORE INTO rating_stats (title_id, {media_col}genre) VALUES (NEW.id, {media_new}NEW.genre);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS rating_stats_title_genre AFTER UPDATE OF genre ON {titles} BEGIN
+            UPDATE rating_stats SET genre = NEW.genre WHERE title_id = NEW.id;
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS rating_stats_title_delete AFTER DELETE ON {titles} BEGIN
+            DELETE FROM rating_stats WHERE title_id = OLD.id;
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS rating_stats_review_insert AFTER INSERT ON reviews BEGIN
+            UPDATE rating_stats SET review_count = review_count + 1, rating_sum = rating_sum + NEW.rating
+            WHERE title_id = NEW.{title_fk};
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS rating_stats_review_update AFTER UPDATE OF rating, {title_fk} ON reviews BEGIN
+            UPDATE rating_stats SET review_count = review_count - 1, rating_sum = rating_sum - OLD.rating
+            WHERE title_id = OLD.{title_fk};
+            UPDATE rating_stats SET review_count = review_count + 1, rating_sum = rating_sum + NEW.rating
+            WHERE title_id = NEW.{title_fk};
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS rating_stats_review_delete AFTER DELETE ON reviews BEGIN
+            UPDATE rating_stats SET review_count = review_count - 1, rating_sum = rating_sum - OLD.rating
+            WHERE title_id = OLD.{title_fk};
+        END''',
+    ]
+
+
+def rebuild_rating_stats_sql(titles, title_fk, media_column=None):
+    """Statements that recompute rating_stats from the title and reviews tables."""
+    media_col = "media, " if media_column else ""
+    media_src = f"{titles}.{media_column}, " if media_column else ""
+    return [
+        'DELETE FROM rating_stats',
+        f'''INSERT INTO rating_stats (title_id, {media_col}genre, review_count, rating_sum)
+            SELECT {titles}.id, {media_src}{titles}.genre, COUNT(reviews.id), COALESCE(SUM(reviews.rating), 0)
+            FROM {titles} LEFT JOIN reviews ON reviews.{title_fk} = {titles}.id
+            GROUP BY {titles}.id''',
+    ]
+
+
+# Tokenizer settings shared by every full-text index: case and accent folding, plus
+# prefix indexes so 2- and 3-character prefix queries ("inc*") avoid a full term scan
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def search_index_statements(titles, title_column):
+    """DDL for the FTS5 indexes over title names/genres and review notes, plus sync triggers.
+
+    Both are external-content tables: they index the existing rows instead of storing
+    a second copy, and snippet() reads the text back from the source table.
+    """
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS title_fts USING fts5({title_column}, genre, content='{titles}', content_rowid='id', {FTS_OPTIONS})",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5(note, content='reviews', content_rowid='id', {FTS_OPTIONS})",
+        "INSERT INTO title_fts(title_fts) VALUES ('rebuild')",
+        "INSERT INTO review_fts(review_fts) VALUES ('rebuild')",
+        f'''CREATE TRIGGER IF NOT EXISTS title_fts_insert AFTER INSERT ON {titles} BEGIN
+            INSERT INTO title_fts (rowid, {title_column}, genre) VALUES (NEW.id, NEW.{title_column}, NEW.genre);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS title_fts_delete AFTER DELETE ON {titles} BEGIN
+            INSERT INTO title_fts (title_fts, rowid, {title_column}, genre) VALUES ('delete', OLD.id, OLD.{title_column}, OLD.genre);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS title_fts_update AFTER UPDATE OF {title_column}, genre ON {titles} BEGIN
+            INSERT INTO title_fts (title_fts, rowid, {title_column}, genre) VALUES ('delete', OLD.id, OLD.{title_column}, OLD.genre);
+            INSERT INTO title_fts (rowid, {title_column}, genre) VALUES (NEW.id, NEW.{title_column}, NEW.genre);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS review_fts_insert AFTER INSERT ON reviews BEGIN
+            INSERT INTO review_fts (rowid, note) VALUES (NEW.id, NEW.note);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS review_fts_delete AFTER DELETE ON reviews BEGIN
+            INSERT INTO review_fts (review_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS review_fts_update AFTER UPDATE OF note ON reviews BEGIN
+            INSERT INTO review_fts (review_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+            INSERT INTO review_fts (rowid, note) VALUES (NEW.id, NEW.note);
+        END''',
+    ]
+
+
+MOVIE_MIGRATIONS = [
+    # 1: indexes for search_reviews/delete_movie/view_reviews, search_by_genre and view_top_movies
+    [
+        'CREATE INDEX IF NOT EXISTS idx_reviews_movie_id ON reviews (movie_id)',
+        'CREATE INDEX IF NOT EXISTS idx_movies_genre ON movies (genre)',
+        'CREATE INDEX IF NOT EXISTS idx_reviews_rating ON reviews (rating)',
+    ],
+    # 2: precomputed per-movie rating aggregates
+    rating_stats_statements('movies', 'movie_id'),
+    # 3: full-text search over movie names, genres and review notes
+    search_index_statements('movies', 'name'),
+]
+
+TVSHOW_MIGRATIONS = [
+    # 1: indexes for search_reviews/delete_show/view_reviews and search_by_genre
+    [
+        'CREATE INDEX IF NOT EXISTS idx_reviews_tv_show_id ON reviews (tv_show_id)',
+        'CREATE INDEX IF NOT EXISTS idx_tv_shows_genre ON tv_shows (genre)',
+    ],
+    # 2: precomputed per-show rating aggregates
+    rating_stats_statements('tv_shows', 'tv_show_id'),
+    # 3: full-text search over show titles, genres and review notes
+    search_index_statements('tv_shows', 'title'),
+]
+
+BOOK_MIGRATIONS = [
+    # 1: "INT AUTO_INCREMENT PRIMARY KEY" is MySQL syntax; in SQLite it is not a rowid
+    # alias, so ids were never generated. Rebuild both tables with real INTEGER keys.
+    [
+        '''CREATE TABLE books_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            genre TEXT,
+            reviews_count INTEGER DEFAULT 0
+        )''',
+        'INSERT INTO books_new (id, title, genre, reviews_count) SELECT id, title, genre, reviews_count FROM books ORDER BY rowid',
+        'DROP TABLE books',
+        'ALTER TABLE books_new RENAME TO books',
+        '''CREATE TABLE reviews_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            rating INTEGER NOT NULL,
+            note TEXT,
+            FOREIGN KEY (book_id) REFERENCES books (id) ON DELETE CASCADE
+        )''',
+        'INSERT INTO reviews_new (id, book_id, rating, note) SELECT id, book_id, rating, note FROM reviews ORDER BY rowid',
+        'DROP TABLE reviews',
+        'ALTER TABLE reviews_new RENAME TO reviews',
+    ],
+    # 2: indexes for search_reviews/delete_book/view_books and genre lookups
+    [
+        'CREATE INDEX IF NOT EXISTS idx_reviews_book_id ON reviews (book_id)',
+        'CREATE INDEX IF NOT EXISTS idx_books_genre ON books (genre)',
+    ],
+    # 3: precomputed per-book rating aggregates
+    rating_stats_statements('books', 'book_id'),
+    # 4: full-text search over book titles, genres and review notes
+    search_index_statements('books', 'title'),
+]
+
+
+# Consolidated layout (media_repository.DB_LAYOUT=consolidated): one file with a shared
+# catalog and reviews table. Ids are unique across media types; the movies, tv_shows and
+# books views keep the per-media shape the data modules read, and *_reviews views give
+# the same for reviews. catalog.migrate_separate_files() fills it from the old files.
+CATALOG_MIGRATIONS = [
+    # 1: shared tables, their indexes and the compatibility views
+    [
+        '''CREATE TABLE IF NOT EXISTS catalog (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            media TEXT NOT NULL CHECK (media IN ('movies', 'tv_shows', 'books')),
+            title TEXT NOT NULL,
+            genre TEXT,
+            reviews_count INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title_id INTEGER NOT NULL,
+            rating REAL NOT NULL,
+            note TEXT,
+            FOREIGN KEY (title_id) REFERENCES catalog (id) ON DELETE CASCADE
+        )''',
+        # Rows keep id order within a media type, so keyset pages walk this index
+        'CREATE INDEX IF NOT EXISTS idx_catalog_media ON catalog (media)',
+        'CREATE INDEX IF NOT EXISTS idx_catalog_media_genre ON catalog (media, genre)',
+        'CREATE INDEX IF NOT EXISTS idx_reviews_title_id ON reviews (title_id)',
+        # How far each media type's ids were shifted when its old file was merged in
+        '''CREATE TABLE IF NOT EXISTS legacy_id_offsets (
+            media TEXT PRIMARY KEY,
+            title_offset INTEGER NOT NULL,
+            review_offset INTEGER NOT NULL
+        )''',
+        "CREATE VIEW IF NOT EXISTS movies AS SELECT id, title AS name, genre FROM catalog WHERE media = 'movies'",
+        "CREATE VIEW IF NOT EXISTS tv_shows AS SELECT id, title, genre FROM catalog WHERE media = 'tv_shows'",
+        "CREATE VIEW IF NOT EXISTS books AS SELECT id, title, genre, reviews_count FROM catalog WHERE media = 'books'",
+        *(
+            f'''CREATE VIEW IF NOT EXISTS {view} AS
+                SELECT reviews.id, reviews.title_id AS {fk}, reviews.rating, reviews.note
+                FROM reviews JOIN catalog ON catalog.id = reviews.title_id
+                WHERE catalog.media = '{media}'
+            '''
+            for view, fk, media in (
+                ("movie_reviews", "movie_id", "movies"),
+                ("tv_show_reviews", "tv_show_id", "tv_shows"),
+                ("book_reviews", "book_id", "books"),
+            )
+        ),
+    ],
+    # 2: rating aggregates for per-media and cross-media top-rated lists
+    rating_stats_statements('catalog', 'title_id', 'media'),
+    # 3: one full-text index over every title and one over every review
+    search_index_statements('catalog', 'title'),
+]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, migrations):
+    """Apply every migration newer than the database's user_version, one transaction each."""
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # manage BEGIN/COMMIT ourselves so DDL is transactional
+    try:
+        for version in range(schema_version(conn) + 1, len(migrations) + 1):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in migrations[version - 1]:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+    return schema_version(conn)
 
 
 # Movies tab database, author Aditi, december 2, 2024
-def initialize_db():
-    conn = sqlite3.connect('movie_reviews.db')
+def initialize_db(database='movie_reviews.db'):
+    conn = sqlite3.connect(database)
+    db_pool.apply_pragmas(conn)  # persists journal_mode=WAL in the file
     cursor = conn.cursor()
     
     # Creating  movies table
@@ -31,12 +293,14 @@ def initialize_db():
     ''')
 
     conn.commit()
+    migrate(conn, MOVIE_MIGRATIONS)
     conn.close()
 # Tv_shows
 #Mastewal
-def initialize_tvshow_db():
+def initialize_tvshow_db(database="tv_shows_reviews.db"):
     """Initialize the database and create tables if they don't exist."""
-    conn = sqlite3.connect("tv_shows_reviews.db")
+    conn = sqlite3.connect(database)
+    db_pool.apply_pragmas(conn)  # persists journal_mode=WAL in the file
     cursor = conn.cursor()
 
     # Create tv_shows table
@@ -60,13 +324,15 @@ def initialize_tvshow_db():
     ''')
 
     conn.commit()
+    migrate(conn, TVSHOW_MIGRATIONS)
     conn.close()
 
 
 
 #books
-def initialize_database():
-    conn = sqlite3.connect('books.db')
+def initialize_database(database='books.db'):
+    conn = sqlite3.connect(database)
+    db_pool.apply_pragmas(conn)  # persists journal_mode=WAL in the file
     # connection = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
@@ -89,10 +355,38 @@ def initialize_database():
     # connection.commit()
     # connection.close()
     conn.commit()
+    migrate(conn, BOOK_MIGRATIONS)
+    conn.close()
+
+
+# Consolidated catalog database (DB_LAYOUT=consolidated)
+def initialize_catalog(database='media_reviews.db'):
+    conn = sqlite3.connect(database)
+    db_pool.apply_pragmas(conn)  # persists journal_mode=WAL in the file
+    migrate(conn, CATALOG_MIGRATIONS)
+    conn.close()
+
+
+# Recompute rating_stats from scratch, e.g. after editing a database by hand
+def rebuild_rating_stats(database, titles, title_fk, media_column=None):
+    conn = sqlite3.connect(database)
+    with conn:
+        for statement in rebuild_rating_stats_sql(titles, title_fk, media_column):
+            conn.execute(statement)
     conn.close()
 
 
 if __name__ == "__main__":
+    if media_repository.LAYOUT == "consolidated":
+        initialize_catalog(media_repository.CONSOLIDATED_DATABASE)
+        if sys.argv[1:] == ["rebuild-stats"]:
+            rebuild_rating_stats(media_repository.CONSOLIDATED_DATABASE, 'catalog', 'title_id', 'media')
+        sys.exit()
     initialize_db()
     initialize_tvshow_db()
-    initialize_database()
\ No newline at end of file
+    initialize_database()
+    # python database_setup.py rebuild-stats
+    if sys.argv[1:] == ["rebuild-stats"]:
+        rebuild_rating_stats('movie_reviews.db', 'movies', 'movie_id')
+        rebuild_rating_stats('tv_shows_reviews.db', 'tv_shows', 'tv_show_id')
+        rebuild_rating_stats('books.db', 'books', 'book_id')
\ No newline at end of file
@@ -0,0 +1,169 @@
+# Unit tests for schema setup and migrations
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import database_setup
+import fixtures
+import movies
+import tv_shows
+
+def query_plan(conn, sql, params=()):
+    """Returning the EXPLAIN QUERY PLAN details for a statement, joined into one string."""
+    return " | ".join(row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+class SchemaTestCase(fixtures.FixtureTestCase):
+
+    def assertNoFullScan(self, plan, table):
+        """Failing if the plan scans `table` without an index."""
+        for step in plan.split(" | "):
+            if step.startswith(f"SCAN {table}") and "INDEX" not in step:
+                self.fail(f"Full scan of {table}: {plan}")
+
+class TestMigrations(SchemaTestCase):
+
+    def setUp(self):
+        """Giving each test a private directory, as the initializers open their database by path."""
+        super().setUp()
+        directory = tempfile.mkdtemp(prefix="database-setup-test-")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.database = os.path.join(directory, "test.db")
+
+    def stats(self):
+        """Returning rating_stats rows as (title_id, genre, review_count, rating_sum)."""
+        conn = sqlite3.connect(self.database)
+        rows = conn.execute('SELECT title_id, genre, review_count, rating_sum FROM rating_stats ORDER BY title_id').fetchall()
+        conn.close()
+        return rows
+
+    def test_fresh_movie_db_is_at_latest_version(self):
+        """Testing that a new database ends up at the newest schema version."""
+        database_setup.initialize_db(self.database)
+        conn = sqlite3.connect(self.database)
+        self.assertEqual(database_setup.schema_version(conn), len(database_setup.MOVIE_MIGRATIONS))
+        conn.close()
+
+    def test_existing_movie_db_is_upgraded_in_place(self):
+        """Testing that an unversioned database keeps its data when migrated."""
+        conn = sqlite3.connect(self.database)
+        conn.execute('CREATE TABLE movies (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, genre TEXT NOT NULL)')
+        conn.execute('CREATE TABLE reviews (id INTEGER PRIMARY KEY AUTOINCREMENT, movie_id INTEGER NOT NULL, rating INTEGER NOT NULL, note TEXT NOT NULL)')
+        conn.execute("INSERT INTO movies (name, genre) VALUES ('Inception', 'Science Fiction')")
+        conn.execute("INSERT INTO reviews (movie_id, rating, note) VALUES (1, 5, 'Amazing movie!')")
+        conn.commit()
+        conn.close()
+
+        database_setup.initialize_db(self.database)
+        database_setup.initialize_db(self.database)
+
+        conn = sqlite3.connect(self.database)
+        self.assertEqual(conn.execute('SELECT name FROM movies').fetchall(), [('Inception',)])
+        self.assertEqual(conn.execute('SELECT note FROM reviews').fetchall(), [('Amazing movie!',)])
+        self.assertEqual(database_setup.schema_version(conn), len(database_setup.MOVIE_MIGRATIONS))
+        conn.close()
+
+    def test_failed_migration_is_rolled_back(self):
+        """Testing that a broken migration leaves the version and schema unchanged."""
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+        migrations = [['CREATE INDEX idx_t_x ON t (x)', 'CREATE INDEX idx_t_y ON t (y)']]
+        with self.assertRaises(sqlite3.OperationalError):
+            database_setup.migrate(conn, migrations)
+        self.assertEqual(database_setup.schema_version(conn), 0)
+        self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_t_x'").fetchone())
+        conn.close()
+
+    def test_books_get_real_ids(self):
+        """Testing that the books rebuild gives new rows generated ids and keeps old rows."""
+        conn = sqlite3.connect(self.database)
+        conn.execute('CREATE TABLE books (id INT AUTO_INCREMENT PRIMARY KEY, title VARCHAR(255) NOT NULL, genre VARCHAR(100), reviews_count INT DEFAULT 0)')
+        conn.execute("INSERT INTO books (id, title, genre) VALUES (7, 'Dune', 'Science Fiction')")
+        conn.commit()
+        conn.close()
+
+        database_setup.initialize_database(self.database)
+
+        conn = sqlite3.connect(self.database)
+        conn.execute("INSERT INTO books (title, genre) VALUES ('Emma', 'Romance')")
+        self.assertEqual(conn.execute('SELECT id, title FROM books ORDER BY id').fetchall(), [(7, 'Dune'), (8, 'Emma')])
+        self.assertNoFullScan(query_plan(conn, 'SELECT * FROM reviews WHERE book_id = ?', (1,)), 'reviews')
+        conn.close()
+
+    def test_rebuild_rating_stats(self):
+        """Testing that a rebuild recomputes rating_stats from the reviews table."""
+        database_setup.initialize_db(self.database)
+        conn = sqlite3.connect(self.database)
+        conn.execute("INSERT INTO movies (name, genre) VALUES ('Inception', 'Science Fiction')")
+        conn.execute("INSERT INTO reviews (movie_id, rating, note) VALUES (1, 4, 'Good')")
+        conn.execute('UPDATE rating_stats SET review_count = 99')
+        conn.commit()
+        conn.close()
+        database_setup.rebuild_rating_stats(self.database, 'movies', 'movie_id')
+        self.assertEqual(self.stats(), [(1, "Science Fiction", 1, 4)])
+
+class TestSchema(SchemaTestCase):
+
+    fixtures = {movies: fixtures.MOVIES, tv_shows: fixtures.TV_SHOWS}
+
+    def query_plan(self, module, sql, params=()):
+        return query_plan(self.connection(module), sql, params)
+
+    def stats(self):
+        """Returning rating_stats rows as (title_id, genre, review_count, rating_sum)."""
+        return self.connection(movies).execute(
+            'SELECT title_id, genre, review_count, rating_sum FROM rating_stats ORDER BY title_id').fetchall()
+
+    def test_movie_queries_use_indexes(self):
+        """Testing that the movies access paths do not fall back to full table scans."""
+        self.assertNoFullScan(self.query_plan(movies, 'SELECT * FROM reviews WHERE movie_id = ?', (1,)), 'reviews')
+        self.assertNoFullScan(self.query_plan(movies, 'DELETE FROM reviews WHERE movie_id = ?', (1,)), 'reviews')
+        self.assertNoFullScan(self.query_plan(movies, 'SELECT * FROM movies WHERE genre = ?', ("Drama",)), 'movies')
+        self.assertNoFullScan(self.query_plan(movies, 'SELECT * FROM reviews ORDER BY rating DESC LIMIT 3'), 'reviews')
+        plan = self.query_plan(movies, '''
+            SELECT page.id, reviews.id FROM (SELECT id FROM movies WHERE id > ? ORDER BY id LIMIT ?) AS page
+            LEFT JOIN reviews ON reviews.movie_id = page.id ORDER BY page.id, reviews.id
+        ''', (0, 10))
+        self.assertNoFullScan(plan, 'reviews')
+
+    def test_tv_show_queries_use_indexes(self):
+        """Testing that the tv_shows access paths do not fall back to full table scans."""
+        self.assertNoFullScan(self.query_plan(tv_shows, 'SELECT * FROM reviews WHERE tv_show_id = ?', (1,)), 'reviews')
+        self.assertNoFullScan(self.query_plan(tv_shows, 'SELECT * FROM tv_shows WHERE genre = ?', ("Drama",)), 'tv_shows')
+
+    def test_rating_stats_follow_review_writes(self):
+        """Testing that add/edit/delete of reviews and movies keep rating_stats current."""
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_movie("Memento", "Thriller")
+        movies.add_review(1, 5, "Amazing movie!")
+        movies.add_review(1, 3, "Confusing")
+        movies.add_review(2, 4, "Clever")
+        self.assertEqual(self.stats(), [(1, "Science Fiction", 2, 8), (2, "Thriller", 1, 4)])
+
+        movies.edit_review(1, 2, rating=5)
+        movies.delete_review(2, 3)
+        self.assertEqual(self.stats(), [(1, "Science Fiction", 2, 10), (2, "Thriller", 0, 0)])
+
+        top = movies.view_top_movies()
+        self.assertEqual([m["name"] for m in top], ["Inception"])
+        self.assertEqual(top[0]["mean"], 5)
+        self.assertAlmostEqual(top[0]["score"], (10 + 15) / 7)
+        self.assertEqual(movies.view_top_movies(genre="Thriller"), [])
+
+        movies.delete_movie(1)
+        self.assertEqual(self.stats(), [(2, "Thriller", 0, 0)])
+
+    def test_top_rated_uses_index(self):
+        """Testing that top-N and best-in-genre read the score indexes instead of sorting."""
+        for sql, params in (
+            ('SELECT title_id FROM rating_stats WHERE review_count > 0 ORDER BY score DESC LIMIT 3', ()),
+            ('SELECT title_id FROM rating_stats WHERE review_count > 0 AND genre = ? ORDER BY score DESC LIMIT 3', ("Drama",)),
+        ):
+            plan = self.query_plan(movies, sql, params)
+            self.assertNotIn("TEMP B-TREE", plan)
+            self.assertNoFullScan(plan, 'rating_stats')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,304 @@
+# Shared SQLite connection pool for the movies, tv_shows and books backends
+# Replaces the connect/close pair that every data function used to do per call.
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+
+import metrics
+
+# Default number of connections kept per database file
+POOL_SIZE = 5
+
+# How long (seconds) a caller waits for a free connection before giving up
+CHECKOUT_TIMEOUT = 30.0
+
+# Storage profiles: the PRAGMAs applied, in order, to every new connection and by
+# database_setup when a database is created or migrated.
+#   wal     - readers never block on the writer; fsync only at checkpoints (default)
+#   durable - WAL, but fsync every commit
+#   legacy  - the old rollback-journal behaviour, kept for comparison benchmarks
+STORAGE_PROFILES = {
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,  # KiB, i.e. 16 MB of page cache per connection
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,  # pages; checkpoint once the WAL passes ~4 MB
+        "journal_size_limit": 67108864,  # truncate the WAL back to 64 MB after checkpoints
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 67108864,
+    },
+    "legacy": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+
+STORAGE_PROFILE = os.environ.get("DB_STORAGE_PROFILE", "wal")
+
+PRAGMAS = dict(STORAGE_PROFILES[STORAGE_PROFILE])
+
+# Read-only mode (prefork.py's read workers): connections open the file with
+# mode=ro and PRAGMA query_only, skip the PRAGMAs that write to the file, and fail on
+# any write instead of contending for the lock. Not immutable=1: the writer process
+# keeps changing the file, and readers must see its commits.
+READ_ONLY = False
+WRITE_PRAGMAS = ("journal_mode", "wal_autocheckpoint", "journal_size_limit")
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within CHECKOUT_TIMEOUT."""
+
+
+class ConnectionPool:
+    """A fixed-size pool of sqlite3 connections to a single database file."""
+
+    def __init__(self, database, size=POOL_SIZE, pragmas=None, timeout=CHECKOUT_TIMEOUT, read_only=False):
+        self.database = database
+        self.size = size
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self.read_only = read_only
+        if read_only:
+            self.pragmas = {name: value for name, value in self.pragmas.items() if name not in WRITE_PRAGMAS}
+            self.pragmas["query_only"] = 1
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.discarded = 0
+        self.closed = False
+
+    def _open(self):
+        factory = metrics.Connection if metrics.ENABLED else sqlite3.Connection
+        database, uri = self.database, self.database.startswith("file:")
+        if self.read_only and not uri:
+            database, uri = f"file:{urllib.parse.quote(os.path.abspath(database))}?mode=ro", True
+        conn = sqlite3.connect(database, check_same_thread=False, factory=factory, uri=uri)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self.discarded += 1
+
+    def acquire(self):
+        """Check out a connection, opening a new one if the pool is not full."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._created < self.size:
+                        self._created += 1
+                        self.misses += 1
+                        create = True
+                    else:
+                        create = False
+                if create:
+                    try:
+                        return self._open()
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                start = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"No free connection to {self.database} after {self.timeout}s")
+                finally:
+                    with self._lock:
+                        self.waits += 1
+                        self.wait_time += time.perf_counter() - start
+            if self._healthy(conn):
+                with self._lock:
+                    self.hits += 1
+                return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back anything left open."""
+        if self.closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close every idle connection. Checked-out connections are closed on release."""
+        self.closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "database": self.database,
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "discarded": self.discarded,
+                "read_only": self.read_only,
+            }
+
+
+def apply_pragmas(conn, pragmas=None):
+    """Apply a PRAGMA set (the active storage profile by default) to a connection."""
+    for name, value in (PRAGMAS if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Databases rerouted by bind(): key -> other database name, or (connection, lock)
+_bindings = {}
+
+
+def _key(database):
+    # URIs such as file:name?mode=memory&cache=shared name no file to resolve
+    return database if database.startswith("file:") else os.path.abspath(database)
+
+
+def get_pool(database):
+    """Return the shared pool for a database file, creating it on first use."""
+    key = _key(database)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(database, POOL_SIZE, PRAGMAS, CHECKOUT_TIMEOUT, READ_ONLY)
+                _pools[key] = pool
+    return pool
+
+
+@contextmanager
+def connection(database):
+    """Borrow a pooled connection to `database` for the duration of a with block."""
+    if _bindings:
+        bound = _bindings.get(_key(database))
+        if isinstance(bound, str):
+            database = bound
+        elif bound is not None:
+            conn, lock = bound
+            with lock:
+                try:
+                    yield conn
+                finally:
+                    if conn.in_transaction:
+                        conn.rollback()
+            return
+    with get_pool(database).connection() as conn:
+        yield conn
+
+
+def bind(database, target):
+    """Serve connection(database) from `target` instead of the database's own pool.
+
+    `target` is another database name (a file or a file: URI, pooled as usual) or a
+    single connection, which callers then take turns on. Test fixtures use this to
+    inject in-memory databases under the names the data modules already use.
+    """
+    _bindings[_key(database)] = target if isinstance(target, str) else (target, threading.RLock())
+
+
+def unbind(database):
+    _bindings.pop(_key(database), None)
+
+
+def configure(size=None, pragmas=None, timeout=None, profile=None, read_only=None):
+    """Change pool settings. Existing pools are closed so new settings take effect.
+
+    `profile` selects one of STORAGE_PROFILES; `pragmas` overrides individual PRAGMAs on top of it.
+    `read_only` switches every pool to read-only connections (see READ_ONLY).
+    """
+    global POOL_SIZE, PRAGMAS, CHECKOUT_TIMEOUT, STORAGE_PROFILE, READ_ONLY
+    if read_only is not None:
+        READ_ONLY = read_only
+    if size is not None:
+        POOL_SIZE = size
+    if profile is not None:
+        STORAGE_PROFILE = profile
+        PRAGMAS = dict(STORAGE_PROFILES[profile])
+    if pragmas is not None:
+        PRAGMAS = {**PRAGMAS, **pragmas}
+    if timeout is not None:
+        CHECKOUT_TIMEOUT = timeout
+    close_all()
+
+
+def checkpoint(database, mode="PASSIVE"):
+    """Run a WAL checkpoint. Returns (busy, wal_pages, checkpointed_pages).
+
+    wal_autocheckpoint keeps the WAL bounded during normal traffic; call this with
+    mode="TRUNCATE" from maintenance jobs or at shutdown to fold the WAL back in.
+    """
+    with connection(database) as conn:
+        return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+def close_all():
+    """Close and forget every pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Counters for every open pool, keyed by database path."""
+    return {pool.database: pool.stats() for pool in list(_pools.values())}
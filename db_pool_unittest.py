@@ -0,0 +1,125 @@
+# Unit tests for the shared SQLite connection pool
+
+import os
+import sqlite3
+import threading
+import unittest
+import db_pool
+
+TEST_DATABASE = 'test_db_pool.db'
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        """Starting every test with a fresh pool."""
+        self.pool = db_pool.ConnectionPool(TEST_DATABASE, size=2, timeout=0.2)
+
+    def tearDown(self):
+        """Closing the pool and removing the test database."""
+        self.pool.close()
+        for path in (TEST_DATABASE, TEST_DATABASE + '-wal', TEST_DATABASE + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_connections_are_reused(self):
+        """Testing that a released connection is handed out again."""
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        stats = self.pool.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["open"], 1)
+
+    def test_pragmas_are_applied(self):
+        """Testing that every connection gets the configured PRAGMAs."""
+        with self.pool.connection() as conn:
+            timeout = conn.execute('PRAGMA busy_timeout').fetchone()[0]
+        self.assertEqual(timeout, db_pool.PRAGMAS["busy_timeout"])
+
+    def test_storage_profile(self):
+        """Testing that the default profile puts the database in WAL mode."""
+        with self.pool.connection() as conn:
+            journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+            synchronous = conn.execute('PRAGMA synchronous').fetchone()[0]
+        self.assertEqual(journal_mode, 'wal')
+        self.assertEqual(synchronous, 1)  # NORMAL
+        self.assertEqual(db_pool.checkpoint(TEST_DATABASE, "TRUNCATE")[0], 0)
+        db_pool.close_all()
+
+    def test_legacy_profile(self):
+        """Testing that a pool can be opened with another storage profile."""
+        pool = db_pool.ConnectionPool(TEST_DATABASE, pragmas=db_pool.STORAGE_PROFILES["legacy"])
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+        pool.close()
+
+    def test_pool_size_is_bounded(self):
+        """Testing that checkout blocks and then times out when the pool is full."""
+        a = self.pool.acquire()
+        b = self.pool.acquire()
+        with self.assertRaises(db_pool.PoolTimeout):
+            self.pool.acquire()
+        self.pool.release(a)
+        self.pool.release(b)
+        self.assertEqual(self.pool.stats()["waits"], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """Testing that a waiting thread receives a connection once one is released."""
+        a = self.pool.acquire()
+        b = self.pool.acquire()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(self.pool.acquire()))
+        waiter.start()
+        self.pool.release(a)
+        waiter.join(1)
+        self.assertIs(got[0], a)
+        self.pool.release(got[0])
+        self.pool.release(b)
+
+    def test_broken_connection_is_replaced(self):
+        """Testing the health check discards a closed connection."""
+        with self.pool.connection() as conn:
+            pass
+        conn.close()
+        with self.pool.connection() as fresh:
+            self.assertEqual(fresh.execute('SELECT 1').fetchone()[0], 1)
+        self.assertIsNot(conn, fresh)
+        self.assertEqual(self.pool.stats()["discarded"], 1)
+
+    def test_uncommitted_work_is_rolled_back(self):
+        """Testing that release rolls back an open transaction."""
+        with self.pool.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS t (x INTEGER)')
+            conn.commit()
+            conn.execute('INSERT INTO t VALUES (1)')
+        with self.pool.connection() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_read_only_pool(self):
+        """Testing that read-only connections see committed writes but cannot write."""
+        with self.pool.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS t (x INTEGER)')
+            conn.commit()
+        reader = db_pool.ConnectionPool(TEST_DATABASE, read_only=True)
+        with reader.connection() as ro:
+            self.assertEqual(ro.execute('PRAGMA query_only').fetchone()[0], 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                ro.execute('INSERT INTO t VALUES (1)')
+            with self.pool.connection() as conn:
+                conn.execute('INSERT INTO t VALUES (2)')
+                conn.commit()
+            self.assertEqual(ro.execute('SELECT x FROM t').fetchall(), [(2,)])
+        self.assertTrue(reader.stats()["read_only"])
+        reader.close()
+
+    def test_shared_pool_per_database(self):
+        """Testing that get_pool returns one pool per database file."""
+        self.assertIs(db_pool.get_pool(TEST_DATABASE), db_pool.get_pool('./' + TEST_DATABASE))
+        db_pool.close_all()
+
+if __name__ == '__main__':
+    unittest.main()
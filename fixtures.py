@@ -0,0 +1,194 @@
+# Test fixtures: isolated in-memory databases for the data modules, seeded once per
+# process from a template and reset between tests without DDL or files on disk.
+#
+# A Template runs a database_setup initializer (and an optional seed function) once,
+# then keeps the result in memory. Each data module under test gets its own copy,
+# injected with db_pool.bind() under the name in the module's DATABASE, so movies.py,
+# api.py, search, review_queue and the rest reach it through their usual
+# db_pool.connection() calls and no test repoints a module global. Two modes:
+#
+#   savepoint  one private :memory: connection. Every test runs inside a SAVEPOINT that
+#              is rolled back afterwards; commit() and BEGIN issued by the code under
+#              test act on a nested savepoint, so commits and rollbacks behave as
+#              usual within the test. Ids restart for each test (sqlite_sequence is
+#              rolled back too). This is the default.
+#   snapshot   a shared-cache in-memory database reached through the normal
+#              connection pool, for tests that need several real connections and
+#              transactions. It is restored from the template before each test.
+#
+# Nothing is written to disk, so test files can run in parallel processes
+# (pytest-xdist or several unittest runners) without sharing state.
+#
+#   class TestMovies(fixtures.FixtureTestCase):
+#       fixtures = {movies: fixtures.MOVIES}
+
+import itertools
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import books
+import database_setup
+import db_pool
+import movies
+import response_cache
+import tv_shows
+
+MODES = ("savepoint", "snapshot")
+
+_names = itertools.count(1)
+
+
+class Template:
+    """A schema (and optional seed data) built once per process, then copied in memory."""
+
+    def __init__(self, initialize, seed=None):
+        self.initialize = initialize
+        self.seed = seed
+        self._conn = None
+
+    def connection(self):
+        """The in-memory template, built on first use."""
+        if self._conn is None:
+            directory = tempfile.mkdtemp(prefix="fixture-")
+            path = os.path.join(directory, "template.db")
+            try:
+                self.initialize(path)
+                source = sqlite3.connect(path)
+                if self.seed is not None:
+                    self.seed(source)
+                    source.commit()
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+                source.backup(conn)
+                source.close()
+            finally:
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+                os.rmdir(directory)
+            self._conn = conn
+        return self._conn
+
+    def copy_to(self, conn):
+        self.connection().backup(conn)
+
+
+MOVIES = Template(database_setup.initialize_db)
+TV_SHOWS = Template(database_setup.initialize_tvshow_db)
+BOOKS = Template(database_setup.initialize_database)
+CATALOG = Template(database_setup.initialize_catalog)
+
+TEMPLATES = {movies: MOVIES, tv_shows: TV_SHOWS, books: BOOKS}
+
+
+class SavepointConnection(sqlite3.Connection):
+    """Connection whose transactions nest inside the running test's savepoint.
+
+    The code under test sees ordinary transactions: commit() keeps its changes for
+    the rest of the test, rollback() and uncommitted work returned to the pool undo
+    back to the last commit, and BEGIN / COMMIT statements map onto the same.
+    """
+
+    def begin_test(self):
+        super().execute("SAVEPOINT fixture_test")
+        super().execute("SAVEPOINT fixture_transaction")
+
+    def end_test(self):
+        super().execute("ROLLBACK TO fixture_test")
+        super().execute("RELEASE fixture_test")
+
+    def commit(self):
+        super().execute("RELEASE fixture_transaction")
+        super().execute("SAVEPOINT fixture_transaction")
+
+    def rollback(self):
+        super().execute("ROLLBACK TO fixture_transaction")
+
+    def execute(self, sql, parameters=()):
+        statement = sql.lstrip()[:8].upper()
+        if statement.startswith("BEGIN"):
+            return self.cursor()
+        if statement.startswith(("COMMIT", "END")):
+            self.commit()
+            return self.cursor()
+        return super().execute(sql, parameters)
+
+
+class Database:
+    """One data module's fixture database; lives for the whole process."""
+
+    def __init__(self, template, mode="savepoint"):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+        self.template = template
+        self.mode = mode
+        if mode == "savepoint":
+            self.target = self.connection = sqlite3.connect(
+                ":memory:", check_same_thread=False, isolation_level=None, factory=SavepointConnection)
+            template.copy_to(self.connection)
+        else:
+            self.target = f"file:fixture-{os.getpid()}-{next(_names)}?mode=memory&cache=shared"
+            # Keeps the shared in-memory database alive between tests
+            self.connection = sqlite3.connect(self.target, uri=True, check_same_thread=False)
+
+    def begin(self, name):
+        """Bind the database under `name` and start a test on it."""
+        if self.mode == "savepoint":
+            self.connection.begin_test()
+        else:
+            db_pool.close_all()  # pooled connections see the restored pages afresh
+            self.template.copy_to(self.connection)
+        db_pool.bind(name, self.target)
+
+    def end(self, name):
+        db_pool.unbind(name)
+        if self.mode == "savepoint":
+            self.connection.end_test()
+
+
+_databases = {}  # (template id, mode) -> Database, shared by every test in the process
+
+
+def _name(module):
+    return module if isinstance(module, str) else module.DATABASE
+
+
+def database(template, mode="savepoint"):
+    key = (id(template), mode)
+    if key not in _databases:
+        _databases[key] = Database(template, mode)
+    return _databases[key]
+
+
+class FixtureTestCase(unittest.TestCase):
+    """TestCase whose data modules run on fixture databases.
+
+    `fixtures` maps each data module (or a database name, such as the consolidated
+    catalog's) to its Template. The module's current DATABASE name is bound for the
+    duration of each test, and the response cache is cleared so no response outlives
+    the data it was built from.
+    """
+
+    fixtures = {}
+    mode = "savepoint"
+
+    def setUp(self):
+        super().setUp()
+        response_cache.backend.clear()
+        for module, template in self.fixtures.items():
+            fixture, name = database(template, self.mode), _name(module)
+            fixture.begin(name)
+            self.addCleanup(fixture.end, name)
+
+    def reset(self):
+        """Start the fixture databases over from their templates in the middle of a test."""
+        response_cache.backend.clear()
+        for module, template in self.fixtures.items():
+            fixture, name = database(template, self.mode), _name(module)
+            fixture.end(name)
+            fixture.begin(name)
+
+    def connection(self, module):
+        """A connection to a module's fixture database, for direct queries in assertions."""
+        fixture = database(self.fixtures[module], self.mode)
+        return fixture.connection
@@ -0,0 +1,86 @@
+# Unit tests for the in-memory test fixtures
+
+import unittest
+import books
+import db_pool
+import fixtures
+import movies
+import review_batch
+import review_queue
+from api import app
+
+def seed_movies(conn):
+    conn.execute("INSERT INTO movies (name, genre) VALUES ('Inception', 'Science Fiction')")
+    conn.execute("INSERT INTO reviews (movie_id, rating, note) VALUES (1, 5, 'Amazing')")
+
+SEEDED = fixtures.Template(fixtures.MOVIES.initialize, seed_movies)
+
+class TestSavepointFixtures(fixtures.FixtureTestCase):
+
+    fixtures = {movies: SEEDED, books: fixtures.BOOKS}
+
+    def test_tests_start_from_the_template(self):
+        """Testing that each test sees only the seed data and ids restart after rollback."""
+        fixture = fixtures.database(SEEDED)
+        for _ in range(2):
+            self.assertEqual(movies.view_reviews(reviews="count")[0]["review_count"], 1)
+            movies.add_movie("Memento", "Thriller")
+            movies.add_review(2, 4, "Clever")
+            self.assertEqual(movies.search_reviews(2)["reviews"][0]["review_id"], 2)
+            fixture.end(movies.DATABASE)
+            fixture.begin(movies.DATABASE)
+        self.assertEqual(len(movies.view_reviews()), 1)
+
+    def test_commit_and_rollback_inside_a_test(self):
+        """Testing that committed writes stay and uncommitted or failed ones are undone."""
+        with db_pool.connection(movies.DATABASE) as conn:
+            conn.execute("INSERT INTO movies (name, genre) VALUES ('Kept', 'Drama')")
+            conn.commit()
+            conn.execute("INSERT INTO movies (name, genre) VALUES ('Dropped', 'Drama')")
+        results = review_batch.submit([{"type": "movies", "title_id": 2, "rating": 3, "note": "Fine"},
+                                        {"type": "movies", "title_id": 99, "rating": 3, "note": "Lost"}],
+                                        atomic=True)
+        self.assertEqual(results["created"], 0)
+        self.assertEqual([m["name"] for m in movies.view_reviews()], ["Inception", "Kept"])
+        self.assertEqual(movies.search_reviews(2)["reviews"], [])
+
+    def test_api_and_review_writer_use_the_fixture(self):
+        """Testing that requests and the review writer thread reach the injected database."""
+        writer = review_queue.ReviewQueue()
+        self.addCleanup(writer.stop)
+        book_id = books.add_book("Dune", "Science Fiction")["book"]["id"]
+        self.assertEqual(writer.submit(books.repository, book_id, 5, "Classic"), 1)
+        client = app.test_client()
+        self.assertEqual(len(client.get(f'/books/{book_id}').get_json()["reviews"]), 1)
+        self.assertEqual(client.post('/movies/1/reviews', json={"rating": 4, "note": "Again"}).status_code, 201)
+        self.assertEqual(self.connection(movies).execute("SELECT COUNT(*) FROM reviews").fetchone()[0], 2)
+        self.assertFalse({movies.DATABASE, books.DATABASE} & set(db_pool.pool_stats()))  # no file was opened
+
+    def test_reset_mid_test(self):
+        """Testing that reset() puts every fixture database back to its template."""
+        movies.add_movie("Memento", "Thriller")
+        books.add_book("Dune", "Science Fiction")
+        self.reset()
+        self.assertEqual([m["name"] for m in movies.view_reviews()], ["Inception"])
+        self.assertEqual(books.view_books(), [])
+
+class TestSnapshotFixtures(fixtures.FixtureTestCase):
+
+    fixtures = {movies: SEEDED}
+    mode = "snapshot"
+
+    def test_pooled_connections_share_the_snapshot(self):
+        """Testing separate pooled connections on the snapshot, restored for the next test."""
+        fixture = fixtures.database(SEEDED, "snapshot")
+        for _ in range(2):
+            with db_pool.connection(movies.DATABASE) as first, db_pool.connection(movies.DATABASE) as second:
+                self.assertIsNot(first, second)
+                first.execute("INSERT INTO movies (name, genre) VALUES ('Memento', 'Thriller')")
+                first.commit()
+                self.assertEqual(second.execute("SELECT COUNT(*) FROM movies").fetchone()[0], 2)
+            fixture.end(movies.DATABASE)
+            fixture.begin(movies.DATABASE)
+            self.assertEqual([m["name"] for m in movies.view_reviews()], ["Inception"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# Data behind the Home Page tab of app.py.
+#
+# The tab used to query the database while the gr.Blocks tree was being built, so startup
+# needed the database and the page showed whatever was true at import time. Now each
+# widget is filled by a load event (and a timer) from this module's cache: every section
+# is fetched through the frontend's API client at most once per REFRESH_SECONDS, however
+# many browsers are open, and concurrent viewers of a stale section share one fetch.
+# Sections are yielded as they arrive so the page fills in piece by piece.
+
+import asyncio
+import os
+import time
+
+import api_client
+
+# How often the home page data is refreshed (HOME_REFRESH_SECONDS); also the timer interval
+REFRESH_SECONDS = float(os.environ.get("HOME_REFRESH_SECONDS", 60))
+
+LOADING = "⏳ Loading..."
+
+
+async def _movie_genres(api):
+    genres = (await api.get("/movies/genres")).json()
+    return ", ".join(genres) if genres else "No genres available"
+
+
+async def _top_movies(api):
+    movie = (await api.get("/movies/top", params={"limit": 3})).json()
+    return ", ".join(m["name"] for m in movie) if movie else "No movies available"
+
+
+# section name -> coroutine function rendering it from the API, in display order
+SECTIONS = {
+    "movie_genres": _movie_genres,
+    "top_movies": _top_movies,
+}
+
+
+class HomePageCache:
+    """Rendered home page sections with a refresh interval and one in-flight fetch each."""
+
+    def __init__(self, api, refresh_seconds=REFRESH_SECONDS, sections=SECTIONS):
+        self.api = api
+        self.refresh_seconds = refresh_seconds
+        self.sections = sections
+        self._values = {}  # name -> (rendered text, monotonic fetch time)
+        self._inflight = {}  # name -> asyncio.Task
+        self.fetches = 0
+
+    def _fresh(self, name):
+        entry = self._values.get(name)
+        return entry is not None and time.monotonic() - entry[1] < self.refresh_seconds
+
+    async def _fetch(self, name):
+        self.fetches += 1
+        try:
+            text = await self.sections[name](self.api)
+        except (api_client.ApiError, ValueError) as e:
+            if name in self._values:
+                return self._values[name][0]  # keep showing the last good value
+            return f"❌ Error: Failed to load from the API - {str(e)}"
+        self._values[name] = (text, time.monotonic())
+        return text
+
+    async def section(self, name):
+        if self._fresh(name):
+            return self._values[name][0]
+        task = self._inflight.get(name)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._inflight[name] = asyncio.ensure_future(self._fetch(name))
+        return await asyncio.shield(task)
+
+    async def render(self):
+        """Yield the list of section texts each time another section becomes available."""
+        names = list(self.sections)
+        texts = [self._values[name][0] if name in self._values else LOADING for name in names]
+        if LOADING in texts:
+            yield list(texts)
+
+        async def labelled(index, name):
+            return index, await self.section(name)
+
+        for next_done in asyncio.as_completed([labelled(index, name) for index, name in enumerate(names)]):
+            index, text = await next_done
+            texts[index] = text
+            yield list(texts)
@@ -0,0 +1,67 @@
+# Unit tests for the home page's cached sections
+
+import asyncio
+import unittest
+import api_client
+import fixtures
+import home_page
+import movies
+from api import app
+
+class FailingApi:
+    async def get(self, path, params=None):
+        raise api_client.ApiConnectionError("connection refused")
+
+class TestHomePage(fixtures.FixtureTestCase):
+
+    fixtures = {movies: fixtures.MOVIES}
+
+    def setUp(self):
+        super().setUp()
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_review(1, 5, "Amazing")
+        self.api = api_client.AsyncInProcessClient(app)
+
+    def collect(self, cache):
+        async def scenario():
+            return [texts async for texts in cache.render()]
+        return asyncio.run(scenario())
+
+    def test_sections_render_incrementally_then_come_from_cache(self):
+        """Testing that the first render starts with placeholders and later ones reuse the cache."""
+        cache = home_page.HomePageCache(self.api, refresh_seconds=60)
+        renders = self.collect(cache)
+        self.assertEqual(renders[0], [home_page.LOADING, home_page.LOADING])
+        self.assertEqual(renders[-1], ["Science Fiction", "Inception"])
+        self.assertEqual(len(renders), 3)
+        movies.add_movie("Memento", "Thriller")
+        self.assertEqual(self.collect(cache)[-1], ["Science Fiction", "Inception"])
+        self.assertEqual(cache.fetches, 2)
+
+        cache.refresh_seconds = 0
+        self.assertEqual(self.collect(cache)[-1][0], "Science Fiction, Thriller")
+
+    def test_concurrent_viewers_share_one_fetch(self):
+        """Testing that simultaneous page loads trigger a single fetch per section."""
+        cache = home_page.HomePageCache(self.api, refresh_seconds=60)
+
+        async def viewer():
+            return [texts async for texts in cache.render()][-1]
+
+        async def scenario():
+            return await asyncio.gather(*(viewer() for _ in range(20)))
+
+        self.assertTrue(all(texts == ["Science Fiction", "Inception"] for texts in asyncio.run(scenario())))
+        self.assertEqual(cache.fetches, 2)
+
+    def test_api_errors_keep_last_good_value(self):
+        """Testing that a failed refresh shows the previous data, or an error before any data."""
+        cache = home_page.HomePageCache(FailingApi(), refresh_seconds=0)
+        self.assertTrue(self.collect(cache)[-1][0].startswith("❌ Error"))
+        cache.api = self.api
+        self.collect(cache)
+        cache.api = FailingApi()
+        self.assertEqual(self.collect(cache)[-1], ["Science Fiction", "Inception"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# JSON encoding for the API, with a choice of serializer backend.
+#
+# api.py installs JSONProvider as app.json, so jsonify, request.get_json and the response
+# cache all go through the backend named by JSON_BACKEND:
+#   stdlib  the json module, byte-for-byte what Flask produced before
+#   orjson  the orjson package (optional), several times faster on large bodies
+# Both sort keys and use compact separators, so for ASCII data the bodies (and ETags) are
+# identical; stdlib escapes non-ASCII text while orjson writes it as UTF-8.
+#
+# The list endpoints skip Python objects altogether where they can: when SQLITE_JSON is
+# true MediaRepository builds each listed title as JSON text in SQL (json_object /
+# json_group_array) and api.py only joins the pieces, which avoids creating a tuple per
+# row and a dict per title and review. The keys come out in the same sorted order; the
+# one difference is that SQLite prints floats with 15 significant digits.
+
+import json
+import os
+import sqlite3
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # only the orjson backend needs it
+    orjson = None
+
+
+class StdlibBackend:
+    """The json module with Flask's defaults."""
+
+    name = "stdlib"
+
+    def __init__(self, default):
+        self._compact = json.JSONEncoder(default=default, sort_keys=True, separators=(",", ":"))
+        self._pretty = json.JSONEncoder(default=default, sort_keys=True, indent=2)
+
+    def encode(self, obj, pretty=False):
+        return (self._pretty if pretty else self._compact).encode(obj).encode("utf-8")
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend:
+    """orjson, with dates and non-string keys handled the way Flask's encoder does."""
+
+    name = "orjson"
+
+    def __init__(self, default):
+        if orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson needs the orjson package")
+        self._default = default
+        self._options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def encode(self, obj, pretty=False):
+        options = self._options | orjson.OPT_INDENT_2 if pretty else self._options
+        return orjson.dumps(obj, default=self._default, option=options)
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+
+BACKENDS = {
+    "stdlib": StdlibBackend,
+    "orjson": OrjsonBackend,
+}
+
+BACKEND = os.environ.get("JSON_BACKEND", "orjson" if orjson is not None else "stdlib")
+
+
+def _sqlite_has_json():
+    try:
+        sqlite3.connect(":memory:").execute("SELECT json_object('a', 1)").close()
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+# Whether this SQLite build has the JSON functions used to encode rows in SQL
+SQLITE_JSON = _sqlite_has_json()
+
+
+def make_backend(name, default=DefaultJSONProvider.default):
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend must be one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](default)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with the app's JSON_BACKEND.
+
+    Calls that pass json.dumps / json.loads options fall back to Flask's own encoder.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = make_backend(app.config.get("JSON_BACKEND", BACKEND), self.default)
+
+    def encode(self, obj):
+        """Compact bytes for obj, as jsonify would send them without the trailing newline."""
+        return self.backend.encode(obj)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.backend.encode(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self.backend.decode(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.backend.encode(obj, pretty) + b"\n", mimetype=self.mimetype)
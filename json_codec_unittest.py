@@ -0,0 +1,65 @@
+# Unit tests for the JSON serializer backends and the SQL-encoded listings
+
+import itertools
+import json
+import unittest
+from unittest import mock
+import fixtures
+import json_codec
+import pagination
+import response_cache
+from api import app
+
+SAMPLE = {"name": "Inception", "id": 1, "reviews": [{"rating": 4.5, "note": None, "review_id": 2}], "ok": True}
+
+class TestJsonCodec(fixtures.FixtureTestCase):
+
+    fixtures = fixtures.TEMPLATES
+
+    def setUp(self):
+        """Creating titles with and without reviews for all three media types."""
+        super().setUp()
+        for module in self.fixtures:
+            module.repository.add_titles([("Dune", "Science Fiction"), ("Heat", "Crime"), ("Amélie", "Comedy")])
+            module.repository.add_reviews([(1, 5, "Vast"), (1, 4.5, 'Sand, "spice"'), (3, 3, "Charmant é")])
+        self.client = app.test_client()
+
+    def test_backends_match_flask_encoding(self):
+        """Testing that stdlib matches Flask's own encoder and every backend agrees on ASCII data."""
+        expected = json.dumps(SAMPLE, sort_keys=True, separators=(",", ":")).encode()
+        for name in json_codec.BACKENDS:
+            if name == "orjson" and json_codec.orjson is None:
+                continue
+            backend = json_codec.make_backend(name)
+            self.assertEqual(backend.encode(SAMPLE), expected, name)
+            self.assertEqual(backend.decode(backend.encode({"note": "Amélie"})), {"note": "Amélie"})
+        with self.assertRaises(ValueError):
+            json_codec.make_backend("yaml")
+
+    def test_sql_encoded_titles_match_python(self):
+        """Testing that titles encoded by SQLite decode to the dicts list_titles builds."""
+        if not json_codec.SQLITE_JSON:
+            self.skipTest("SQLite JSON functions are not available")
+        for module in self.fixtures:
+            repository = module.repository
+            for reviews, fields in itertools.product(pagination.REVIEW_MODES, (None, ["id"], ["reviews", "review_count"])):
+                for after_id, limit in ((None, None), (1, 1)):
+                    encoded = list(repository.iter_titles_json(after_id, limit, reviews, fields))
+                    titles = repository.list_titles(after_id, limit, reviews)
+                    self.assertEqual([title_id for title_id, _ in encoded], [title["id"] for title in titles])
+                    self.assertEqual([json.loads(text) for _, text in encoded],
+                                     [pagination.project(title, fields) for title in titles])
+
+    def test_list_body_same_with_and_without_sql_encoding(self):
+        """Testing that GET /movies sends the same JSON and cursor whichever way titles are encoded."""
+        for query in ('/movies', '/movies?limit=2&reviews=count', '/books?fields=id,reviews'):
+            response_cache.backend.clear()
+            encoded = self.client.get(query)
+            response_cache.backend.clear()
+            with mock.patch.object(json_codec, "SQLITE_JSON", False):
+                built = self.client.get(query)
+            self.assertEqual(encoded.get_json(), built.get_json())
+            self.assertEqual(encoded.headers.get("X-Next-After-Id"), built.headers.get("X-Next-After-Id"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,417 @@
+# Generic data access for one media type (movies, TV shows, books).
+#
+# Every media type has the same shape: a titles table (id, <title column>, genre) and a
+# reviews table (id, <foreign key>, rating, note), with the rating_stats aggregate and
+# search indexes from database_setup. MediaRepository holds the CRUD and listing logic
+# once; movies.py, tv_shows.py and books.py keep their public functions and response
+# messages and delegate here.
+#
+# Two storage layouts are supported (DB_LAYOUT):
+#   separate      one database file per media type (movie_reviews.db, ...), the default
+#   consolidated  one file (CONSOLIDATED_DATABASE) with a shared catalog and reviews
+#                 table; movies/tv_shows/books are views over catalog, so reads use the
+#                 same SQL and only writes and top-rated name the shared tables.
+#
+# All SQL for a repository is built once in __init__ and always executed with the same
+# text, so sqlite3's per-connection statement cache reuses the compiled statements
+# across calls on a pooled connection. The JSON listing statements (iter_titles_json)
+# depend on the requested fields and are built on first use, then kept.
+
+import os
+
+import db_pool
+import response_cache
+
+LAYOUTS = ("separate", "consolidated")
+LAYOUT = os.environ.get("DB_LAYOUT", "separate")
+CONSOLIDATED_DATABASE = os.environ.get("CONSOLIDATED_DATABASE", "media_reviews.db")
+
+# media name -> MediaRepository, filled as the data modules are imported
+REPOSITORIES = {}
+
+# Rows fetched from the cursor at a time by iter_titles
+STREAM_BATCH = 1000
+
+
+def get(media):
+    return REPOSITORIES[media]
+
+
+def database_file(separate_file):
+    """The database a data module should use under the configured layout."""
+    return CONSOLIDATED_DATABASE if LAYOUT == "consolidated" else separate_file
+
+
+class MediaRepository:
+    """CRUD, listing and top-rated queries for one media type.
+
+    `database` is called on every operation so tests and tools can repoint the owning
+    module's DATABASE global at any time. `review_counter` names a titles column kept
+    as a running review count (books.reviews_count).
+    """
+
+    def __init__(self, media, table, title_column, title_fk, database, review_counter=None,
+                 layout=None, register=True):
+        self.layout = layout or LAYOUT
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"layout must be one of: {', '.join(LAYOUTS)}")
+        if self.layout == "consolidated":
+            title_fk = "title_id"
+        self.media = media
+        self.table = table
+        self.title_column = title_column
+        self.title_fk = title_fk
+        self.database = database
+        self.review_counter = review_counter
+
+        t, col, fk = table, title_column, title_fk
+        page = f'SELECT id, {col}, genre FROM {t} WHERE id > ? ORDER BY id LIMIT ?'
+        top = f'''
+            SELECT {t}.id, {t}.{col}, {t}.genre, rating_stats.review_count, rating_stats.mean, rating_stats.score
+            FROM rating_stats JOIN {t} ON {t}.id = rating_stats.title_id
+            WHERE rating_stats.review_count > 0 {{}}
+            ORDER BY rating_stats.score DESC LIMIT ?
+        '''
+        self.sql = {
+            "insert_title": f'INSERT INTO {t} ({col}, genre) VALUES (?, ?)',
+            "insert_review": f'INSERT INTO reviews ({fk}, rating, note) VALUES (?, ?, ?)',
+            "count_review": f'UPDATE {t} SET {review_counter} = {review_counter} + ? WHERE id = ?' if review_counter else None,
+            "update_rating": f'UPDATE reviews SET rating = ? WHERE id = ? AND {fk} = ?',
+            "update_note": f'UPDATE reviews SET note = ? WHERE id = ? AND {fk} = ?',
+            "update_review": f'UPDATE reviews SET rating = ?, note = ? WHERE id = ? AND {fk} = ?',
+            "delete_review": f'DELETE FROM reviews WHERE id = ? AND {fk} = ?',
+            "delete_title_reviews": f'DELETE FROM reviews WHERE {fk} = ?',
+            "delete_title": f'DELETE FROM {t} WHERE id = ?',
+            "get_title": f'SELECT id, {col}, genre FROM {t} WHERE id = ?',
+            "title_reviews": f'SELECT id, rating, note FROM reviews WHERE {fk} = ? ORDER BY id',
+            "by_genre": f'SELECT id, {col}, genre FROM {t} WHERE genre = ?',
+            "by_genre_like": f'SELECT id, {col}, genre FROM {t} WHERE LOWER(genre) LIKE ?',
+            "genres": f'SELECT DISTINCT genre FROM {t}',
+            "page": page,
+            "page_counts": f'''
+                SELECT page.id, page.{col}, page.genre,
+                       (SELECT COUNT(*) FROM reviews WHERE reviews.{fk} = page.id)
+                FROM ({page}) AS page
+                ORDER BY page.id
+            ''',
+            "page_reviews": f'''
+                SELECT page.id, page.{col}, page.genre, reviews.id, reviews.rating, reviews.note
+                FROM ({page}) AS page LEFT JOIN reviews ON reviews.{fk} = page.id
+                ORDER BY page.id, reviews.id
+            ''',
+            "page_end": f'SELECT id FROM {t} WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?',
+            # Unbounded scans for iter_titles: both orderings come straight off the primary
+            # key and the reviews foreign key index, so SQLite never builds a temp B-tree
+            "scan_counts": f'''
+                SELECT {t}.id, {t}.{col}, {t}.genre, (SELECT COUNT(*) FROM reviews WHERE reviews.{fk} = {t}.id)
+                FROM {t} WHERE {t}.id > ? ORDER BY {t}.id
+            ''',
+            "scan_reviews": f'''
+                SELECT {t}.id, {t}.{col}, {t}.genre, reviews.id, reviews.rating, reviews.note
+                FROM {t} LEFT JOIN reviews ON reviews.{fk} = {t}.id
+                WHERE {t}.id > ? ORDER BY {t}.id, reviews.id
+            ''',
+            "top": top.format(''),
+            "top_genre": top.format('AND rating_stats.genre = ?'),
+        }
+        if self.layout == "consolidated":
+            self.sql.update(self._consolidated_sql())
+        # Listed keys -> SQL for their JSON value, per ?reviews= mode; see iter_titles_json
+        title_json = {"id": f"{t}.id", col: f"{t}.{col}", "genre": f"{t}.genre"}
+        self._json_values = {
+            "none": title_json,
+            "count": dict(title_json, review_count=f"(SELECT COUNT(*) FROM reviews WHERE reviews.{fk} = {t}.id)"),
+            "full": dict(title_json, reviews=f'''json((
+                SELECT json_group_array(json_object('note', note, 'rating', rating, 'review_id', id))
+                FROM (SELECT id, rating, note FROM reviews WHERE reviews.{fk} = {t}.id ORDER BY id)))'''),
+        }
+        self._json_sql = {}
+        if register:
+            REPOSITORIES[media] = self
+
+    def _consolidated_sql(self):
+        """Write and top-rated statements against the shared catalog/reviews tables.
+
+        Title and review ids are unique across media types there, so every write also
+        checks the title belongs to this media type.
+        """
+        media, t, col = self.media, self.table, self.title_column
+        owned = f"EXISTS (SELECT 1 FROM catalog WHERE catalog.id = reviews.title_id AND catalog.media = '{media}')"
+        top = f'''
+            SELECT {t}.id, {t}.{col}, {t}.genre, rating_stats.review_count, rating_stats.mean, rating_stats.score
+            FROM rating_stats JOIN {t} ON {t}.id = rating_stats.title_id
+            WHERE rating_stats.media = '{media}' AND rating_stats.review_count > 0 {{}}
+            ORDER BY rating_stats.score DESC LIMIT ?
+        '''
+        return {
+            "insert_title": f"INSERT INTO catalog (media, title, genre) VALUES ('{media}', ?, ?)",
+            "insert_review": f'''INSERT INTO reviews (title_id, rating, note) SELECT ?1, ?2, ?3
+                WHERE EXISTS (SELECT 1 FROM catalog WHERE id = ?1 AND media = '{media}')''',
+            "count_review": f"UPDATE catalog SET reviews_count = reviews_count + ? WHERE id = ? AND media = '{media}'"
+                            if self.review_counter else None,
+            "update_rating": f'UPDATE reviews SET rating = ? WHERE id = ? AND title_id = ? AND {owned}',
+            "update_note": f'UPDATE reviews SET note = ? WHERE id = ? AND title_id = ? AND {owned}',
+            "update_review": f'UPDATE reviews SET rating = ?, note = ? WHERE id = ? AND title_id = ? AND {owned}',
+            "delete_review": f'DELETE FROM reviews WHERE id = ? AND title_id = ? AND {owned}',
+            "delete_title_reviews": f'DELETE FROM reviews WHERE title_id = ? AND {owned}',
+            "delete_title": f"DELETE FROM catalog WHERE id = ? AND media = '{media}'",
+            "top": top.format(''),
+            "top_genre": top.format('AND rating_stats.genre = ?'),
+        }
+
+    def _title(self, row):
+        return {"id": row[0], self.title_column: row[1], "genre": row[2]}
+
+    # Writes
+
+    def add_title(self, title, genre):
+        """Insert one title and return its id."""
+        with db_pool.connection(self.database()) as conn:
+            cursor = conn.execute(self.sql["insert_title"], (title, genre))
+            conn.commit()
+        response_cache.title_added(self.media, cursor.lastrowid, genre)
+        return cursor.lastrowid
+
+    def add_titles(self, titles):
+        """Insert (title, genre) pairs in one transaction and return how many were added."""
+        titles = list(titles)
+        with db_pool.connection(self.database()) as conn:
+            conn.executemany(self.sql["insert_title"], titles)
+            conn.commit()
+        response_cache.media_changed(self.media)
+        return len(titles)
+
+    def add_review(self, title_id, rating, note):
+        """Insert one review and return its id (None if the consolidated layout rejected it)."""
+        with db_pool.connection(self.database()) as conn:
+            cursor = conn.execute(self.sql["insert_review"], (title_id, rating, note))
+            review_id = cursor.lastrowid if cursor.rowcount else None
+            if self.review_counter and review_id is not None:
+                conn.execute(self.sql["count_review"], (1, title_id))
+            conn.commit()
+        response_cache.reviews_changed(self.media, title_id)
+        return review_id
+
+    def add_reviews(self, reviews):
+        """Insert (title_id, rating, note) rows in one transaction and return how many were added."""
+        reviews = list(reviews)
+        with db_pool.connection(self.database()) as conn:
+            if self.layout == "consolidated":
+                # The conditional insert skips ids of other media types; drop them up front,
+                # in the same write transaction, so the counters only see inserted rows
+                conn.execute('BEGIN IMMEDIATE')
+                owned = self.existing_ids(conn, [title_id for title_id, _, _ in reviews])
+                reviews = [review for review in reviews if review[0] in owned]
+            per_title = {}
+            for title_id, _, _ in reviews:
+                per_title[title_id] = per_title.get(title_id, 0) + 1
+            inserted = conn.executemany(self.sql["insert_review"], reviews).rowcount if reviews else 0
+            if self.review_counter:
+                conn.executemany(self.sql["count_review"], [(n, title_id) for title_id, n in per_title.items()])
+            conn.commit()
+        for title_id in per_title:
+            response_cache.reviews_changed(self.media, title_id)
+        return inserted
+
+    def insert_reviews(self, conn, reviews):
+        """Insert (title_id, rating, note) rows on `conn` without committing.
+
+        Returns the new review ids in order (None where the consolidated layout rejected
+        the row). The caller owns the transaction and the cache invalidation.
+        """
+        review_ids = []
+        per_title = {}
+        for title_id, rating, note in reviews:
+            cursor = conn.execute(self.sql["insert_review"], (title_id, rating, note))
+            review_ids.append(cursor.lastrowid if cursor.rowcount else None)
+            if cursor.rowcount:
+                per_title[title_id] = per_title.get(title_id, 0) + 1
+        if self.review_counter:
+            conn.executemany(self.sql["count_review"], [(n, title_id) for title_id, n in per_title.items()])
+        return review_ids
+
+    def existing_ids(self, conn, title_ids):
+        """The subset of title_ids that exist for this media type."""
+        wanted = sorted(set(title_ids))
+        existing = set()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(wanted), 900):
+            chunk = wanted[start:start + 900]
+            placeholders = ", ".join("?" * len(chunk))
+            existing.update(row[0] for row in conn.execute(
+                f'SELECT id FROM {self.table} WHERE id IN ({placeholders})', chunk))
+        return existing
+
+    def edit_review(self, title_id, review_id, rating=None, note=None):
+        """Update whichever of rating and note is not None. Returns the number of rows changed."""
+        if rating is not None and note is not None:
+            statement, params = self.sql["update_review"], (rating, note, review_id, title_id)
+        elif rating is not None:
+            statement, params = self.sql["update_rating"], (rating, review_id, title_id)
+        elif note is not None:
+            statement, params = self.sql["update_note"], (note, review_id, title_id)
+        else:
+            return 0
+        with db_pool.connection(self.database()) as conn:
+            changed = conn.execute(statement, params).rowcount
+            conn.commit()
+        response_cache.reviews_changed(self.media, title_id)
+        return changed
+
+    def delete_review(self, title_id, review_id):
+        with db_pool.connection(self.database()) as conn:
+            deleted = conn.execute(self.sql["delete_review"], (review_id, title_id)).rowcount
+            conn.commit()
+        response_cache.reviews_changed(self.media, title_id)
+        return deleted
+
+    def delete_title(self, title_id):
+        """Delete a title and its reviews in one transaction. Returns True if the title existed."""
+        with db_pool.connection(self.database()) as conn:
+            conn.execute(self.sql["delete_title_reviews"], (title_id,))
+            deleted = conn.execute(self.sql["delete_title"], (title_id,)).rowcount
+            conn.commit()
+        response_cache.title_deleted(self.media, title_id)
+        return deleted > 0
+
+    # Reads
+
+    def get_title(self, title_id, with_reviews=True):
+        """One title with its reviews, or None if it does not exist."""
+        with db_pool.connection(self.database()) as conn:
+            row = conn.execute(self.sql["get_title"], (title_id,)).fetchone()
+            if row is None:
+                return None
+            title = self._title(row)
+            if with_reviews:
+                title["reviews"] = [
+                    {"review_id": r[0], "rating": r[1], "note": r[2]}
+                    for r in conn.execute(self.sql["title_reviews"], (title_id,))
+                ]
+        return title
+
+    def list_titles(self, after_id=None, limit=None, reviews="full"):
+        """Keyset page of titles with id > after_id, at most `limit` of them.
+
+        reviews="full" embeds reviews via one LEFT JOIN, "count" adds review_count,
+        "none" skips them.
+        """
+        params = (after_id or 0, limit if limit is not None else -1)
+        col = self.title_column
+        with db_pool.connection(self.database()) as conn:
+            if reviews == "none":
+                return [self._title(row) for row in conn.execute(self.sql["page"], params)]
+            if reviews == "count":
+                return [
+                    {"id": row[0], col: row[1], "genre": row[2], "review_count": row[3]}
+                    for row in conn.execute(self.sql["page_counts"], params)
+                ]
+            rows = conn.execute(self.sql["page_reviews"], params).fetchall()
+        return list(self._group_reviews(rows))
+
+    def _group_reviews(self, rows):
+        """Fold (title..., review...) join rows, ordered by title id, into titles with reviews."""
+        col = self.title_column
+        title = None
+        for row in rows:
+            if title is None or title["id"] != row[0]:
+                if title is not None:
+                    yield title
+                title = {"id": row[0], col: row[1], "genre": row[2], "reviews": []}
+            if row[3] is not None:
+                title["reviews"].append({"review_id": row[3], "rating": row[4], "note": row[5]})
+        if title is not None:
+            yield title
+
+    def iter_titles(self, after_id=None, limit=None, reviews="full"):
+        """Generator over the same titles as list_titles, walking one server-side cursor.
+
+        Without a limit the whole catalog is scanned in id order with at most STREAM_BATCH
+        rows in memory. The pooled connection, and the read snapshot it sees, is held
+        until the generator is exhausted or closed.
+        """
+        col = self.title_column
+        if limit is not None or reviews == "none":
+            statement = {"none": "page", "count": "page_counts", "full": "page_reviews"}[reviews]
+            params = (after_id or 0, limit if limit is not None else -1)
+        else:
+            statement = {"count": "scan_counts", "full": "scan_reviews"}[reviews]
+            params = (after_id or 0,)
+        with db_pool.connection(self.database()) as conn:
+            cursor = conn.execute(self.sql[statement], params)
+            try:
+                rows = iter(lambda: cursor.fetchmany(STREAM_BATCH), [])
+                rows = (row for batch in rows for row in batch)
+                if reviews == "none":
+                    for row in rows:
+                        yield self._title(row)
+                elif reviews == "count":
+                    for row in rows:
+                        yield {"id": row[0], col: row[1], "genre": row[2], "review_count": row[3]}
+                else:
+                    yield from self._group_reviews(rows)
+            finally:
+                cursor.close()
+
+    def _titles_json_sql(self, reviews, fields):
+        key = (reviews, fields)
+        statement = self._json_sql.get(key)
+        if statement is None:
+            values = self._json_values[reviews]
+            # Keys in sorted order, as the JSON backends write them
+            pairs = ", ".join(f"'{name}', {values[name]}" for name in sorted(values)
+                              if fields is None or name in fields)
+            t = self.table
+            statement = self._json_sql[key] = (
+                f'SELECT {t}.id, json_object({pairs}) FROM {t} WHERE {t}.id > ? ORDER BY {t}.id LIMIT ?')
+        return statement
+
+    def iter_titles_json(self, after_id=None, limit=None, reviews="full", fields=None):
+        """Generator of (id, JSON text) for the titles list_titles would return.
+
+        SQLite encodes each title (projected to `fields`, with its reviews or review count)
+        so no row tuple or dict is built per review. Needs the SQLite JSON functions
+        (json_codec.SQLITE_JSON). Like iter_titles, holds one connection until exhausted.
+        """
+        if fields is not None:
+            fields = frozenset(fields)
+        statement = self._titles_json_sql(reviews, fields)
+        with db_pool.connection(self.database()) as conn:
+            cursor = conn.execute(statement, (after_id or 0, limit if limit is not None else -1))
+            try:
+                for batch in iter(lambda: cursor.fetchmany(STREAM_BATCH), []):
+                    yield from batch
+            finally:
+                cursor.close()
+
+    def page_end(self, after_id, limit):
+        """Id of the last title on the page after `after_id`, or None if the page is short."""
+        with db_pool.connection(self.database()) as conn:
+            row = conn.execute(self.sql["page_end"], (after_id or 0, limit - 1)).fetchone()
+        return row[0] if row else None
+
+    def titles_by_genre(self, genre, partial=False):
+        """Titles whose genre equals `genre`, or contains it case-insensitively if partial."""
+        if partial:
+            statement, params = self.sql["by_genre_like"], (f"%{genre.lower()}%",)
+        else:
+            statement, params = self.sql["by_genre"], (genre,)
+        with db_pool.connection(self.database()) as conn:
+            return [self._title(row) for row in conn.execute(statement, params)]
+
+    def genres(self):
+        with db_pool.connection(self.database()) as conn:
+            return [row[0] for row in conn.execute(self.sql["genres"])]
+
+    def top_rated(self, limit=3, genre=None):
+        """Best-rated titles by Bayesian score, read from the rating_stats aggregate that
+        database_setup keeps current with triggers; walks the score (or genre, score) index."""
+        with db_pool.connection(self.database()) as conn:
+            if genre:
+                rows = conn.execute(self.sql["top_genre"], (genre, limit)).fetchall()
+            else:
+                rows = conn.execute(self.sql["top"], (limit,)).fetchall()
+        return [
+            {"id": r[0], self.title_column: r[1], "genre": r[2], "review_count": r[3], "mean": r[4], "score": r[5]}
+            for r in rows
+        ]
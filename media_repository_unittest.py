@@ -0,0 +1,67 @@
+# Unit tests for the shared media repository
+
+import unittest
+import books
+import db_pool
+import fixtures
+import media_repository
+import movies
+from api import app
+
+class TestMediaRepository(fixtures.FixtureTestCase):
+
+    # Migrated databases for all three media types
+    fixtures = fixtures.TEMPLATES
+
+    def test_same_operations_for_every_media_type(self):
+        """Testing that each repository runs the same CRUD cycle against its own tables."""
+        for module in self.fixtures:
+            repository = media_repository.get(module.repository.media)
+            title_id = repository.add_title("Dune", "Science Fiction")
+            review_id = repository.add_review(title_id, 4, "Vast")
+            self.assertEqual(repository.edit_review(title_id, review_id, rating=5), 1)
+            title = repository.get_title(title_id)
+            self.assertEqual(title[repository.title_column], "Dune")
+            self.assertEqual(title["reviews"], [{"review_id": review_id, "rating": 5, "note": "Vast"}])
+            self.assertEqual(repository.top_rated(genre="Science Fiction")[0]["id"], title_id)
+            self.assertTrue(repository.delete_title(title_id))
+            self.assertIsNone(repository.get_title(title_id))
+            self.assertFalse(repository.delete_title(title_id))
+
+    def test_batched_writes(self):
+        """Testing that add_titles/add_reviews insert everything in one call and keep book counters."""
+        repository = books.repository
+        self.assertEqual(repository.add_titles([("Dune", "Science Fiction"), ("Emma", "Romance")]), 2)
+        self.assertEqual(repository.add_reviews([(1, 5, "Vast"), (1, 4, "Long"), (2, 3, "Witty")]), 3)
+        self.assertEqual([b["review_count"] for b in repository.list_titles(reviews="count")], [2, 1])
+        with db_pool.connection(books.DATABASE) as conn:
+            counts = conn.execute('SELECT reviews_count FROM books ORDER BY id').fetchall()
+        self.assertEqual(counts, [(2,), (1,)])
+
+    def test_iter_titles_matches_list_titles(self):
+        """Testing that the streaming generator yields exactly the listed pages in every mode."""
+        repository = movies.repository
+        repository.add_titles([("Inception", "Science Fiction"), ("Memento", "Thriller"), ("Heat", "Crime")])
+        repository.add_reviews([(1, 5, "Amazing"), (3, 4, "Tense"), (1, 4, "Again")])
+        for reviews in ("full", "count", "none"):
+            for after_id, limit in ((None, None), (1, None), (None, 2), (2, 5)):
+                self.assertEqual(list(repository.iter_titles(after_id, limit, reviews)),
+                                 repository.list_titles(after_id, limit, reviews))
+        self.assertEqual(repository.page_end(None, 2), 2)
+        self.assertIsNone(repository.page_end(2, 2))
+
+    def test_books_routes(self):
+        """Testing the book routes that now go through the repository."""
+        client = app.test_client()
+        self.assertEqual(client.post('/books', json={"title": "Dune"}).status_code, 201)
+        books.add_book("Emma", "Romance")
+        self.assertEqual(client.get('/books/1').get_json()["title"], "Dune")
+        self.assertEqual(client.get('/books/9').status_code, 404)
+        self.assertEqual([b["title"] for b in client.get('/books/genre?genre=roman').get_json()], ["Emma"])
+        self.assertEqual(client.get('/books/genre?genre=roman').headers["X-Cache"], "HIT")
+        books.add_book("Ivanhoe", "Historical Romance")
+        response = client.get('/books/genre?genre=roman')
+        self.assertEqual((response.headers["X-Cache"], len(response.get_json())), ("MISS", 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,320 @@
+# Request and SQL metrics for api.py, exposed in the Prometheus text format on GET /metrics.
+#
+# Recorded per route (the URL rule, e.g. /movies/<int:movie_id>/reviews) and method:
+#   api_requests_total{status}          requests by status code
+#   api_request_duration_seconds        latency histogram
+#   api_request_sql_queries             statements run per request (N+1 regressions show here)
+#   api_request_sql_seconds             time spent in SQLite per request
+# and per data function, i.e. the MediaRepository method and media type that ran the
+# statement ("movies.list_titles", "books.add_review") or the search / catalog /
+# review_batch / bulk_import / review_queue / db_pool function:
+#   sql_queries_total, sql_seconds_total
+#
+# SQL is counted by the Connection / Cursor classes db_pool opens when METRICS is on; the
+# function is found by walking a few stack frames, with the result cached per code
+# object. Statement time is measured around execute and the fetch* calls; rows read by
+# iterating a cursor directly are not timed. Reviews inserted by the review_queue writer
+# thread count under its functions, not under the request that queued them. Statements
+# are tallied in a per-thread dict and merged into the registry under its lock once per
+# request, so collection costs a few microseconds per statement and per request.
+# METRICS=0 turns it off.
+
+import bisect
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+ENABLED = os.environ.get("METRICS", "1") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# Modules whose functions SQL is attributed to, besides MediaRepository methods
+TRACKED_MODULES = ("movies", "tv_shows", "books", "search", "catalog", "review_batch", "bulk_import",
+                   "review_queue", "database_setup", "db_pool")
+
+# Frames walked from a statement looking for the function that ran it
+MAX_FRAMES = 12
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running count and sum."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        """[(upper bound, cumulative count)], ending with +Inf."""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def stats(self):
+        buckets = {"+Inf" if bound == float("inf") else str(bound): total for bound, total in self.cumulative()}
+        return {"count": self.count, "sum": round(self.sum, 6), "max": self.max,
+                "mean": round(self.sum / self.count, 6) if self.count else 0, "buckets": buckets}
+
+
+class Registry:
+    """Counters and histograms keyed by (metric name, label tuple)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}  # name -> {labels: value}
+        self.histograms = {}  # name -> (buckets, {labels: Histogram})
+        self.help = {}
+
+    def describe(self, name, text, buckets=None):
+        self.help[name] = text
+        if buckets is not None:
+            self.histograms[name] = (tuple(buckets), {})
+        else:
+            self.counters[name] = {}
+
+    def record_request(self, method, route, status, seconds, sql):
+        """Everything api.py records for one request, under one lock acquisition.
+
+        `sql` maps each data function to [statements, seconds] run during the request.
+        """
+        labels = (("method", method), ("route", route))
+        queries = sum(entry[0] for entry in sql.values())
+        sql_seconds = sum(entry[1] for entry in sql.values())
+        with self._lock:
+            series = self.counters["api_requests_total"]
+            key = labels + (("status", str(status)),)
+            series[key] = series.get(key, 0) + 1
+            for name, value in (("api_request_duration_seconds", seconds), ("api_request_sql_queries", queries),
+                                ("api_request_sql_seconds", sql_seconds)):
+                buckets, series = self.histograms[name]
+                histogram = series.get(labels)
+                if histogram is None:
+                    histogram = series[labels] = Histogram(buckets)
+                histogram.observe(value)
+            self._add_sql(sql)
+
+    def record_sql(self, sql):
+        """Add {function: [statements, seconds]} to the per-function SQL counters."""
+        with self._lock:
+            self._add_sql(sql)
+
+    def _add_sql(self, sql):
+        queries, seconds = self.counters["sql_queries_total"], self.counters["sql_seconds_total"]
+        for function, (statements, elapsed) in sql.items():
+            labels = (("function", function),)
+            queries[labels] = queries.get(labels, 0) + statements
+            seconds[labels] = seconds.get(labels, 0.0) + elapsed
+
+    def reset(self):
+        with self._lock:
+            for series in self.counters.values():
+                series.clear()
+            for _, series in self.histograms.values():
+                series.clear()
+
+    def render(self):
+        """The Prometheus text exposition of every series."""
+        lines = []
+        with self._lock:
+            for name, series in self.counters.items():
+                lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            for name, (_, series) in self.histograms.items():
+                lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else _number(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {total}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 9))
+    return str(int(value))
+
+
+def gauges(prefix, rows):
+    """Prometheus gauge lines for the numeric values of stats dicts.
+
+    `rows` is an iterable of (labels, stats); nested and text values are skipped.
+    """
+    series = {}
+    for labels, stats in rows:
+        for key, value in stats.items():
+            if isinstance(value, (bool, int, float)):
+                series.setdefault(f"{prefix}_{key}", []).append(f"{_labels(labels)} {_number(value)}")
+    lines = []
+    for name, values in series.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(name + value for value in values)
+    return lines
+
+
+registry = Registry()
+registry.describe("api_requests_total", "Requests by route, method and status code.")
+registry.describe("sql_queries_total", "SQL statements run, by the data function that ran them.")
+registry.describe("sql_seconds_total", "Time in SQLite statements and fetches, by data function.")
+registry.describe("api_request_duration_seconds", "Request latency by route and method.", LATENCY_BUCKETS)
+registry.describe("api_request_sql_queries", "SQL statements run per request.", QUERY_COUNT_BUCKETS)
+registry.describe("api_request_sql_seconds", "Time spent in SQLite per request.", LATENCY_BUCKETS)
+
+# Extra exposition lines from other subsystems (response cache, review queue, ...)
+collectors = []
+
+
+def render():
+    lines = [registry.render()]
+    for collect in collectors:
+        lines.extend(line + "\n" for line in collect())
+    return "".join(lines)
+
+
+# Per-thread request accounting
+
+_local = threading.local()
+
+
+def start_request():
+    _local.sql = {}
+    _local.started = time.perf_counter()
+
+
+def finish_request(method, route, status):
+    sql = getattr(_local, "sql", None)
+    if sql is None:
+        return
+    _local.sql = None
+    registry.record_request(method, route, status, time.perf_counter() - _local.started, sql)
+
+
+# SQL attribution
+
+_REPOSITORY = object()
+_code_labels = {}  # code object -> label, _REPOSITORY or None
+
+
+def _classify(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__")
+    if module == "media_repository" and code.co_varnames[:1] == ("self",):
+        return _REPOSITORY
+    if module in TRACKED_MODULES:
+        return f"{module}.{code.co_name}"
+    return None
+
+
+def current_function(frame=None):
+    """Label of the innermost data function on the stack, or "other"."""
+    frame = frame or sys._getframe(1)
+    for _ in range(MAX_FRAMES):
+        if frame is None:
+            break
+        label = _code_labels.get(frame.f_code, _code_labels)
+        if label is _code_labels:
+            label = _code_labels[frame.f_code] = _classify(frame)
+        if label is _REPOSITORY:
+            repository = frame.f_locals.get("self")
+            return f"{getattr(repository, 'media', 'repository')}.{frame.f_code.co_name}"
+        if label is not None:
+            return label
+        frame = frame.f_back
+    return "other"
+
+
+def _record(seconds, statements, frame):
+    """Add one statement (or fetch) to the current request, or straight to the registry."""
+    function = current_function(frame)
+    sql = getattr(_local, "sql", None)
+    if sql is None:  # outside a request, e.g. the review writer or a streamed body
+        registry.record_sql({function: [statements, seconds]})
+        return
+    entry = sql.get(function)
+    if entry is None:
+        sql[function] = [statements, seconds]
+    else:
+        entry[0] += statements
+        entry[1] += seconds
+
+
+class Cursor(sqlite3.Cursor):
+    """sqlite3 cursor that counts and times its statements."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(time.perf_counter() - start, 1, sys._getframe(1))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(time.perf_counter() - start, 1, sys._getframe(1))
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            _record(time.perf_counter() - start, 0, sys._getframe(2))
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3 connection whose statements are recorded in the registry (see db_pool)."""
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(time.perf_counter() - start, 1, sys._getframe(1))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(time.perf_counter() - start, 1, sys._getframe(1))
@@ -0,0 +1,82 @@
+# Unit tests for the request and SQL metrics
+
+import unittest
+import fixtures
+import metrics
+import movies
+from api import app
+
+class TestRegistry(unittest.TestCase):
+
+    def test_exposition_format(self):
+        """Testing the Prometheus text output of counters, histograms and gauges."""
+        registry = metrics.Registry()
+        for name in ("api_requests_total", "sql_queries_total", "sql_seconds_total"):
+            registry.describe(name, "Counter.")
+        for name in ("api_request_duration_seconds", "api_request_sql_queries", "api_request_sql_seconds"):
+            registry.describe(name, "Histogram.", (0.1, 1))
+        registry.record_request("GET", '/say/"hi"', 200, 0.05, {"movies.get_title": [2, 0.5]})
+        registry.record_request("GET", '/say/"hi"', 200, 2.0, {"movies.get_title": [1, 0.25], "other": [1, 0.0]})
+        text = registry.render()
+        self.assertIn('api_requests_total{method="GET",route="/say/\\"hi\\"",status="200"} 2', text)
+        self.assertIn('api_request_duration_seconds_bucket{method="GET",route="/say/\\"hi\\"",le="0.1"} 1', text)
+        self.assertIn('api_request_duration_seconds_bucket{method="GET",route="/say/\\"hi\\"",le="+Inf"} 2', text)
+        self.assertIn('api_request_sql_queries_count{method="GET",route="/say/\\"hi\\""} 2', text)
+        self.assertIn('sql_queries_total{function="movies.get_title"} 3', text)
+        self.assertIn('sql_seconds_total{function="movies.get_title"} 0.75', text)
+        self.assertEqual(text.count("# TYPE api_request_sql_seconds histogram"), 1)
+        lines = metrics.gauges("pool", [((("database", "a.db"),), {"hits": 3, "database": "a.db"}),
+                                        ((("database", "b.db"),), {"hits": 1})])
+        self.assertEqual(lines, ["# TYPE pool_hits gauge", 'pool_hits{database="a.db"} 3', 'pool_hits{database="b.db"} 1'])
+
+class TestApiMetrics(fixtures.FixtureTestCase):
+
+    # Snapshot mode so queries go through a real connection pool and its gauges
+    fixtures = {movies: fixtures.MOVIES}
+    mode = "snapshot"
+
+    def setUp(self):
+        """Creating a movie with reviews and clearing the recorded metrics."""
+        super().setUp()
+        movies.repository.add_titles([("Inception", "Science Fiction")])
+        movies.repository.add_reviews([(1, 5, "Amazing"), (1, 4, "Dense")])
+        metrics.registry.reset()
+        self.client = app.test_client()
+
+    def series(self, name):
+        return {dict(labels).get("function") or (dict(labels)["route"], dict(labels).get("status")): value
+                for labels, value in metrics.registry.counters[name].items()}
+
+    def test_routes_statuses_and_sql_are_recorded(self):
+        """Testing per-route status counts and SQL attributed to the repository function and media."""
+        self.client.get('/movies/1/reviews')
+        self.client.get('/movies/1/reviews')
+        self.client.get('/movies/genre')
+        self.client.get('/no/such/page')
+        requests = self.series("api_requests_total")
+        self.assertEqual(requests[("/movies/<int:movie_id>/reviews", "200")], 2)
+        self.assertEqual(requests[("/movies/genre", "400")], 1)
+        self.assertEqual(requests[("<unmatched>", "404")], 1)
+
+        queries = self.series("sql_queries_total")
+        self.assertEqual(queries["movies.get_title"], 2)  # the title and its reviews; the second GET was cached
+        histograms = metrics.registry.histograms["api_request_sql_queries"][1]
+        per_request = histograms[(("method", "GET"), ("route", "/movies/<int:movie_id>/reviews"))]
+        self.assertEqual(per_request.count, 2)
+        self.assertEqual(per_request.sum, 2 + queries.get("db_pool._healthy", 0))
+
+    def test_metrics_endpoint(self):
+        """Testing that GET /metrics serves the text exposition with subsystem gauges."""
+        self.client.get('/movies?limit=1')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        text = response.get_data(as_text=True)
+        self.assertIn('api_requests_total{method="GET",route="/movies",status="200"} 1', text)
+        self.assertIn('sql_queries_total{function="movies.iter_titles_json"}', text)
+        self.assertIn("response_cache_misses", text)
+        pooled = fixtures.database(fixtures.MOVIES, self.mode).target
+        self.assertIn(f'db_pool_hits{{database="{pooled}"}}', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,46 +5,20 @@
 import unittest
 import json
 from api import app
+import fixtures
 import movies
 
-class TestMoviesIntegration(unittest.TestCase):
+class TestMoviesIntegration(fixtures.FixtureTestCase):
+
+    # Each test runs on an in-memory copy of the movies schema, rolled back afterwards
+    fixtures = {movies: fixtures.MOVIES}
+
     def setUp(self):
-        """Setting up the test client and configuring the test database."""
+        """Setting up the test client on the test database."""
+        super().setUp()
         self.app = app.test_client()
         self.app.testing = True
 
-        # Using a test database for integration testing
-        movies.DATABASE = 'test_movie_reviews.db'
-        with movies.sqlite3.connect(movies.DATABASE) as conn:
-            cursor = conn.cursor()
-            # Create the movies table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS movies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    genre TEXT NOT NULL
-                )
-            ''')
-            # Creating the reviews table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS reviews (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    movie_id INTEGER NOT NULL,
-                    rating INTEGER NOT NULL,
-                    note TEXT NOT NULL,
-                    FOREIGN KEY (movie_id) REFERENCES movies (id)
-                )
-            ''')
-            conn.commit()
-
-    def tearDown(self):
-        """Cleaning up the test database after each test."""
-        with movies.sqlite3.connect(movies.DATABASE) as conn:
-            cursor = conn.cursor()
-            cursor.execute('DROP TABLE IF EXISTS reviews')
-            cursor.execute('DROP TABLE IF EXISTS movies')
-            conn.commit()
-
     def test_add_movie(self):
         """Testing the POST /movies endpoint."""
         response = self.app.post(
@@ -146,6 +120,61 @@ class TestMoviesIntegration(unittest.TestCase):
         self.assertEqual(data[0]['name'], "Inception")
         self.assertEqual(data[0]['genre'], "Science Fiction")
 
+    def test_view_reviews_paginated(self):
+        """Testing GET /movies with after_id, limit, reviews and fields."""
+        for name in ("Inception", "Interstellar", "Memento"):
+            self.app.post(
+                '/movies',
+                data=json.dumps({"name": name, "genre": "Science Fiction"}),
+                content_type='application/json'
+            )
+        self.app.post(
+            '/movies/2/reviews',
+            data=json.dumps({"rating": 5, "note": "Amazing movie!"}),
+            content_type='application/json'
+        )
+        response = self.app.get('/movies?limit=2')
+        self.assertEqual([m['name'] for m in response.get_json()], ["Inception", "Interstellar"])
+        self.assertEqual(response.headers['X-Next-After-Id'], "2")
+
+        response = self.app.get('/movies?after_id=2&limit=2')
+        self.assertEqual([m['name'] for m in response.get_json()], ["Memento"])
+        self.assertNotIn('X-Next-After-Id', response.headers)
+
+        response = self.app.get('/movies?reviews=count&fields=id,review_count')
+        self.assertEqual(response.get_json(), [
+            {"id": 1, "review_count": 0},
+            {"id": 2, "review_count": 1},
+            {"id": 3, "review_count": 0},
+        ])
+
+        self.assertEqual(self.app.get('/movies?limit=0').status_code, 400)
+        self.assertEqual(self.app.get('/movies?fields=rating').status_code, 400)
+
+    def test_view_reviews_streamed(self):
+        """Testing GET /movies?stream=ndjson|array against the buffered listing."""
+        for name in ("Inception", "Interstellar", "Memento"):
+            self.app.post(
+                '/movies',
+                data=json.dumps({"name": name, "genre": "Science Fiction"}),
+                content_type='application/json'
+            )
+        self.app.post(
+            '/movies/2/reviews',
+            data=json.dumps({"rating": 5, "note": "Amazing movie!"}),
+            content_type='application/json'
+        )
+        response = self.app.get('/movies?stream=array')
+        self.assertEqual(response.data, self.app.get('/movies').data)
+        self.assertNotIn('Content-Length', response.headers)
+
+        response = self.app.get('/movies?limit=2&reviews=count', headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual([json.loads(line)["review_count"] for line in response.data.splitlines()], [0, 1])
+        self.assertEqual(response.headers['X-Next-After-Id'], "2")
+        self.assertNotIn('X-Next-After-Id', self.app.get('/movies?stream=ndjson&after_id=2&limit=2').headers)
+        self.assertEqual(self.app.get('/movies?stream=csv').status_code, 400)
+
     def test_search_reviews(self):
         """Testing the GET /movies/<int:movie_id>/reviews endpoint."""
         # Adding a movie and a review
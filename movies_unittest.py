@@ -3,47 +3,18 @@
 # Unit Tests for testing movies tab features
 
 import unittest
-import sqlite3
+import fixtures
 import movies
 
-# Creating a temporary database for testing
-TEST_DATABASE = 'test_movie_reviews.db'
+class TestMovies(fixtures.FixtureTestCase):
 
-class TestMovies(unittest.TestCase):
+    # Each test runs on an in-memory copy of the movies schema, rolled back afterwards
+    fixtures = {movies: fixtures.MOVIES}
 
     def setUp(self):
-        """Setting up a test database and tables before each test."""
-        self.conn = sqlite3.connect(TEST_DATABASE)
-        self.cursor = self.conn.cursor()
-        
-        # Creating tables
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS movies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                genre TEXT NOT NULL
-            )
-        ''')
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reviews (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                movie_id INTEGER NOT NULL,
-                rating INTEGER NOT NULL,
-                note TEXT NOT NULL,
-                FOREIGN KEY (movie_id) REFERENCES movies (id)
-            )
-        ''')
-        self.conn.commit()
-
-        # Using test database for all operations
-        movies.DATABASE = TEST_DATABASE
-
-    def tearDown(self):
-        """Cleaning up the database after each test."""
-        self.cursor.execute('DROP TABLE IF EXISTS reviews')
-        self.cursor.execute('DROP TABLE IF EXISTS movies')
-        self.conn.commit()
-        self.conn.close()
+        """Setting up a cursor on the test database."""
+        super().setUp()
+        self.cursor = self.connection(movies).cursor()
 
     def test_add_movie(self):
         """Testing adding a movie to the database."""
@@ -112,6 +83,20 @@ class TestMovies(unittest.TestCase):
         self.assertEqual(len(response[0]["reviews"]), 1)
         self.assertEqual(response[0]["reviews"][0]["note"], "Amazing movie!")
 
+    def test_view_reviews_groups_by_movie(self):
+        """Testing that each movie keeps its own reviews, including movies with none."""
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_movie("Interstellar", "Science Fiction")
+        movies.add_movie("Memento", "Thriller")
+        movies.add_review(1, 5, "Amazing movie!")
+        movies.add_review(3, 4, "Clever")
+        movies.add_review(1, 3, "Confusing")
+        response = movies.view_reviews()
+        self.assertEqual([m["name"] for m in response], ["Inception", "Interstellar", "Memento"])
+        self.assertEqual([r["note"] for r in response[0]["reviews"]], ["Amazing movie!", "Confusing"])
+        self.assertEqual(response[1]["reviews"], [])
+        self.assertEqual(response[2]["reviews"], [{"review_id": 2, "rating": 4, "note": "Clever"}])
+
     def test_search_reviews(self):
         """Testing searching for reviews by movie ID."""
         movies.add_movie("Inception", "Science Fiction")
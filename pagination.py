@@ -0,0 +1,87 @@
+# Keyset pagination and field projection shared by the list endpoints in api.py
+# (GET /movies, GET /tv_shows, GET /books).
+
+# Largest page a client may ask for with ?limit=
+MAX_PAGE_SIZE = 500
+
+# ?reviews= modes: embed every review, only a count, or leave reviews out
+REVIEW_MODES = ("full", "count", "none")
+
+# ?stream= modes: one JSON object per line, or a single JSON array sent in chunks
+STREAM_MODES = ("ndjson", "array")
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "array": "application/json"}
+
+# Encoded bytes gathered before a streamed chunk is handed to the server
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def parse_page_args(args, allowed_fields):
+    """Read after_id, limit, reviews and fields from a request's query args.
+
+    Raises ValueError with a client-facing message when an argument is invalid.
+    """
+    after_id = args.get("after_id")
+    if after_id is not None:
+        if not after_id.isdigit():
+            raise ValueError("after_id must be a non-negative integer")
+        after_id = int(after_id)
+
+    limit = args.get("limit")
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+        limit = int(limit)
+
+    reviews = args.get("reviews", "full")
+    if reviews not in REVIEW_MODES:
+        raise ValueError(f"reviews must be one of: {', '.join(REVIEW_MODES)}")
+
+    fields = args.get("fields")
+    if fields is not None:
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    stream = args.get("stream")
+    if stream is not None and stream not in STREAM_MODES:
+        raise ValueError(f"stream must be one of: {', '.join(STREAM_MODES)}")
+
+    return {"after_id": after_id, "limit": limit, "reviews": reviews, "fields": fields, "stream": stream}
+
+
+def project(item, fields):
+    """Keep only the requested keys of an item."""
+    if fields is None:
+        return item
+    return {key: item[key] for key in fields if key in item}
+
+
+def json_array(pieces):
+    """A JSON array body from already encoded items, as jsonify would send it."""
+    return b"[" + b",".join(pieces) + b"]\n"
+
+
+def stream_items(pieces, mode):
+    """Send already encoded items lazily as NDJSON or a JSON array.
+
+    Yields byte chunks of roughly STREAM_CHUNK_BYTES, so memory holds one chunk and
+    whatever `pieces` buffers, never the whole listing.
+    """
+    chunk, size = [b"[" if mode == "array" else b""], 0
+    separator = b"\n" if mode == "ndjson" else b","
+    first = True
+    for data in pieces:
+        if mode == "ndjson":
+            chunk.append(data + separator)
+        else:
+            chunk.append(data if first else separator + data)
+        first = False
+        size += len(data) + 1
+        if size >= STREAM_CHUNK_BYTES:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if mode == "array":
+        chunk.append(b"]\n")
+    if chunk:
+        yield b"".join(chunk)
@@ -0,0 +1,321 @@
+# Pre-forked multi-process serving mode for the api.py routes.
+#
+# One Python process spends most of a list request serializing JSON under the GIL, so
+# a single server uses one core however many it has. Here a master process binds the
+# listening socket, warms the OS page cache with the database files and forks:
+#
+#   readers  N processes accepting on the shared socket. Their pools are read-only
+#            (db_pool.READ_ONLY: mode=ro, PRAGMA query_only) and they answer GET, HEAD
+#            and OPTIONS themselves. Any other method is forwarded unchanged to the
+#            writer and its response relayed back.
+#   writer   one process on a Unix socket that performs every write, so SQLite's
+#            single-writer lock and review_queue's group commit see all of them.
+#
+# SQLite's WAL lets the readers see each commit as soon as it lands, and with the
+# mmap_size PRAGMA they share the same physical pages. Response caches live in each
+# reader, so the writer bumps a shared write generation after every successful write
+# and a reader clears its cache when it sees a new one before handling a request. The
+# writer's response is relayed only after the bump, so a client always reads its own
+# writes. Before accepting, each reader opens its full pool on every database and runs
+# WARM_UP_PATHS once, so the first real requests don't pay for connecting, parsing the
+# schema or first imports. The master restarts any child that exits.
+#
+#   python prefork.py [--workers N] [--host 127.0.0.1] [--port 5000] [--server asgi|wsgi]
+#
+# Environment: PREFORK_WORKERS (default: CPU count) reader processes. The asgi server
+# (uvicorn running asgi.py) is used when uvicorn is installed; wsgi is werkzeug's
+# threaded server.
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.parse
+
+from flask import request
+
+import asgi
+import books
+import db_pool
+import movies
+import response_cache
+import tv_shows
+from api import app
+
+WORKERS = int(os.environ.get("PREFORK_WORKERS", os.cpu_count() or 1))
+
+# Methods the readers serve; everything else goes to the writer
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Requests each reader runs before accepting connections
+WARM_UP_PATHS = ("/movies?limit=50", "/movies/top?limit=10", "/movies/genres", "/tv_shows?limit=50",
+                 "/tv_shows/top?limit=10", "/books?limit=50", "/books/top?limit=10", "/top")
+
+# Seconds a reader waits for the writer's response to a forwarded request
+FORWARD_TIMEOUT = 60
+
+# Hop-by-hop headers, and those the reader's own server adds, are not relayed
+DROPPED_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "date", "server"}
+
+# A child that exits sooner than this after starting is restarted only after a pause
+RESTART_DELAY = 1
+
+
+def databases():
+    """The database files the data modules use (one under the consolidated layout)."""
+    return sorted({movies.DATABASE, tv_shows.DATABASE, books.DATABASE})
+
+
+def warm_page_cache(paths):
+    """Read each database file (and its WAL) once so it is in the OS page cache; returns bytes read."""
+    total = 0
+    for path in paths:
+        for name in (path, path + "-wal"):
+            try:
+                fd = os.open(name, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                while True:
+                    chunk = os.read(fd, 1 << 20)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+            finally:
+                os.close(fd)
+    return total
+
+
+def open_pools():
+    """Open every connection of each database's pool, reading the schema on each."""
+    for database in databases():
+        pool = db_pool.get_pool(database)
+        held = [pool.acquire() for _ in range(pool.size)]
+        for conn in held:
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            pool.release(conn)
+
+
+def warm_up(flask_app):
+    """Open the pools and run WARM_UP_PATHS, leaving the response cache empty."""
+    open_pools()
+    client = flask_app.test_client()
+    for path in WARM_UP_PATHS:
+        client.get(path)
+    response_cache.backend.clear()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection over a Unix domain socket."""
+
+    def __init__(self, path, timeout=FORWARD_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class WriteForwarder:
+    """WSGI middleware that sends every request not in READ_METHODS to the writer process.
+
+    Each forwarded request uses a fresh connection, so a request is never retried
+    on a connection the writer may already have answered.
+    """
+
+    def __init__(self, wsgi_app, socket_path):
+        self.wsgi_app = wsgi_app
+        self.socket_path = socket_path
+
+    def __call__(self, environ, start_response):
+        if environ["REQUEST_METHOD"] in READ_METHODS:
+            return self.wsgi_app(environ, start_response)
+        return self.forward(environ, start_response)
+
+    def forward(self, environ, start_response):
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else b""
+        path = urllib.parse.quote((environ.get("SCRIPT_NAME", "") + environ["PATH_INFO"]).encode("latin1"))
+        if environ.get("QUERY_STRING"):
+            path += "?" + environ["QUERY_STRING"]
+        headers = {key[5:].replace("_", "-").title(): value for key, value in environ.items()
+                   if key.startswith("HTTP_") and key[5:].replace("_", "-").lower() not in DROPPED_HEADERS}
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        headers["Content-Length"] = str(len(body))
+        conn = UnixHTTPConnection(self.socket_path)
+        try:
+            conn.request(environ["REQUEST_METHOD"], path, body, headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            payload = b'{"error": "Writer is unavailable, try again shortly"}\n'
+            start_response("503 SERVICE UNAVAILABLE", [("Content-Type", "application/json"), ("Retry-After", "1"),
+                                                      ("Content-Length", str(len(payload)))])
+            return [payload]
+        finally:
+            conn.close()
+        relayed = [(k, v) for k, v in response.getheaders() if k.lower() not in DROPPED_HEADERS]
+        start_response(f"{response.status} {response.reason}", relayed + [("Content-Length", str(len(payload)))])
+        return [payload]
+
+
+def install_reader(flask_app, generation, socket_path):
+    """Make this process a reader: read-only pools, writes forwarded, cache following the writer."""
+    db_pool.configure(read_only=True)
+    flask_app.wsgi_app = WriteForwarder(flask_app.wsgi_app, socket_path)
+    seen = [generation.value]
+
+    @flask_app.before_request
+    def follow_writer():
+        current = generation.value
+        if current != seen[0]:
+            seen[0] = current
+            response_cache.backend.clear()
+
+
+def install_writer(flask_app, generation):
+    """Make this process the writer: bump the shared write generation after each successful write."""
+    lock = threading.Lock()
+
+    @flask_app.after_request
+    def publish_write(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            with lock:
+                generation.value += 1
+        return response
+
+
+def serve(flask_app, server, listener=None, socket_path=None):
+    """Serve on the inherited listening socket, or on a Unix socket at socket_path, until stopped."""
+    if server == "asgi":
+        import uvicorn
+        config = uvicorn.Config(asgi.app, uds=socket_path, log_level="warning", access_log=False, lifespan="on")
+        uvicorn.Server(config).run(sockets=[listener] if listener is not None else None)
+    else:
+        from werkzeug.serving import make_server
+        if listener is not None:
+            host, port = listener.getsockname()[:2]
+            httpd = make_server(host, port, flask_app, threaded=True, fd=listener.fileno())
+        else:
+            httpd = make_server(f"unix://{socket_path}", 0, flask_app, threaded=True)
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+
+
+def run_child(role, listener, socket_path, generation, server):
+    """Body of a forked child; never returns."""
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    status = 0
+    try:
+        if role == "writer":
+            listener.close()
+            install_writer(app, generation)
+            open_pools()
+            serve(app, server, socket_path=socket_path)
+        else:
+            install_reader(app, generation, socket_path)
+            warm_up(app)
+            serve(app, server, listener=listener)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+class Master:
+    """Forks the writer and readers, restarts those that exit, and stops them on SIGTERM / SIGINT."""
+
+    def __init__(self, listener, workers, server):
+        self.listener = listener
+        self.workers = workers
+        self.server = server
+        self.generation = multiprocessing.RawValue("Q", 0)
+        self.directory = tempfile.mkdtemp(prefix="prefork-")
+        self.socket_path = os.path.join(self.directory, "writer.sock")
+        self.children = {}  # pid -> (role, started)
+        self.stopping = False
+
+    def spawn(self, role):
+        pid = os.fork()
+        if pid == 0:
+            run_child(role, self.listener, self.socket_path, self.generation, self.server)
+        self.children[pid] = (role, time.monotonic())
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            self.spawn("writer")
+            for _ in range(self.workers):
+                self.spawn("reader")
+            while self.children:
+                pid, status = os.wait()
+                role, started = self.children.pop(pid, (None, 0))
+                if role is None or self.stopping:
+                    continue
+                print(f"prefork: {role} {pid} exited with status {status}, restarting", file=sys.stderr)
+                if time.monotonic() - started < RESTART_DELAY:
+                    time.sleep(RESTART_DELAY)
+                self.spawn(role)
+        finally:
+            self.listener.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def default_server():
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        return "wsgi"
+    return "asgi"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from pre-forked read workers and one writer")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="reader processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--server", choices=("asgi", "wsgi"), default=default_server())
+    args = parser.parse_args()
+
+    listener = socket.create_server((args.host, args.port), backlog=2048)
+    listener.set_inheritable(True)
+    warmed = warm_page_cache(databases())
+    print(f"prefork: {args.workers} readers and a writer on http://{args.host}:{args.port} ({args.server}), "
+          f"{warmed / 1e6:.1f} MB of database pages warmed", file=sys.stderr)
+    Master(listener, args.workers, args.server).run()
+
+
+if __name__ == "__main__":
+    main()
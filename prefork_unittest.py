@@ -0,0 +1,79 @@
+# Unit tests for the pre-forked serving mode
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from werkzeug.serving import make_server
+from werkzeug.test import Client
+import prefork
+
+def echo_writer(environ, start_response):
+    """Stand-in writer answering with what it received."""
+    length = int(environ.get("CONTENT_LENGTH") or 0)
+    body = json.dumps({
+        "method": environ["REQUEST_METHOD"],
+        "path": environ["PATH_INFO"],
+        "query": environ["QUERY_STRING"],
+        "content_type": environ.get("CONTENT_TYPE"),
+        "token": environ.get("HTTP_X_TOKEN"),
+        "body": environ["wsgi.input"].read(length).decode(),
+    }).encode()
+    start_response("201 CREATED", [("Content-Type", "application/json"), ("X-Writer", "1")])
+    return [body]
+
+def local_reader(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"reader"]
+
+class TestWriteForwarder(unittest.TestCase):
+
+    def setUp(self):
+        """Serving the echo writer on a Unix socket in a temporary directory."""
+        self.directory = tempfile.mkdtemp(prefix="prefork-test-")
+        self.socket_path = os.path.join(self.directory, "writer.sock")
+        self.client = Client(prefork.WriteForwarder(local_reader, self.socket_path))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def serve_writer(self):
+        server = make_server(f"unix://{self.socket_path}", 0, echo_writer, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def test_reads_stay_local_and_writes_are_forwarded(self):
+        """Testing that GET is served in-process while POST reaches the writer intact."""
+        self.serve_writer()
+        self.assertEqual(self.client.get('/movies').get_data(), b"reader")
+        response = self.client.post('/movies/1/reviews?source=web', json={"rating": 5, "note": "Ünïcode"},
+                                    headers={"X-Token": "abc"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers["X-Writer"], "1")
+        self.assertNotIn("Server", response.headers)
+        received = response.get_json()
+        self.assertEqual((received["method"], received["path"], received["query"], received["token"]),
+                         ("POST", "/movies/1/reviews", "source=web", "abc"))
+        self.assertEqual(received["content_type"], "application/json")
+        self.assertEqual(json.loads(received["body"]), {"rating": 5, "note": "Ünïcode"})
+        self.assertEqual(self.client.delete('/movies/1').get_json()["method"], "DELETE")
+
+    def test_unreachable_writer(self):
+        """Testing that writes get a retryable 503 when the writer is not listening."""
+        response = self.client.post('/movies', json={"name": "Inception"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(self.client.get('/movies').status_code, 200)
+
+    def test_warm_page_cache_reads_database_files(self):
+        """Testing that the warm-up reads each database file and skips a missing WAL."""
+        path = os.path.join(self.directory, "catalog.db")
+        with open(path, "wb") as f:
+            f.write(b"x" * 5000)
+        self.assertEqual(prefork.warm_page_cache([path, os.path.join(self.directory, "missing.db")]), 5000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+# Opt-in per-request call profiling for api.py, written as folded stacks that
+# flamegraph.pl, inferno, speedscope and similar tools read directly.
+#
+# A request is profiled when it carries an X-Profile header (honoured only when
+# PROFILE_HEADER=1, since any client can send it) or is picked by PROFILE_SAMPLE_RATE
+# (a fraction between 0 and 1). The profile follows every Python and C call on the
+# request's thread through sys.setprofile, so sqlite3.connect, each execute and fetch,
+# row-to-dict building and JSON encoding appear as separate frames. Each profile is
+# written to PROFILE_DIR as one .folded file. Each line is a stack followed by the
+# microseconds spent in its innermost frame:
+#
+#   GET /movies/<int:movie_id>/reviews;...;api.get_movie;movies.get_title;sqlite3.Connection.execute 41
+#
+# The root frame is the method and route, and MediaRepository methods are named after
+# their media type ("movies.get_title", "books.list_titles"), as in metrics.py. Tracing
+# every call slows a profiled request several-fold, so compare shares of the total
+# rather than absolute times. A streamed body is produced after the profile ends and is
+# not included. With both triggers off, each request pays for one header lookup.
+#
+# Merge dumps into one flamegraph input and a per-route / per-function summary with:
+#   python profiling.py profiles/ [--route /movies] [--output merged.folded] [--top 20]
+
+import argparse
+import glob
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from collections import Counter
+
+HEADER = "X-Profile"
+HEADER_ENABLED = os.environ.get("PROFILE_HEADER", "0") == "1"
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+DIRECTORY = os.environ.get("PROFILE_DIR", "profiles")
+
+# Stacks under these prefixes are the data functions a route is attributed to
+DATA_MODULES = ("movies", "tv_shows", "books")
+
+_local = threading.local()
+_sequence = itertools.count(1)
+
+
+def requested(headers):
+    """Whether the request with these headers should be profiled."""
+    if HEADER_ENABLED and HEADER in headers:
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+# Frame names
+
+_code_labels = {}  # code object -> label, or None for MediaRepository methods
+_c_labels = {}  # (owner type, qualname) -> label
+
+
+def _python_label(frame):
+    code = frame.f_code
+    label = _code_labels.get(code, _code_labels)
+    if label is _code_labels:
+        module = frame.f_globals.get("__name__", "?")
+        if module == "media_repository" and code.co_varnames[:1] == ("self",):
+            label = None
+        else:
+            label = f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        _code_labels[code] = label
+    if label is None:
+        return f"{getattr(frame.f_locals.get('self'), 'media', 'repository')}.{code.co_name}"
+    return label
+
+
+def _c_label(function):
+    owner = getattr(function, "__self__", None)
+    key = (type(owner), function.__qualname__)
+    label = _c_labels.get(key)
+    if label is None:
+        module = getattr(function, "__module__", None)
+        if module is None:
+            # A method of a C type: name it after the class that defines it, so the
+            # execute of metrics.Connection still reads sqlite3.Connection.execute
+            owner_name, _, name = function.__qualname__.rpartition(".")
+            defining = next((cls for cls in type(owner).__mro__ if cls.__name__ == owner_name
+                             and not isinstance(cls.__dict__.get(name), types.FunctionType)), type(owner))
+            module = defining.__module__
+        label = function.__qualname__ if module == "builtins" else f"{module.lstrip('_')}.{function.__qualname__}"
+        _c_labels[key] = label
+    return label
+
+
+class Profile:
+    """Self time per call stack on the current thread between start() and stop()."""
+
+    def __init__(self):
+        self.stacks = Counter()  # stack tuple -> seconds spent in its innermost frame
+        self._stack = []  # [stack tuple, start, seconds in children]
+
+    def start(self):
+        self.started = time.perf_counter()
+        sys.setprofile(self._event)
+
+    def stop(self):
+        sys.setprofile(None)
+        now = time.perf_counter()
+        while self._stack:  # frames still open when the profile ended
+            self._pop(now)
+        self.seconds = now - self.started
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == "call" or event == "c_call":
+            label = _python_label(frame) if event == "call" else _c_label(arg)
+            parent = self._stack[-1][0] if self._stack else ()
+            self._stack.append([parent + (label,), now, 0.0])
+        elif self._stack:  # returns from frames entered before start() are ignored
+            self._pop(now)
+
+    def _pop(self, now):
+        stack, start, children = self._stack.pop()
+        elapsed = now - start
+        self.stacks[stack] += elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def folded(self, root):
+        """Folded stack lines under a root frame, weighted in whole microseconds."""
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds > 0:
+                lines.append(f"{';'.join((root,) + stack)} {microseconds}")
+        return lines
+
+
+def start():
+    profile = _local.profile = Profile()
+    profile.start()
+
+
+def stop():
+    """End the current thread's profile, if any, and return it."""
+    profile = getattr(_local, "profile", None)
+    if profile is not None:
+        _local.profile = None
+        profile.stop()
+    return profile
+
+
+def dump(profile, method, route, directory=None):
+    """Write a profile as <time>-<method>-<route>-<pid>-<n>.folded; returns the path."""
+    directory = directory or DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{slug}-{os.getpid()}-{next(_sequence)}.folded"
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(profile.folded(f"{method} {route}")) + "\n")
+    return path
+
+
+# Aggregation
+
+def read_folded(paths):
+    """Yield (file, stack tuple, microseconds) from .folded files and directories of them."""
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.folded"))) if os.path.isdir(path) else [path]
+        for file in files:
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    stack, _, weight = line.rstrip("\n").rpartition(" ")
+                    if stack and weight.isdigit():
+                        yield file, tuple(stack.split(";")), int(weight)
+
+
+def data_function(stack):
+    """The outermost movies / tv_shows / books function of a stack, if any."""
+    return next((frame for frame in stack[1:] if frame.split(".")[0] in DATA_MODULES and "<" not in frame), None)
+
+
+def aggregate(paths, route=None):
+    """Merged stacks and summary totals (in microseconds) for a set of profile dumps."""
+    stacks, routes, functions, leaves, requests = Counter(), Counter(), Counter(), Counter(), {}
+    for file, stack, weight in read_folded(paths):
+        if route is not None and stack[0].split(" ", 1)[-1] != route:
+            continue
+        stacks[stack] += weight
+        routes[stack[0]] += weight
+        requests.setdefault(stack[0], set()).add(file)
+        functions[(stack[0], data_function(stack) or "-")] += weight
+        leaves[stack[-1]] += weight
+    return {
+        "stacks": stacks,
+        "routes": {name: (len(requests[name]), total) for name, total in routes.items()},
+        "functions": functions,
+        "leaves": leaves,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge and summarise request profiles (.folded files).")
+    parser.add_argument("paths", nargs="+", help=".folded files or directories of them")
+    parser.add_argument("--route", help="only profiles of this route, e.g. /movies")
+    parser.add_argument("--output", help="write the merged folded stacks here, for flamegraph.pl or speedscope")
+    parser.add_argument("--top", type=int, default=15, help="functions listed by self time")
+    args = parser.parse_args(argv)
+
+    result = aggregate(args.paths, args.route)
+    if not result["stacks"]:
+        print("No profiles found", file=sys.stderr)
+        return 1
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for stack, weight in sorted(result["stacks"].items()):
+                f.write(f"{';'.join(stack)} {weight}\n")
+
+    print(f"{'route':<44} {'profiles':>8} {'total ms':>10} {'mean ms':>9}")
+    for name, (count, total) in sorted(result["routes"].items(), key=lambda item: -item[1][1]):
+        print(f"{name:<44} {count:>8} {total / 1e3:>10.2f} {total / count / 1e3:>9.2f}")
+    print(f"\n{'route':<44} {'data function':<28} {'ms':>9} {'share':>6}")
+    for (name, function), total in sorted(result["functions"].items(), key=lambda item: -item[1]):
+        print(f"{name:<44} {function:<28} {total / 1e3:>9.2f} {total / result['routes'][name][1]:>6.0%}")
+    grand_total = sum(result["leaves"].values())
+    print(f"\n{'self time':<73} {'ms':>9} {'share':>6}")
+    for frame, total in result["leaves"].most_common(args.top):
+        print(f"{frame:<73} {total / 1e3:>9.2f} {total / grand_total:>6.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
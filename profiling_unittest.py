@@ -0,0 +1,69 @@
+# Unit tests for the request profiling hook and the profile aggregation
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import fixtures
+import movies
+import profiling
+from api import app
+
+class TestProfiling(fixtures.FixtureTestCase):
+
+    # Snapshot mode, so the profiles show the pooled sqlite3 connections the app really uses
+    fixtures = {movies: fixtures.MOVIES}
+    mode = "snapshot"
+
+    def setUp(self):
+        """Creating a movie with a review and an empty profile directory."""
+        super().setUp()
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_review(1, 5, "Amazing")
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.client = app.test_client()
+
+    def test_header_profile_is_dumped_as_folded_stacks(self):
+        """Testing that X-Profile writes a folded profile rooted at the route, only when enabled."""
+        with mock.patch.multiple(profiling, HEADER_ENABLED=True, DIRECTORY=self.directory):
+            response = self.client.get('/movies/1/reviews', headers={"X-Profile": "1"})
+            self.assertNotIn("X-Profile-File", self.client.get('/movies/1/reviews').headers)
+        self.assertEqual(response.status_code, 200)
+        name = response.headers["X-Profile-File"]
+        self.assertEqual(os.listdir(self.directory), [name])
+
+        with open(os.path.join(self.directory, name)) as f:
+            lines = f.read().splitlines()
+        stacks = [line.rpartition(" ")[0].split(";") for line in lines]
+        self.assertTrue(all(stack[0] == "GET /movies/<int:movie_id>/reviews" for stack in stacks))
+        self.assertTrue(all(line.rpartition(" ")[2].isdigit() for line in lines))
+        self.assertIn("movies.get_title", {frame for stack in stacks for frame in stack})
+        self.assertIn("sqlite3.Connection.execute", {stack[-1] for stack in stacks})
+
+        with mock.patch.object(profiling, "DIRECTORY", self.directory):
+            self.client.get('/movies/1/reviews', headers={"X-Profile": "1"})  # header not honoured
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_sampling_and_aggregation(self):
+        """Testing sampled profiles and their merge into per-route and per-function totals."""
+        with mock.patch.multiple(profiling, SAMPLE_RATE=1, DIRECTORY=self.directory):
+            self.client.get('/movies?limit=5')
+            self.client.get('/movies?limit=5&after_id=1')
+            self.client.get('/movies/1/reviews')
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+        result = profiling.aggregate([self.directory], route="/movies")
+        self.assertEqual(list(result["routes"]), ["GET /movies"])
+        self.assertEqual(result["routes"]["GET /movies"][0], 2)
+        self.assertEqual(sum(result["stacks"].values()), result["routes"]["GET /movies"][1])
+        self.assertIn(("GET /movies", "movies.iter_titles_json"), result["functions"])
+
+        merged = os.path.join(self.directory, "merged.txt")
+        self.assertEqual(profiling.main([self.directory, "--output", merged]), 0)
+        with open(merged) as f:
+            self.assertEqual(len({line.split(";")[0] for line in f}), 2)
+
+if __name__ == '__main__':
+    unittest.main()
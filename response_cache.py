@@ -0,0 +1,159 @@
+# Response cache for the read endpoints in api.py.
+#
+# Entries are keyed by database, path and query string and carry tags naming what they
+# depend on: the titles they contain ("title:<id>"), the genre they list ("genre:<name>"),
+# the last page of a listing ("tail"), the top-rated lists ("top") or, when a projection
+# hid the ids, any change at all ("any"). Tags are scoped by media type. The data modules
+# call the *_changed/added/deleted hooks below from their mutators, so a write drops
+# exactly the entries that could show it; the TTL bounds staleness from writers in
+# other processes.
+
+import collections
+import os
+import threading
+import time
+
+# Seconds an entry may be served before it is recomputed
+TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 30))
+
+# Entries kept by the LRU backend before the least recently used are evicted
+MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_ENTRIES", 2048))
+
+
+class LRUBackend:
+    """In-process LRU map with per-entry expiry and a tag -> keys index."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._tags = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0,
+                         "stale_skipped": 0, "invalidated": 0, "evictions": 0, "expired": 0}
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                self.counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    def set(self, key, value, tags, ttl, generation):
+        """Store value unless an invalidation happened since `generation` was read."""
+        with self._lock:
+            if generation != self.generation:
+                self.counters["stale_skipped"] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags[tag].add(key)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def note(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self.counters["invalidated"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), max_entries=self.max_entries)
+
+
+class NullBackend:
+    """Backend that stores nothing; every lookup is a miss."""
+
+    generation = 0
+
+    def __init__(self):
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, key):
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, key, value, tags, ttl, generation):
+        pass
+
+    def note(self, counter):
+        self.counters[counter] += 1
+
+    def invalidate(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return dict(self.counters, entries=0)
+
+
+BACKENDS = {"lru": LRUBackend, "none": NullBackend}
+
+backend = BACKENDS[os.environ.get("RESPONSE_CACHE", "lru")]()
+
+
+def configure(name=None, ttl=None, max_entries=None):
+    """Swap the backend ("lru" or "none") or change TTL/size; starts from an empty cache."""
+    global backend, TTL, MAX_ENTRIES
+    if ttl is not None:
+        TTL = ttl
+    if max_entries is not None:
+        MAX_ENTRIES = max_entries
+    name = name or ("none" if isinstance(backend, NullBackend) else "lru")
+    backend = LRUBackend(MAX_ENTRIES) if name == "lru" else BACKENDS[name]()
+
+
+def invalidate(media, *tags):
+    backend.invalidate([(media, tag) for tag in tags])
+
+
+def title_added(media, title_id, genre):
+    invalidate(media, "tail", "any", f"genre:{genre}", f"title:{title_id}")
+
+
+def reviews_changed(media, title_id):
+    invalidate(media, "top", "any", f"title:{title_id}")
+
+
+def title_deleted(media, title_id):
+    invalidate(media, "top", "any", f"title:{title_id}")
+
+
+def media_changed(media):
+    """Drop every entry of one media type, for writes too broad to track (bulk imports)."""
+    invalidate(media, "media")
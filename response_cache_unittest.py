@@ -0,0 +1,96 @@
+# Unit tests for the response cache
+
+import time
+import unittest
+import fixtures
+import movies
+import response_cache
+from api import app
+
+class TestLRUBackend(unittest.TestCase):
+
+    def test_eviction_and_ttl(self):
+        """Testing that the least recently used entry is evicted and expired entries miss."""
+        cache = response_cache.LRUBackend(max_entries=2)
+        cache.set("a", 1, [("movies", "media")], 60, cache.generation)
+        cache.set("b", 2, [("movies", "media")], 60, cache.generation)
+        cache.get("a")
+        cache.set("c", 3, [("movies", "media")], 60, cache.generation)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("d", 4, [], -1, cache.generation)
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_store_after_invalidation_is_skipped(self):
+        """Testing that a result computed before a write is not stored after it."""
+        cache = response_cache.LRUBackend()
+        generation = cache.generation
+        cache.invalidate([("movies", "title:1")])
+        cache.set("a", 1, [("movies", "title:1")], 60, generation)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["stale_skipped"], 1)
+
+class TestCachedEndpoints(fixtures.FixtureTestCase):
+
+    fixtures = {movies: fixtures.MOVIES}
+
+    def setUp(self):
+        """Adding two movies to the fixture database and starting an empty cache."""
+        super().setUp()
+        response_cache.configure("lru")
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_movie("Memento", "Thriller")
+        self.client = app.test_client()
+
+    def test_hit_and_not_modified(self):
+        """Testing that a repeated GET is a cache hit and If-None-Match gets a 304."""
+        first = self.client.get('/movies?limit=1')
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        second = self.client.get('/movies?limit=1')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(second.get_json(), first.get_json())
+        self.assertEqual(second.headers['X-Next-After-Id'], '1')
+        revalidated = self.client.get('/movies?limit=1', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.get_data(), b'')
+        stats = self.client.get('/stats/cache').get_json()
+        self.assertEqual((stats["hits"], stats["misses"], stats["not_modified"]), (2, 1, 1))
+
+    def test_review_invalidates_only_affected_entries(self):
+        """Testing that a review on one movie drops its entries and leaves the others cached."""
+        self.client.get('/movies/1/reviews')
+        self.client.get('/movies/2/reviews')
+        self.client.get('/movies/genre?genre=Thriller')
+        self.client.get('/movies/top')
+        movies.add_review(1, 5, "Amazing movie!")
+        self.assertEqual(self.client.get('/movies/2/reviews').headers['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/movies/genre?genre=Thriller').headers['X-Cache'], 'HIT')
+        response = self.client.get('/movies/1/reviews')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertEqual(len(response.get_json()["reviews"]), 1)
+        self.assertEqual([m["name"] for m in self.client.get('/movies/top').get_json()], ["Inception"])
+
+    def test_new_movie_invalidates_last_page_and_genre(self):
+        """Testing that adding a movie refreshes the final list page and its genre, not full pages."""
+        self.client.get('/movies?limit=1')
+        self.client.get('/movies?after_id=1&limit=5')
+        self.client.get('/movies/genre?genre=Thriller')
+        movies.add_movie("Insomnia", "Thriller")
+        self.assertEqual(self.client.get('/movies?limit=1').headers['X-Cache'], 'HIT')
+        response = self.client.get('/movies?after_id=1&limit=5')
+        self.assertEqual([m["name"] for m in response.get_json()], ["Memento", "Insomnia"])
+        self.assertEqual(len(self.client.get('/movies/genre?genre=Thriller').get_json()), 2)
+
+    def test_entries_expire_after_ttl(self):
+        """Testing that entries are recomputed once the TTL has passed."""
+        response_cache.configure("lru", ttl=0.01)
+        try:
+            self.client.get('/movies')
+            time.sleep(0.02)
+            self.assertEqual(self.client.get('/movies').headers['X-Cache'], 'MISS')
+        finally:
+            response_cache.configure("lru", ttl=30)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# Batch review submission for movies, TV shows and books.
+#
+# A batch is a list of review items, each {"type": "movies", "title_id": 1, "rating": 5,
+# "note": "..."} (type is implied on the per-media endpoints). Every item is validated
+# before anything is written, then all rows going to one database file are inserted in a
+# single transaction - under DB_LAYOUT=consolidated that is one transaction for the
+# whole batch. The result lists the outcome of every item in request order.
+#
+# Used by POST /reviews/batch and POST /<media>/reviews/batch in api.py.
+
+from contextlib import ExitStack
+
+import bulk_import
+import db_pool
+import media_repository
+import response_cache
+
+# Largest batch accepted in one request
+MAX_ITEMS = 1000
+
+# media type -> bulk_import review kind, whose field validators are reused here
+REVIEW_KINDS = {
+    "movies": "movie_reviews",
+    "tv_shows": "tv_show_reviews",
+    "books": "book_reviews",
+}
+
+
+def _validate(item, media):
+    """Return (media, (title_id, rating, note)) for one item or raise ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("each review must be a JSON object")
+    media = media or item.get("type")
+    if media not in REVIEW_KINDS:
+        raise ValueError(f"type must be one of: {', '.join(REVIEW_KINDS)}")
+    fields = bulk_import.KINDS[REVIEW_KINDS[media]][2]
+    (id_field, validate_id), (_, validate_rating), (_, validate_note) = fields
+    title_id = validate_id(item.get("title_id", item.get(id_field)), "title_id")
+    return media, (title_id, validate_rating(item.get("rating"), "rating"), validate_note(item.get("note"), "note"))
+
+
+def submit(items, media=None, atomic=False):
+    """Validate and insert a batch of reviews. Returns a report with per-item results.
+
+    `media` fixes the type of every item. Items for titles that do not exist are errors.
+    With atomic=True any error leaves the whole batch unwritten; otherwise the valid
+    items are still committed. Raises ValueError if `items` is not a usable list.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("reviews must be a non-empty list")
+    if len(items) > MAX_ITEMS:
+        raise ValueError(f"at most {MAX_ITEMS} reviews per batch")
+
+    results = [None] * len(items)
+    valid = {}  # media -> [(index, row)]
+    for index, item in enumerate(items):
+        try:
+            item_media, row = _validate(item, media)
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        valid.setdefault(item_media, []).append((index, row))
+
+    by_database = {}
+    for item_media, rows in valid.items():
+        repository = media_repository.get(item_media)
+        by_database.setdefault(repository.database(), []).append((repository, rows))
+
+    written = {}
+    with ExitStack() as stack:
+        # Take every write lock first, in a fixed order, so existence checks hold until commit
+        connections = {}
+        for database in sorted(by_database):
+            conn = stack.enter_context(db_pool.connection(database))
+            conn.execute('BEGIN IMMEDIATE')
+            connections[database] = conn
+
+        for database, groups in by_database.items():
+            conn = connections[database]
+            for repository, rows in groups:
+                existing = repository.existing_ids(conn, (row[0] for _, row in rows))
+                for index, row in rows:
+                    if row[0] not in existing:
+                        results[index] = {"index": index, "status": "error",
+                                          "error": f"{repository.media} title {row[0]} does not exist"}
+
+        failed = any(result is not None for result in results)
+        if not (atomic and failed):
+            for database, groups in by_database.items():
+                conn = connections[database]
+                for repository, rows in groups:
+                    rows = [(index, row) for index, row in rows if results[index] is None]
+                    review_ids = repository.insert_reviews(conn, [row for _, row in rows])
+                    for (index, row), review_id in zip(rows, review_ids):
+                        if review_id is None:
+                            results[index] = {"index": index, "status": "error",
+                                              "error": f"{repository.media} title {row[0]} does not exist"}
+                        else:
+                            results[index] = {"index": index, "status": "created", "type": repository.media,
+                                              "title_id": row[0], "review_id": review_id}
+                            written.setdefault(repository.media, set()).add(row[0])
+            for conn in connections.values():
+                conn.commit()
+        # Connections left in a transaction are rolled back when they go back to the pool
+
+    for item_media, title_ids in written.items():
+        for title_id in title_ids:
+            response_cache.reviews_changed(item_media, title_id)
+
+    for index, result in enumerate(results):
+        if result is None:
+            results[index] = {"index": index, "status": "not_written"}
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "created": created,
+        "errors": sum(1 for result in results if result["status"] == "error"),
+        "committed": created > 0,
+        "results": results,
+    }
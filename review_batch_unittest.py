@@ -0,0 +1,63 @@
+# Unit tests for batch review submission
+
+import unittest
+import books
+import fixtures
+import movies
+import review_batch
+import tv_shows
+from api import app
+
+class TestReviewBatch(fixtures.FixtureTestCase):
+
+    fixtures = fixtures.TEMPLATES
+
+    def setUp(self):
+        """Creating one title of each media type in the fixture databases."""
+        super().setUp()
+        movies.add_movie("Inception", "Science Fiction")
+        tv_shows.add_show("Dark", "Science Fiction")
+        books.add_book("Dune", "Science Fiction")
+        self.client = app.test_client()
+
+    def test_mixed_batch_reports_every_item(self):
+        """Testing that valid items across media types are written and bad ones are reported in place."""
+        report = review_batch.submit([
+            {"type": "movies", "title_id": 1, "rating": 5, "note": "Amazing"},
+            {"type": "books", "book_id": 1, "rating": 4, "note": "Vast"},
+            {"type": "tv_shows", "title_id": 9, "rating": 3, "note": "Missing"},
+            {"type": "movies", "title_id": 1, "rating": 7, "note": "Too high"},
+            {"type": "comics", "title_id": 1, "rating": 2, "note": "Unknown"},
+            {"type": "tv_shows", "title_id": 1, "rating": 4.5, "note": None},
+        ])
+        self.assertEqual((report["created"], report["errors"]), (3, 3))
+        self.assertEqual([r["status"] for r in report["results"]],
+                         ["created", "created", "error", "error", "error", "created"])
+        self.assertEqual(report["results"][2]["error"], "tv_shows title 9 does not exist")
+        self.assertEqual(movies.search_reviews(1)["reviews"], [{"review_id": 1, "rating": 5, "note": "Amazing"}])
+        self.assertEqual(books.view_books(reviews="count")[0]["review_count"], 1)
+        self.assertEqual(len(tv_shows.search_reviews(1)["reviews"]), 1)
+
+    def test_atomic_batch_writes_nothing_on_error(self):
+        """Testing that ?atomic=true rejects the whole batch when one item is invalid."""
+        reviews = [{"title_id": 1, "rating": 5, "note": "Great"}, {"title_id": 2, "rating": 4, "note": "Gone"}]
+        response = self.client.post('/movies/reviews/batch?atomic=true', json=reviews)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r["status"] for r in response.get_json()["results"]], ["not_written", "error"])
+        self.assertEqual(movies.search_reviews(1)["reviews"], [])
+
+        response = self.client.post('/movies/reviews/batch', json={"reviews": reviews})
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.get_json()["results"][0]["review_id"], 1)
+
+    def test_batch_routes(self):
+        """Testing the status codes of the batch endpoints."""
+        response = self.client.post('/reviews/batch', json=[{"type": "books", "title_id": 1, "rating": 2, "note": "Dry"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get('/books/1').get_json()["reviews"][0]["note"], "Dry")
+        self.assertEqual(self.client.post('/reviews/batch', json=[]).status_code, 400)
+        self.assertEqual(self.client.post('/reviews/batch', json={"reviews": "nope"}).status_code, 400)
+        self.assertEqual(self.client.post('/comics/reviews/batch', json=[{}]).status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+# Write queue for single review submissions (POST /<media>/<id>/reviews and the data
+# modules' add_review functions).
+#
+# Every review used to be its own INSERT + COMMIT on the caller's thread, so a burst of
+# submitters queued up on SQLite's write lock. Now callers put the review on a bounded
+# queue and wait; one writer thread takes whatever has queued up (up to MAX_BATCH) and
+# inserts it with one transaction per database file - a group commit, so N waiting
+# reviews cost one commit instead of N. Callers still get the new review id back.
+#
+# Backpressure: when DEPTH reviews are already waiting, submit raises QueueFull (api.py
+# answers 429 with Retry-After) instead of letting the backlog grow; when the writer is
+# stopped or cannot get the write lock within busy_timeout, WriterUnavailable (503).
+# GET /stats/review_queue reports depth, batch sizes and commit / wait latency.
+# REVIEW_QUEUE=0 turns the queue off and inserts on the caller's thread as before.
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+import db_pool
+import metrics
+import response_cache
+
+ENABLED = os.environ.get("REVIEW_QUEUE", "1") == "1"
+
+# Reviews allowed to wait for the writer before new ones are refused
+DEPTH = int(os.environ.get("REVIEW_QUEUE_DEPTH", 1000))
+
+# Most reviews committed in one transaction
+MAX_BATCH = int(os.environ.get("REVIEW_QUEUE_BATCH", 200))
+
+# Seconds the writer lingers after the first review of a batch for more to arrive
+LINGER = float(os.environ.get("REVIEW_QUEUE_LINGER_MS", 0)) / 1000
+
+# Seconds a caller waits for its review to be committed before giving up with 503
+COMMIT_TIMEOUT = float(os.environ.get("REVIEW_QUEUE_TIMEOUT", 10))
+
+# Seconds clients are asked to wait (Retry-After) when the queue is full
+RETRY_AFTER = 1
+
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class QueueFull(Exception):
+    """Raised by submit when DEPTH reviews are already waiting."""
+
+
+class WriterUnavailable(Exception):
+    """Raised by submit when the writer is stopped or the database stayed locked."""
+
+
+class _Item:
+    __slots__ = ("repository", "database", "row", "future", "queued_at")
+
+    def __init__(self, repository, row):
+        self.repository = repository
+        self.database = repository.database()
+        self.row = row
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class ReviewQueue:
+    """Bounded review queue drained by one group-committing writer thread."""
+
+    def __init__(self, depth=DEPTH, max_batch=MAX_BATCH, linger=LINGER, commit_timeout=COMMIT_TIMEOUT):
+        self.depth = depth
+        self.max_batch = max_batch
+        self.linger = linger
+        self.commit_timeout = commit_timeout
+        self._queue = queue.Queue(maxsize=depth)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.counters = {"submitted": 0, "committed": 0, "rejected": 0, "failed": 0, "timed_out": 0,
+                         "batches": 0, "transactions": 0}
+        self.peak_depth = 0
+        self.batch_size = metrics.Histogram(BATCH_BUCKETS)
+        self.commit_latency = metrics.Histogram(LATENCY_BUCKETS)
+        self.wait_latency = metrics.Histogram(LATENCY_BUCKETS)
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._stopping:
+                raise WriterUnavailable("The review writer is shut down")
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, repository, title_id, rating, note):
+        """Queue one review and wait for its commit. Returns the new review id.
+
+        The id is None where the consolidated layout rejected the row, as with
+        MediaRepository.add_review.
+        """
+        self._ensure_writer()
+        item = _Item(repository, (title_id, rating, note))
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.counters["rejected"] += 1
+            raise QueueFull(f"{self.depth} reviews are already waiting to be written") from None
+        with self._lock:
+            self.counters["submitted"] += 1
+            self.peak_depth = max(self.peak_depth, self._queue.qsize())
+        try:
+            return item.future.result(self.commit_timeout)
+        except TimeoutError:
+            if item.future.cancel():
+                with self._lock:
+                    self.counters["timed_out"] += 1
+                raise WriterUnavailable(f"The review was not written within {self.commit_timeout}s") from None
+            return item.future.result()  # the writer is committing it right now
+
+    # Writer thread
+
+    def _take_batch(self):
+        """Block for the next review, then take whatever else is waiting, up to max_batch.
+
+        Returns (batch, stop) where stop is True once the stop marker has been taken.
+        """
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._take_batch()
+            # Callers that timed out have cancelled their item; skip those
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        by_database = {}
+        for item in batch:
+            by_database.setdefault(item.database, []).append(item)
+        start = time.perf_counter()
+        transactions = 0
+        for database, items in by_database.items():
+            try:
+                self._commit(database, items)
+                transactions += 1
+            except sqlite3.Error:
+                # One bad row must not fail its neighbours: retry them one transaction each
+                for item in items:
+                    try:
+                        self._commit(database, [item])
+                        transactions += 1
+                    except Exception as e:
+                        self._fail(item, e)
+            except Exception as e:  # e.g. db_pool.PoolTimeout; the writer must keep running
+                for item in items:
+                    self._fail(item, e)
+        finished = time.perf_counter()
+        with self._lock:
+            self.counters["batches"] += 1
+            self.counters["transactions"] += transactions
+            self.batch_size.observe(len(batch))
+            self.commit_latency.observe(finished - start)
+            for item in batch:
+                self.wait_latency.observe(finished - item.queued_at)
+
+    def _commit(self, database, items):
+        with db_pool.connection(database) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            review_ids = []
+            for repository in {item.repository for item in items}:
+                owned = [item for item in items if item.repository is repository]
+                review_ids.extend(zip(owned, repository.insert_reviews(conn, [item.row for item in owned])))
+            conn.commit()
+        for item, review_id in review_ids:
+            response_cache.reviews_changed(item.repository.media, item.row[0])
+            item.future.set_result(review_id)
+        with self._lock:
+            self.counters["committed"] += len(items)
+
+    def _fail(self, item, error):
+        with self._lock:
+            self.counters["failed"] += 1
+        if isinstance(error, sqlite3.OperationalError) and "locked" in str(error):
+            error = WriterUnavailable("The database stayed locked; try again shortly")
+        item.future.set_exception(error)
+
+    def stop(self, timeout=None):
+        """Write everything already queued, then stop the writer."""
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": True,
+                "depth": self._queue.qsize(),
+                "max_depth": self.depth,
+                "peak_depth": self.peak_depth,
+                "max_batch": self.max_batch,
+                "writer_alive": self._thread is not None and self._thread.is_alive(),
+                **self.counters,
+                "batch_size": self.batch_size.stats(),
+                "commit_seconds": self.commit_latency.stats(),
+                "wait_seconds": self.wait_latency.stats(),
+            }
+
+
+writer = ReviewQueue()
+
+
+def add_review(repository, title_id, rating, note):
+    """Insert one review through the write queue (or directly when it is off)."""
+    if not ENABLED:
+        return repository.add_review(title_id, rating, note)
+    return writer.submit(repository, title_id, rating, note)
+
+
+def stats():
+    if not ENABLED:
+        return {"enabled": False}
+    return writer.stats()
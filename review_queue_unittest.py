@@ -0,0 +1,105 @@
+# Unit tests for the review write queue
+
+import sqlite3
+import threading
+import time
+import unittest
+from unittest import mock
+import books
+import fixtures
+import movies
+import review_queue
+from api import app
+
+def submit_in_threads(submit, count):
+    """Run submit(i) on `count` threads at once; returns {i: review id or exception}."""
+    results = {}
+    def run(i):
+        try:
+            results[i] = submit(i)
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.001)
+
+class TestReviewQueue(fixtures.FixtureTestCase):
+
+    # The writer thread commits on its own pooled connection while submitters read
+    fixtures = {movies: fixtures.MOVIES, books: fixtures.BOOKS}
+    mode = "snapshot"
+
+    def setUp(self):
+        """Creating one movie and one book in the fixture databases."""
+        super().setUp()
+        movies.add_movie("Inception", "Science Fiction")
+        books.add_book("Dune", "Science Fiction")
+
+    def test_concurrent_reviews_are_group_committed(self):
+        """Testing that simultaneous submitters share commits and each gets its own review id."""
+        queue = review_queue.ReviewQueue(linger=0.05)
+        results = submit_in_threads(lambda i: queue.submit(movies.repository, 1, 4, f"Review {i}"), 40)
+        queue.stop()
+        self.assertEqual(sorted(results.values()), list(range(1, 41)))
+        self.assertEqual(len(movies.search_reviews(1)["reviews"]), 40)
+        stats = queue.stats()
+        self.assertEqual(stats["committed"], 40)
+        self.assertLess(stats["batches"], 40)
+        self.assertEqual(stats["batch_size"]["count"], stats["batches"])
+
+    def test_full_queue_rejects_and_bad_rows_fail_alone(self):
+        """Testing the depth bound and that one failing row does not undo the rest of its batch."""
+        queue = review_queue.ReviewQueue(depth=2)
+        gate = threading.Event()
+        write = queue._write
+        results = {}
+        def submit(name, rating):
+            try:
+                results[name] = queue.submit(books.repository, 1, rating, name)
+            except Exception as e:
+                results[name] = e
+        with mock.patch.object(queue, "_write", side_effect=lambda batch: (gate.wait(), write(batch))):
+            threads = [threading.Thread(target=submit, args=("Held", 5))]
+            threads[0].start()
+            wait_for(lambda: queue.stats()["submitted"] == 1 and queue.stats()["depth"] == 0)
+            threads += [threading.Thread(target=submit, args=("No rating", None)),
+                        threading.Thread(target=submit, args=("Good", 4))]
+            for thread in threads[1:]:
+                thread.start()
+            wait_for(lambda: queue.stats()["depth"] == 2)
+            with self.assertRaises(review_queue.QueueFull):
+                queue.submit(books.repository, 1, 3, "Too many")
+            gate.set()
+            for thread in threads:
+                thread.join()
+        queue.stop()
+        self.assertIsInstance(results["No rating"], sqlite3.IntegrityError)
+        self.assertEqual([r["note"] for r in books.get_book(1)["reviews"]], ["Held", "Good"])
+        self.assertEqual(books.view_books(reviews="count")[0]["review_count"], 2)
+        stats = queue.stats()
+        self.assertEqual((stats["committed"], stats["rejected"], stats["failed"], stats["batches"]), (2, 1, 1, 2))
+
+    def test_api_backpressure_responses(self):
+        """Testing that POST reviews goes through the queue and overload maps to 429 / 503."""
+        client = app.test_client()
+        self.assertEqual(client.post('/movies/1/reviews', json={"rating": 5, "note": "Great"}).status_code, 201)
+        self.assertGreaterEqual(client.get('/stats/review_queue').get_json()["committed"], 1)
+        for error, status in ((review_queue.QueueFull("full"), 429), (review_queue.WriterUnavailable("down"), 503)):
+            with mock.patch.object(review_queue, "add_review", side_effect=error):
+                response = client.post('/movies/1/reviews', json={"rating": 5, "note": "Again"})
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(len(movies.search_reviews(1)["reviews"]), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# Full-text search across movies, TV shows and books (titles, genres and review notes),
+# backed by the title_fts / review_fts FTS5 indexes created in database_setup.
+
+import math
+import os
+import re
+
+import books
+import db_pool
+import media_repository
+import movies
+import tv_shows
+
+# Largest page a client may ask for with ?limit=
+MAX_RESULTS = 100
+
+# Deepest result a client may page to with ?offset=; ranking needs every earlier hit
+MAX_OFFSET = 1000
+
+SCOPES = ("all", "titles", "reviews")
+
+# bm25 costs a few microseconds per matching row, so a stopword-like query over a
+# million reviews scores hundreds of thousands of rows. Setting RANK_WINDOW ranks only
+# the newest RANK_WINDOW matches of each index instead; the indexes that had older
+# matches left out are reported (X-Search-Truncated on GET /search). 0, the default,
+# ranks every match.
+RANK_WINDOW = int(os.environ.get("SEARCH_RANK_WINDOW", 0))
+
+# media types that can be searched, each backed by its MediaRepository
+SOURCES = tuple(module.repository.media for module in (movies, tv_shows, books))
+
+
+def build_match(q):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted so user input can never be read as FTS5 syntax.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _window_floor(cursor, fts, source_sql, match, window):
+    """Rowid below which matches are left unranked: that of the match just older than the
+    newest `window`, or 0 when there are no more matches than that (or no window).
+
+    `source_sql` is the FROM ... WHERE of the ranking query, so under the consolidated
+    layout only this media type's matches count towards the window.
+    """
+    if not window:
+        return 0
+    cursor.execute(f'SELECT {fts}.rowid {source_sql} ORDER BY {fts}.rowid DESC LIMIT 1 OFFSET ?', (match, 0, window))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+# FTS5's bm25 k1: one term adds at most idf * (K1 + 1) to a document's score
+BM25_K1 = 1.2
+
+
+def _index_rows(cursor, fts):
+    """Rows in an FTS5 index: the first varint of its averages record (block 1 of %_data)."""
+    row = cursor.execute(f'SELECT block FROM {fts}_data WHERE id = 1').fetchone()
+    value = 0
+    for i, byte in enumerate(row[0][:9] if row else b""):
+        if i == 8:
+            return (value << 8) | byte
+        value = (value << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            return value
+    return value
+
+
+def _score_ceiling(cursor, fts, terms):
+    """Highest bm25 an index can give any row for a query of `terms` terms: every term as
+    rare as possible (in one row) and saturated. It depends only on the index, so every
+    hit from one index, of any media type, is divided by the same number."""
+    rows = _index_rows(cursor, fts)
+    idf = max(1e-6, math.log((rows - 0.5) / 1.5)) if rows > 1 else 1e-6
+    return terms * idf * (BM25_K1 + 1)
+
+
+def _search_source(media, match, scope, limit, window):
+    """Hits of one media type, and the indexes ("media/titles", "media/reviews") whose
+    older matches fell outside the rank window."""
+    repository = media_repository.get(media)
+    titles, title_column, title_fk = repository.table, repository.title_column, repository.title_fk
+    window = max(window, limit) if window else 0
+    terms = match.count('"') // 2
+    hits, truncated = [], []
+    with db_pool.connection(repository.database()) as conn:
+        cursor = conn.cursor()
+        if scope in ("all", "titles"):
+            source_sql = f'''
+                FROM title_fts JOIN {titles} ON {titles}.id = title_fts.rowid
+                WHERE title_fts MATCH ? AND title_fts.rowid > ?'''
+            floor = _window_floor(cursor, "title_fts", source_sql, match, window)
+            if floor:
+                truncated.append(f"{media}/titles")
+            ceiling = _score_ceiling(cursor, "title_fts", terms)
+            cursor.execute(f'''
+                SELECT {titles}.id, {titles}.{title_column}, {titles}.genre,
+                       highlight(title_fts, 0, '[', ']'), bm25(title_fts)
+                {source_sql}
+                ORDER BY rank LIMIT ?
+            ''', (match, floor, limit))
+            hits.extend(
+                {"media": media, "kind": "title", "id": r[0], "title": r[1], "genre": r[2],
+                 "snippet": r[3], "score": -r[4] / ceiling}
+                for r in cursor.fetchall()
+            )
+        if scope in ("all", "reviews"):
+            source_sql = f'''
+                FROM review_fts
+                JOIN reviews ON reviews.id = review_fts.rowid
+                JOIN {titles} ON {titles}.id = reviews.{title_fk}
+                WHERE review_fts MATCH ? AND review_fts.rowid > ?'''
+            floor = _window_floor(cursor, "review_fts", source_sql, match, window)
+            if floor:
+                truncated.append(f"{media}/reviews")
+            ceiling = _score_ceiling(cursor, "review_fts", terms)
+            cursor.execute(f'''
+                SELECT {titles}.id, {titles}.{title_column}, {titles}.genre, reviews.id, reviews.rating,
+                       snippet(review_fts, 0, '[', ']', '…', 12), bm25(review_fts)
+                {source_sql}
+                ORDER BY rank LIMIT ?
+            ''', (match, floor, limit))
+            hits.extend(
+                {"media": media, "kind": "review", "id": r[0], "title": r[1], "genre": r[2],
+                 "review_id": r[3], "rating": r[4], "snippet": r[5], "score": -r[6] / ceiling}
+                for r in cursor.fetchall()
+            )
+    return hits, truncated
+
+
+def search_results(q, media=None, scope="all", limit=20, offset=0, window=None):
+    """(hits, truncated) for q: ranked hits, best first, and the indexes whose older
+    matches were not ranked because of the rank window (empty unless one is set).
+
+    Scores are negated bm25 as a fraction of the highest the hit's index could give
+    (see _score_ceiling), so indexes of different sizes share one scale; higher is better.
+    """
+    match = build_match(q)
+    if match is None:
+        return [], []
+    window = RANK_WINDOW if window is None else window
+    wanted = offset + limit
+    hits, truncated = [], []
+    for name in media or SOURCES:
+        source_hits, source_truncated = _search_source(name, match, scope, wanted, window)
+        hits.extend(source_hits)
+        truncated.extend(source_truncated)
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits[offset:wanted], truncated
+
+
+def search(q, media=None, scope="all", limit=20, offset=0, window=None):
+    """Ranked hits for q, best first; see search_results."""
+    return search_results(q, media, scope, limit, offset, window)[0]
+
+
+def parse_search_args(args):
+    """Read q, type, scope, limit and offset from GET /search's query args.
+
+    Raises ValueError with a client-facing message when an argument is invalid.
+    """
+    q = args.get("q", "").strip()
+    if not q or build_match(q) is None:
+        raise ValueError("q is required")
+
+    media = args.get("type")
+    if media:
+        media = [m.strip() for m in media.split(",") if m.strip()]
+        unknown = [m for m in media if m not in SOURCES]
+        if unknown:
+            raise ValueError(f"type must be any of: {', '.join(SOURCES)}")
+
+    scope = args.get("scope", "all")
+    if scope not in SCOPES:
+        raise ValueError(f"scope must be one of: {', '.join(SCOPES)}")
+
+    limit = args.get("limit", "20")
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_RESULTS:
+        raise ValueError(f"limit must be an integer between 1 and {MAX_RESULTS}")
+
+    offset = args.get("offset", "0")
+    if not offset.isdigit() or int(offset) > MAX_OFFSET:
+        raise ValueError(f"offset must be an integer between 0 and {MAX_OFFSET}")
+
+    return {"q": q, "media": media or None, "scope": scope, "limit": int(limit), "offset": int(offset)}
@@ -0,0 +1,115 @@
+# Unit tests for full-text search
+
+import unittest
+from unittest import mock
+import books
+import fixtures
+import media_repository
+import movies
+import search
+import tv_shows
+from api import app
+
+class TestSearch(fixtures.FixtureTestCase):
+
+    # Migrated databases for all three media types, and a consolidated catalog
+    fixtures = {**fixtures.TEMPLATES, media_repository.CONSOLIDATED_DATABASE: fixtures.CATALOG}
+
+    def setUp(self):
+        """Adding titles and reviews that mention dreams."""
+        super().setUp()
+        movies.add_movie("Inception", "Science Fiction")
+        movies.add_movie("Interstellar", "Science Fiction")
+        movies.add_review(1, 5, "A dream within a dream, brilliant")
+        tv_shows.add_show("Dark", "Science Fiction")
+        tv_shows.add_review(1, 4, "Dreamlike and confusing")
+        books.add_book("Dune", "Science Fiction")
+
+    def test_prefix_search_across_media(self):
+        """Testing that the last word matches as a prefix in titles and reviews of every type."""
+        hits = search.search("drea")
+        self.assertEqual(
+            sorted((h["media"], h["kind"], h["id"]) for h in hits),
+            [("movies", "review", 1), ("tv_shows", "review", 1)],
+        )
+        self.assertIn("[dream]", next(h for h in hits if h["media"] == "movies")["snippet"])
+
+    def test_titles_and_genres_are_searchable(self):
+        """Testing title and genre matches, scope and type filters."""
+        hits = search.search("science fiction", scope="titles")
+        self.assertEqual(len(hits), 4)
+        hits = search.search("inter", media=["movies"], scope="titles")
+        self.assertEqual([h["title"] for h in hits], ["Interstellar"])
+        self.assertEqual(hits[0]["snippet"], "[Interstellar]")
+
+    def test_index_follows_writes(self):
+        """Testing that edits and deletes are reflected in search results."""
+        movies.edit_review(1, 1, note="Mind bending heist")
+        self.assertEqual(search.search("dream", media=["movies"]), [])
+        self.assertEqual(len(search.search("heist", media=["movies"])), 1)
+        movies.delete_movie(1)
+        self.assertEqual(search.search("heist inception", media=["movies"]), [])
+        self.assertEqual(search.search("inception", media=["movies"]), [])
+
+    def test_user_input_is_not_fts_syntax(self):
+        """Testing that FTS5 operators in the query are treated as plain words."""
+        self.assertEqual(search.search('dune" OR "x'), [])
+        self.assertEqual(search.build_match("NEAR(a b)"), '"NEAR" "a" "b"*')
+
+    def test_search_endpoint(self):
+        """Testing GET /search with ranking, paging and validation."""
+        client = app.test_client()
+        response = client.get('/search?q=science&scope=titles&limit=2')
+        self.assertEqual(response.status_code, 200)
+        first = response.get_json()
+        self.assertEqual(len(first), 2)
+        second = client.get('/search?q=science&scope=titles&limit=2&offset=2').get_json()
+        self.assertEqual(len(second), 2)
+        self.assertGreaterEqual(first[-1]["score"], second[0]["score"])
+        self.assertEqual(client.get('/search').status_code, 400)
+        self.assertEqual(client.get('/search?q=x&type=games').status_code, 400)
+
+    def test_rank_window_is_reported(self):
+        """Testing that a rank window leaves older matches out and says so."""
+        for note in ("dream one", "dream two", "dream three"):
+            movies.add_review(2, 3, note)
+        hits, truncated = search.search_results("dream", media=["movies"], scope="reviews", limit=1, window=2)
+        self.assertEqual(truncated, ["movies/reviews"])
+        self.assertIn(hits[0]["review_id"], (3, 4))
+        self.assertGreater(hits[0]["score"], 0)
+        self.assertEqual(search.search_results("dream", media=["movies"], scope="reviews", window=0)[1], [])
+        self.assertEqual(len(search.search("dream", media=["movies"], scope="reviews", window=0)), 4)
+
+    def test_weak_title_ranks_below_strong_review(self):
+        """Testing that title and review hits merge on one relevance scale, not per-index rankings."""
+        for i in range(8):
+            movies.add_movie(f"Filler {i}", "Drama")
+            movies.add_review(2, 3, f"Nothing to see {i}")
+        movies.add_movie("The Long Quiet Dream Of A Forgotten Winter Night", "Drama")
+        movies.add_review(2, 5, "Dream dream dream")
+        hits = search.search("dream", media=["movies"])
+        order = [h["snippet"] for h in hits]
+        self.assertLess(order.index("[Dream] [dream] [dream]"),
+                        order.index("The Long Quiet [Dream] Of A Forgotten Winter Night"))
+        self.assertTrue(all(0 < h["score"] <= 1 for h in hits))
+
+    def test_consolidated_window_counts_only_the_searched_media(self):
+        """Testing that newer matches of other media types don't push a movie out of the window."""
+        self.enterContext(mock.patch.dict(media_repository.REPOSITORIES))
+        for module in (movies, tv_shows, books):
+            repository = module.repository
+            media_repository.MediaRepository(
+                repository.media, repository.table, repository.title_column, repository.title_fk,
+                lambda: media_repository.CONSOLIDATED_DATABASE, review_counter=repository.review_counter,
+                layout="consolidated")
+        movie = media_repository.get("movies").add_title("Inception", "Science Fiction")
+        media_repository.get("movies").add_review(movie, 5, "A dream")
+        book = media_repository.get("books").add_title("Dune", "Science Fiction")
+        for _ in range(3):
+            media_repository.get("books").add_review(book, 4, "Dreamy")
+        hits, truncated = search.search_results("dream", media=["movies"], scope="reviews", limit=1, window=2)
+        self.assertEqual([(h["media"], h["id"]) for h in hits], [("movies", movie)])
+        self.assertEqual(truncated, [])
+
+if __name__ == '__main__':
+    unittest.main()
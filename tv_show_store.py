@@ -0,0 +1,270 @@
+# Append-only storage engine for the standalone TV show tab (tv_showsTab.py).
+#
+# The tab used to load and rewrite the whole tv_show_reviews.json file on every click.
+# Now every change is one JSON line appended to tv_show_reviews.log:
+#   {"op": "show", "id": 3, "title": "Dark"}
+#   {"op": "review", "show_id": 3, "review_id": 1, "rating": 4.5, "note": "..."}
+#   {"op": "delete_show", "id": 3}
+#   {"op": "delete_review", "show_id": 3, "review_id": 1}
+# The library is held in an in-memory index built by replaying the log on first use, so
+# adds and deletes cost one small append and views do no file I/O at all.
+#
+# Writes are serialised by a lock and each record goes out in a single write() on an
+# O_APPEND file; a torn last line (no trailing newline) left by a crash is dropped on the
+# next replay, while an unreadable record anywhere else raises CorruptLog. Ids come
+# from counters that only move forward, so a deleted show's id is never handed out again.
+# When deleted records outnumber live ones the log is rewritten to a temporary file and
+# swapped in with os.replace. The first open migrates an existing tv_show_reviews.json;
+# to do that (or a compaction) ahead of time:
+#   python tv_show_store.py migrate|compact [--log tv_show_reviews.log] [--json tv_show_reviews.json]
+
+import argparse
+import json
+import os
+import threading
+
+LOG_FILE = 'tv_show_reviews.log'
+LEGACY_JSON_FILE = 'tv_show_reviews.json'
+
+# fsync after every append (slower, survives power loss) instead of leaving it to the OS
+FSYNC = os.environ.get("TV_SHOW_STORE_FSYNC", "0") == "1"
+
+# Compact once dead records exceed both this and the number of live ones
+COMPACT_SLACK = 1000
+
+
+class CorruptLog(Exception):
+    """Raised when a complete record in the log cannot be read."""
+
+
+class ShowStore:
+    """TV shows and their reviews, persisted as an append-only log."""
+
+    def __init__(self, path=LOG_FILE, legacy_json=LEGACY_JSON_FILE, fsync=None):
+        self.path = path
+        self.legacy_json = legacy_json
+        self.fsync = FSYNC if fsync is None else fsync
+        self._lock = threading.RLock()
+        self._shows = None  # id -> {"id", "title", "reviews": {review_id: review}, "next_review_id"}
+        self._next_show_id = 1
+        self._records = 0
+        self._live = 0  # shows plus reviews in the index
+        self._file = None
+
+    # Index
+
+    def _load(self):
+        """Build the index on first use; every public method calls this under the lock."""
+        if self._shows is not None:
+            return
+        self._shows = {}
+        if not os.path.exists(self.path) and self.legacy_json and os.path.exists(self.legacy_json):
+            self._migrate_json()
+        good_offset = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as file:
+                for number, line in enumerate(file, 1):
+                    if not line.endswith(b"\n"):
+                        break  # torn write at the tail
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        self._shows, self._next_show_id, self._records, self._live = None, 1, 0, 0
+                        raise CorruptLog(f"{self.path}: record on line {number} is unreadable") from None
+                    self._apply(record)
+                    self._records += 1
+                    good_offset += len(line)
+            if good_offset != os.path.getsize(self.path):
+                with open(self.path, 'r+b') as file:
+                    file.truncate(good_offset)
+        self._file = open(self.path, 'ab')
+
+    def _apply(self, record):
+        op = record["op"]
+        if op == "show":
+            self._shows[record["id"]] = {"id": record["id"], "title": record["title"], "reviews": {},
+                                         "next_review_id": record.get("next_review_id", 1)}
+            self._live += 1
+            self._next_show_id = max(self._next_show_id, record["id"] + 1)
+        elif op == "review":
+            show = self._shows.get(record["show_id"])
+            if show is not None:
+                self._live += record["review_id"] not in show["reviews"]
+                show["reviews"][record["review_id"]] = {
+                    "review_id": record["review_id"], "rating": record["rating"], "note": record["note"],
+                }
+                show["next_review_id"] = max(show["next_review_id"], record["review_id"] + 1)
+        elif op == "delete_show":
+            show = self._shows.pop(record["id"], None)
+            if show is not None:
+                self._live -= 1 + len(show["reviews"])
+        elif op == "delete_review":
+            show = self._shows.get(record["show_id"])
+            if show is not None and show["reviews"].pop(record["review_id"], None) is not None:
+                self._live -= 1
+        elif op == "ids":
+            self._next_show_id = max(self._next_show_id, record["next_show_id"])
+
+    def _append(self, record):
+        self._file.write(json.dumps(record).encode("utf-8") + b"\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._apply(record)
+        self._records += 1
+
+    def _snapshot(self):
+        """The shortest log that rebuilds the current index, including the id counters."""
+        yield {"op": "ids", "next_show_id": self._next_show_id}
+        for show in self._shows.values():
+            yield {"op": "show", "id": show["id"], "title": show["title"], "next_review_id": show["next_review_id"]}
+            for review in show["reviews"].values():
+                yield dict(review, op="review", show_id=show["id"])
+
+    def _write_log(self, records):
+        """Atomically replace the log with `records`."""
+        tmp = self.path + '.tmp'
+        count = 0
+        with open(tmp, 'wb') as file:
+            for record in records:
+                file.write(json.dumps(record).encode("utf-8") + b"\n")
+                count += 1
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.path)
+        return count
+
+    def _maybe_compact(self):
+        if self._records - self._live > max(COMPACT_SLACK, self._live):
+            self.compact()
+
+    def _migrate_json(self):
+        """Write the log from the old JSON file, keeping ids except where it had duplicates.
+
+        The old store took ids from len(), so after a delete two shows (or two reviews of
+        one show) could share an id. The first keeps it, as lookups found the first match;
+        later duplicates get fresh ids past the largest one in the file.
+        """
+        with open(self.legacy_json, 'r') as file:
+            shows = json.load(file).get("shows", [])
+        next_show_id = max((show["id"] for show in shows), default=0) + 1
+        seen = set()
+        records = []
+        for show in shows:
+            show_id = show["id"]
+            if show_id in seen:
+                show_id, next_show_id = next_show_id, next_show_id + 1
+            seen.add(show_id)
+            reviews = show.get("reviews", [])
+            next_review_id = max((review["review_id"] for review in reviews), default=0) + 1
+            records.append({"op": "show", "id": show_id, "title": show["title"]})
+            seen_reviews = set()
+            for review in reviews:
+                review_id = review["review_id"]
+                if review_id in seen_reviews:
+                    review_id, next_review_id = next_review_id, next_review_id + 1
+                seen_reviews.add(review_id)
+                records.append({"op": "review", "show_id": show_id, "review_id": review_id,
+                                "rating": review["rating"], "note": review.get("note")})
+        self._write_log(records)
+
+    # Public API
+
+    def add_show(self, title):
+        """Add a show and return its id."""
+        with self._lock:
+            self._load()
+            show_id = self._next_show_id
+            self._append({"op": "show", "id": show_id, "title": title})
+            return show_id
+
+    def add_review(self, show_id, rating, note):
+        """Add a review and return (show title, review id), or None if the show does not exist."""
+        with self._lock:
+            self._load()
+            show = self._shows.get(show_id)
+            if show is None:
+                return None
+            review_id = show["next_review_id"]
+            self._append({"op": "review", "show_id": show_id, "review_id": review_id, "rating": rating, "note": note})
+            return show["title"], review_id
+
+    def delete_show(self, show_id):
+        """Delete a show and its reviews. Returns False if it did not exist."""
+        with self._lock:
+            self._load()
+            if show_id not in self._shows:
+                return False
+            self._append({"op": "delete_show", "id": show_id})
+            self._maybe_compact()
+            return True
+
+    def delete_review(self, show_id, review_id):
+        """Delete one review. Returns the show title, or None / False if the show / review is missing."""
+        with self._lock:
+            self._load()
+            show = self._shows.get(show_id)
+            if show is None:
+                return None
+            if review_id not in show["reviews"]:
+                return False
+            self._append({"op": "delete_review", "show_id": show_id, "review_id": review_id})
+            self._maybe_compact()
+            return show["title"]
+
+    def get_show(self, show_id):
+        with self._lock:
+            self._load()
+            show = self._shows.get(show_id)
+            if show is None:
+                return None
+            return {"id": show["id"], "title": show["title"], "reviews": [dict(r) for r in show["reviews"].values()]}
+
+    def shows(self):
+        """Every show with its reviews, in the order they were added, shaped like the old JSON file."""
+        with self._lock:
+            self._load()
+            return [
+                {"id": show["id"], "title": show["title"], "reviews": [dict(r) for r in show["reviews"].values()]}
+                for show in self._shows.values()
+            ]
+
+    def compact(self):
+        """Rewrite the log down to the live data."""
+        with self._lock:
+            self._load()
+            self._file.close()
+            self._records = self._write_log(self._snapshot())
+            self._file = open(self.path, 'ab')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = None
+            self._shows = None
+            self._records = 0
+            self._live = 0
+            self._next_show_id = 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the TV show tab's append-only log.")
+    parser.add_argument("command", choices=["migrate", "compact"])
+    parser.add_argument("--log", default=LOG_FILE)
+    parser.add_argument("--json", default=LEGACY_JSON_FILE)
+    args = parser.parse_args(argv)
+
+    existed = os.path.exists(args.log)
+    store = ShowStore(args.log, args.json)
+    if args.command == "compact":
+        store.compact()
+    shows = store.shows()
+    store.close()
+    if args.command == "migrate" and existed:
+        print(f"{args.log} already exists; nothing migrated")
+    print(f"{len(shows)} shows, {sum(len(show['reviews']) for show in shows)} reviews in {args.log}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Unit tests for the TV show tab's append-only store
+
+import json
+import os
+import unittest
+import tv_show_store
+
+TEST_LOG = 'test_tv_show_store.log'
+TEST_JSON = 'test_tv_show_store.json'
+
+class TestShowStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = tv_show_store.ShowStore(TEST_LOG, TEST_JSON)
+
+    def tearDown(self):
+        """Closing the store and removing its files."""
+        self.store.close()
+        for path in (TEST_LOG, TEST_LOG + '.tmp', TEST_JSON):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def reopen(self):
+        self.store.close()
+        self.store = tv_show_store.ShowStore(TEST_LOG, TEST_JSON)
+
+    def test_ids_stay_unique_after_deletes_and_restarts(self):
+        """Testing that deleted show and review ids are never reused, even after a replay."""
+        self.assertEqual(self.store.add_show("Dark"), 1)
+        self.assertEqual(self.store.add_show("Lost"), 2)
+        self.assertEqual(self.store.add_review(1, 4.5, "Dreamlike"), ("Dark", 1))
+        self.assertEqual(self.store.add_review(1, 5, "Haunting"), ("Dark", 2))
+        self.assertIsNone(self.store.add_review(9, 3, "Missing"))
+        self.assertTrue(self.store.delete_show(2))
+        self.assertFalse(self.store.delete_show(2))
+        self.assertEqual(self.store.delete_review(1, 2), "Dark")
+        self.assertIs(self.store.delete_review(1, 2), False)
+
+        self.reopen()
+        self.assertEqual(self.store.add_show("Severance"), 3)
+        self.assertEqual(self.store.add_review(1, 3, "Again"), ("Dark", 3))
+        self.assertEqual([show["title"] for show in self.store.shows()], ["Dark", "Severance"])
+        self.assertEqual([r["review_id"] for r in self.store.get_show(1)["reviews"]], [1, 3])
+
+    def test_torn_tail_and_compaction(self):
+        """Testing that a half-written last record is dropped and compaction keeps data and counters."""
+        self.store.add_show("Dark")
+        self.store.add_show("Lost")
+        self.store.delete_show(2)
+        self.store.close()
+        with open(TEST_LOG, 'ab') as file:
+            file.write(b'{"op": "show", "id": 7, "ti')
+        self.reopen()
+        self.assertEqual([show["id"] for show in self.store.shows()], [1])
+        self.store.compact()
+        with open(TEST_LOG) as file:
+            self.assertEqual(len(file.readlines()), 2)
+        self.reopen()
+        self.assertEqual(self.store.add_show("Severance"), 3)
+
+    def test_corrupt_record_before_the_tail_raises(self):
+        """Testing that a damaged complete record stops the replay instead of truncating later records."""
+        self.store.add_show("Dark")
+        self.store.close()
+        with open(TEST_LOG, 'ab') as file:
+            file.write(b'{"op": "show", "id": 7, "ti\n{"op": "show", "id": 8, "title": "Lost"}\n')
+        size = os.path.getsize(TEST_LOG)
+        self.reopen()
+        with self.assertRaises(tv_show_store.CorruptLog):
+            self.store.shows()
+        self.assertEqual(os.path.getsize(TEST_LOG), size)
+
+    def test_migrates_legacy_json(self):
+        """Testing that the old JSON file is imported once, with colliding ids made unique."""
+        legacy = {"shows": [
+            {"id": 1, "title": "Dark", "reviews": [{"review_id": 1, "rating": 4.5, "note": "Dreamlike"}]},
+            {"id": 2, "title": "Lost", "reviews": []},
+            {"id": 2, "title": "Fargo", "reviews": [{"review_id": 1, "rating": 4, "note": "Snowy"},
+                                                    {"review_id": 1, "rating": 5, "note": "Again"}]},
+        ]}
+        with open(TEST_JSON, 'w') as file:
+            json.dump(legacy, file)
+        shows = self.store.shows()
+        self.assertEqual([(show["id"], show["title"]) for show in shows], [(1, "Dark"), (2, "Lost"), (3, "Fargo")])
+        self.assertEqual([r["review_id"] for r in shows[2]["reviews"]], [1, 2])
+        os.remove(TEST_JSON)
+        self.reopen()
+        self.assertEqual(len(self.store.shows()), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,93 +1,56 @@
 #Author: Mastewal
 
 
-import sqlite3
+import media_repository
+import review_queue
 
-DATABASE = 'tv_shows_reviews.db'
+# Keys a GET /tv_shows client may pick with ?fields=
+LIST_FIELDS = ("id", "title", "genre", "reviews", "review_count")
+
+DATABASE = media_repository.database_file('tv_shows_reviews.db')
+
+repository = media_repository.MediaRepository("tv_shows", "tv_shows", "title", "tv_show_id", lambda: DATABASE)
 
 def add_show(title, genre):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO tv_shows (title, genre) VALUES (?, ?)', (title, genre))
-    conn.commit()
-    conn.close()
+    repository.add_title(title, genre)
     return {"message": f"TV Show '{title}' added successfully."}
 
 def add_review(tv_show_id, rating, note):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO reviews (tv_show_id, rating, note) VALUES (?, ?, ?)', (tv_show_id, rating, note))
-    conn.commit()
-    conn.close()
+    # Group-committed by the review write queue; raises review_queue.QueueFull under overload.
+    # None when the consolidated layout rejected the id as not a TV show.
+    if review_queue.add_review(repository, tv_show_id, rating, note) is None:
+        return None
     return {"message": f"Review added to TV Show ID {tv_show_id}."}
 
 def edit_review(tv_show_id, review_id, rating=None, note=None):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    if rating:
-        cursor.execute('UPDATE reviews SET rating = ? WHERE id = ? AND tv_show_id = ?', (rating, review_id, tv_show_id))
-    if note:
-        cursor.execute('UPDATE reviews SET note = ? WHERE id = ? AND tv_show_id = ?', (note, review_id, tv_show_id))
-    conn.commit()
-    conn.close()
+    repository.edit_review(tv_show_id, review_id, rating or None, note or None)
     return {"message": f"Review ID {review_id} for TV Show ID {tv_show_id} updated."}
 
 def delete_review(tv_show_id, review_id):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM reviews WHERE id = ? AND tv_show_id = ?', (review_id, tv_show_id))
-    conn.commit()
-    conn.close()
+    repository.delete_review(tv_show_id, review_id)
     return {"message": f"Review ID {review_id} deleted from TV Show ID {tv_show_id}."}
 
 def delete_show(tv_show_id):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM reviews WHERE tv_show_id = ?', (tv_show_id,))
-    cursor.execute('DELETE FROM tv_shows WHERE id = ?', (tv_show_id,))
-    conn.commit()
-    conn.close()
+    repository.delete_title(tv_show_id)
     return {"message": f"TV Show ID {tv_show_id} and its reviews have been deleted."}
 
-def view_reviews():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM tv_shows')
-    tv_shows = cursor.fetchall()
-    result = []
-    for tv_show in tv_shows:
-        cursor.execute('SELECT * FROM reviews WHERE tv_show_id = ?', (tv_show[0],))
-        reviews = cursor.fetchall()
-        result.append({
-            "id": tv_show[0],
-            "title": tv_show[1],
-            "genre": tv_show[2],
-            "reviews": [{"review_id": r[0], "rating": r[2], "note": r[3]} for r in reviews]
-        })
-    conn.close()
-    return result
+def view_reviews(after_id=None, limit=None, reviews="full"):
+    # Keyset pagination: tv_shows with id > after_id, at most `limit` of them.
+    # reviews="full" embeds reviews via one LEFT JOIN, "count" adds review_count, "none" skips them
+    return repository.list_titles(after_id, limit, reviews)
 
 def search_reviews(tv_show_id):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM tv_shows WHERE id = ?', (tv_show_id,))
-    tv_show = cursor.fetchone()
-    if not tv_show:
+    tv_show = repository.get_title(tv_show_id)
+    if tv_show is None:
         return {"error": "TV Show not found."}
-    cursor.execute('SELECT * FROM reviews WHERE tv_show_id = ?', (tv_show_id,))
-    reviews = cursor.fetchall()
-    conn.close()
-    return {
-        "id": tv_show[0],
-        "title": tv_show[1],
-        "genre": tv_show[2],
-        "reviews": [{"review_id": r[0], "rating": r[2], "note": r[3]} for r in reviews]
-    }
+    return tv_show
 
 def search_by_genre(genre):
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM tv_shows WHERE genre = ?', (genre,))
-    tv_shows = cursor.fetchall()
-    conn.close()
-    return [{"id": tv_show[0], "title": tv_show[1], "genre": tv_show[2]} for tv_show in tv_shows]
+    return repository.titles_by_genre(genre)
+
+def view_show_genre():
+    return repository.genres()
+
+def view_top_shows(limit=3, genre=None):
+    # Best-rated tv_shows by Bayesian score (see MediaRepository.top_rated)
+    return repository.top_rated(limit, genre)
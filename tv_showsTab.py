@@ -1,36 +1,15 @@
-import tv_shows
-
 import gradio as gr
-import json
-import os
-
-# Using the same database file as the backend
-DATABASE_FILE = 'tv_show_reviews.json'
+import tv_show_store
 
-# Loading and saving functions remain the same
-def load_data():
-    if os.path.exists(DATABASE_FILE):
-        with open(DATABASE_FILE, 'r') as file:
-            return json.load(file)
-    return {"shows": []}
-
-def save_data(data):
-    with open(DATABASE_FILE, 'w') as file:
-        json.dump(data, file, indent=4)
+# Append-only log replacing tv_show_reviews.json, which is migrated on first use
+store = tv_show_store.ShowStore()
 
 # Core functions updated for TV shows
 def add_show_interface(show_title):
     if not show_title.strip():
         return "❌ Error: Show title cannot be empty!"
     try:
-        data = load_data()
-        show = {
-            "id": len(data["shows"]) + 1,
-            "title": show_title,
-            "reviews": []
-        }
-        data["shows"].append(show)
-        save_data(data)
+        store.add_show(show_title)
         return f"✅ Success: '{show_title}' added to your library!"
     except Exception as e:
         return f"❌ Error: Failed to add show - {str(e)}"
@@ -42,19 +21,10 @@ def add_review_interface(show_id, rating, review_text):
         if not (0 <= rating <= 5):
             return "❌ Error: Rating must be between 0 and 5!"
         
-        data = load_data()
-        for show in data["shows"]:
-            if show["id"] == show_id:
-                review_id = len(show["reviews"]) + 1
-                review = {
-                    "review_id": review_id,
-                    "rating": rating,
-                    "note": review_text
-                }
-                show["reviews"].append(review)
-                save_data(data)
-                return f"✅ Review successfully added to '{show['title']}'"
-        return f"❌ Error: Show with ID {show_id} not found!"
+        added = store.add_review(show_id, rating, review_text)
+        if added is None:
+            return f"❌ Error: Show with ID {show_id} not found!"
+        return f"✅ Review successfully added to '{added[0]}'"
     except ValueError:
         return "❌ Error: Invalid show ID or rating format!"
     except Exception as e:
@@ -62,8 +32,8 @@ def add_review_interface(show_id, rating, review_text):
 
 def view_all_shows_reviews():
     try:
-        data = load_data()
-        if not data["shows"]:
+        shows = store.shows()
+        if not shows:
             return "📺 Your TV show library is empty. Add some shows to get started!"
         
         output = []
@@ -71,7 +41,7 @@ def view_all_shows_reviews():
         output.append("║       📺 YOUR TV SHOW LIBRARY 📺      ║")
         output.append("╚══════════════════════════════════════╝\n")
         
-        for show in data["shows"]:
+        for show in shows:
             output.append(f"📺 Show #{show['id']} | {show['title']}")
             if not show["reviews"]:
                 output.append("   💭 No reviews yet")
@@ -91,12 +61,8 @@ def view_all_shows_reviews():
 def delete_show_interface(show_id):
     try:
         show_id = int(show_id)
-        data = load_data()
-        initial_length = len(data["shows"])
-        data["shows"] = [show for show in data["shows"] if show["id"] != show_id]
-        if len(data["shows"]) == initial_length:
+        if not store.delete_show(show_id):
             return f"❌ Error: Show #{show_id} not found!"
-        save_data(data)
         return f"✅ Show #{show_id} and its reviews have been removed."
     except ValueError:
         return "❌ Error: Invalid show ID format!"
@@ -107,16 +73,12 @@ def delete_review_interface(show_id, review_id):
     try:
         show_id = int(show_id)
         review_id = int(review_id)
-        data = load_data()
-        for show in data["shows"]:
-            if show["id"] == show_id:
-                initial_length = len(show["reviews"])
-                show["reviews"] = [r for r in show["reviews"] if r["review_id"] != review_id]
-                if len(show["reviews"]) == initial_length:
-                    return f"❌ Error: Review #{review_id} not found!"
-                save_data(data)
-                return f"✅ Review #{review_id} removed from '{show['title']}'"
-        return f"❌ Error: Show #{show_id} not found!"
+        title = store.delete_review(show_id, review_id)
+        if title is None:
+            return f"❌ Error: Show #{show_id} not found!"
+        if title is False:
+            return f"❌ Error: Review #{review_id} not found!"
+        return f"✅ Review #{review_id} removed from '{title}'"
     except ValueError:
         return "❌ Error: Invalid show ID or review ID format!"
     except Exception as e:
@@ -2,6 +2,7 @@
 
 
 
+import sqlite3
 import unittest
 import json
 from api import app
@@ -15,7 +16,7 @@ class TestTVShowsIntegration(unittest.TestCase):
 
         # Using a test database for integration testing
         tv_shows.DATABASE = 'test_tvshows_rvw.db'
-        with tv_shows.sqlite3.connect(tv_shows.DATABASE) as conn:
+        with sqlite3.connect(tv_shows.DATABASE) as conn:
             cursor = conn.cursor()
             # Create the tv_shows table
             cursor.execute('''
@@ -30,7 +31,7 @@ class TestTVShowsIntegration(unittest.TestCase):
 
     def tearDown(self):
         """Cleaning up the test database after each test."""
-        with tv_shows.sqlite3.connect(tv_shows.DATABASE) as conn:
+        with sqlite3.connect(tv_shows.DATABASE) as conn:
             cursor = conn.cursor()
             cursor.execute('DROP TABLE IF EXISTS tv_shows')
             conn.commit()